@@ -4,41 +4,27 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import folium
-from streamlit_folium import st_folium
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.drone_data import BASE_LAT, BASE_LON, STATUSES
+from utils.refresh import data_version, live_section
+from utils.shared import get_drone_manager, get_fleet_map_layer, get_fleet_snapshot, get_telemetry_service
+
 st.set_page_config(page_title="Fleet Dashboard", page_icon="🚁", layout="wide")
 
 st.title("🚁 Fleet Dashboard")
 st.markdown("Real-time monitoring of VTOL medical drone fleet")
 
-# Simulated drone data
-def get_fleet_data():
-    drone_ids = [f"LLA-{i:03d}" for i in range(1, 16)]
-    statuses = ['Active', 'Charging', 'Maintenance', 'Emergency']
-    missions = ['Medical Delivery', 'Search & Rescue', 'Supply Drop', 'Reconnaissance', 'Standby']
-    locations = ['Zone Alpha', 'Zone Beta', 'Zone Gamma', 'Base Station', 'En Route']
-
-    data = []
-    for drone_id in drone_ids:
-        data.append({
-            'id': drone_id,
-            'status': np.random.choice(statuses, p=[0.6, 0.2, 0.15, 0.05]),
-            'battery': np.random.randint(15, 100),
-            'mission': np.random.choice(missions),
-            'location': np.random.choice(locations),
-            'lat': 28.6139 + np.random.uniform(-0.05, 0.05),
-            'lon': 77.2090 + np.random.uniform(-0.05, 0.05),
-            'last_update': datetime.now() - timedelta(minutes=np.random.randint(0, 30))
-        })
-    return data
-
-# Get fleet data
-fleet_data = get_fleet_data()
-df = pd.DataFrame(fleet_data)
+# Drone positions move with live telemetry; the map redraws only its drone layer
+MAP_REFRESH_SECONDS = 5
+
+get_telemetry_service()
+drone_manager = get_drone_manager()
+fleet_map_layer = get_fleet_map_layer()
+
+df = get_fleet_snapshot()['fleet']
 
 # Fleet metrics
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -96,41 +82,9 @@ with col_left:
 with col_right:
     st.subheader("🗺️ Fleet Location Map")
 
-    # Create map
-    m = folium.Map(location=[28.6139, 77.2090], zoom_start=11)
-
-    # Add drone markers
-    for _, drone in df.iterrows():
-        color_map = {
-            'Active': 'green',
-            'Charging': 'orange',
-            'Maintenance': 'red', 
-            'Emergency': 'purple'
-        }
-
-        folium.Marker(
-            [drone['lat'], drone['lon']],
-            popup=f"{drone['id']}: {drone['status']} ({drone['battery']}%)",
-            tooltip=f"{drone['id']} - {drone['mission']}",
-            icon=folium.Icon(
-                color=color_map.get(drone['status'], 'blue'),
-                icon='helicopter',
-                prefix='fa'
-            )
-        ).add_to(m)
-
-    # Add base station
-    folium.Circle(
-        location=[28.6139, 77.2090],
-        radius=2000,
-        popup='Base Station',
-        color='blue',
-        fill=True,
-        fillColor='lightblue',
-        fillOpacity=0.3
-    ).add_to(m)
-
-    map_data = st_folium(m, width=700, height=400)
+    live_section('fleet_map', fleet_map_layer.render, lambda: fleet_map_layer.feature_group(drone_manager),
+                 depends_on=lambda: data_version(drone_manager),
+                 run_every=MAP_REFRESH_SECONDS, shared=True)
 
 # Detailed fleet table
 st.subheader("📋 Detailed Fleet Information")
@@ -164,6 +118,43 @@ st.dataframe(
     hide_index=True
 )
 
+# Nearest available drones
+st.subheader("🎯 Nearest Available Drones")
+
+col_q1, col_q2, col_q3, col_q4, col_q5 = st.columns([1, 1, 1, 1, 2])
+
+with col_q1:
+    query_lat = st.number_input("Latitude", value=BASE_LAT, format="%.5f")
+
+with col_q2:
+    query_lon = st.number_input("Longitude", value=BASE_LON, format="%.5f")
+
+with col_q3:
+    query_k = st.number_input("Drones", min_value=1, max_value=50, value=5)
+
+with col_q4:
+    query_battery = st.slider("Min Battery %", 0, 100, 40)
+
+with col_q5:
+    query_statuses = st.multiselect("Status", STATUSES, default=['Active', 'Charging'])
+
+nearest = drone_manager.nearest_drones(query_lat, query_lon, k=int(query_k),
+                                       statuses=query_statuses or None, min_battery=query_battery)
+if nearest.empty:
+    st.info("No drone matches the filters")
+else:
+    st.dataframe(
+        nearest[['id', 'status', 'battery', 'distance_km']],
+        use_container_width=True,
+        column_config={
+            "id": "Drone ID",
+            "status": "Status",
+            "battery": st.column_config.ProgressColumn("Battery %", min_value=0, max_value=100, format="%d%%"),
+            "distance_km": st.column_config.NumberColumn("Distance", format="%.2f km"),
+        },
+        hide_index=True
+    )
+
 # Quick actions
 st.subheader("⚡ Quick Actions")
 
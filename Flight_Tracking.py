@@ -9,29 +9,109 @@ from streamlit_folium import st_folium
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dispatch import IN_TRANSIT, LOADING
+from utils.eta import EtaEngine
+from utils.geofence import VIOLATION
+from utils.routing import MEDICAL_STATIONS, resample_path
+from utils.shared import (get_dispatcher, get_drone_manager, get_eta_engine, get_flight_series,
+                          get_geofence_engine, get_path_alerts, get_route_planner, get_telemetry_store)
 
 st.set_page_config(page_title="Flight Tracking", page_icon="🗺️", layout="wide")
 
 st.title("🗺️ Live Flight Tracking")
 st.markdown("Real-time GPS tracking and route visualization for VTOL medical drones")
 
-# Generate flight data
-def generate_flight_data():
-    # Base coordinates (Delhi area for example)
-    base_lat, base_lon = 28.6139, 77.2090
+# Flights shown on the map and in the detail cards
+MAX_TRACKED_FLIGHTS = 5
+# Point budgets for downsampled flight paths and telemetry charts
+PATH_BUDGET = 300
+CHART_BUDGET = 200
+
+# Fleet status -> flight status
+FLIGHT_STATUS = {
+    'Active': 'Active',
+    'Emergency': 'Returning',
+    'Charging': 'Landed',
+    'Maintenance': 'Landed',
+}
+STATION_NAMES = list(MEDICAL_STATIONS)
+BASE_STATION = (28.6139, 77.2090)
+
+def plan_route(origin, destination):
+    """Planned route to a (lat, lon) around the no-fly zones, or a straight line if there is none"""
+    route = get_route_planner().plan(origin, destination)
+    if route is None:
+        return [origin[0], destination[0]], [origin[1], destination[1]]
+    return route[0].tolist(), route[1].tolist()
+
+def add_etas(flights, eta_engine):
+    """ETA of each flight along its planned route, all flights in one lookup"""
+    etas = eta_engine.etas([f['drone_id'] for f in flights])['eta']
+    for flight, eta in zip(flights, etas):
+        flight['eta'] = '—' if pd.isna(eta) else eta.strftime('%H:%M')
+    return flights
+
+def get_flight_data():
+    """Build flight records from the telemetry ring buffers"""
+    store = get_telemetry_store()
+    latest = store.latest()
+
+    if not len(latest['drone_id']):
+        return generate_flight_data()
+
+    drone_manager = get_drone_manager()
+    flight_series = get_flight_series()
+    # Destination and planned route come from the delivery the dispatcher gave the drone
+    deliveries = get_dispatcher().deliveries(statuses=(LOADING, IN_TRANSIT))
+    assignments = {delivery.drone_id: delivery for delivery in deliveries.itertuples()}
+
+    # Most recently reporting drones first
+    newest = np.argsort(latest['timestamp'])[::-1][:MAX_TRACKED_FLIGHTS]
+
+    flights = []
+    for i in newest:
+        drone_id = latest['drone_id'][i]
+        path_lats, path_lons, _ = flight_series.path(drone_id, budget=PATH_BUDGET)
+        drone = drone_manager.get_drone(drone_id) if drone_id in drone_manager else {}
+        delivery = assignments.get(drone_id)
+        if delivery is None:
+            destination, planned_lats, planned_lons = 'No assignment', [], []
+        else:
+            destination = delivery.destination
+            planned_lats, planned_lons = plan_route(BASE_STATION, (delivery.lat, delivery.lon))
+
+        flights.append({
+            'drone_id': drone_id,
+            'status': FLIGHT_STATUS.get(drone.get('status'), 'Active'),
+            'current_lat': float(latest['lat'][i]),
+            'current_lon': float(latest['lon'][i]),
+            'path_lats': path_lats.tolist(),
+            'path_lons': path_lons.tolist(),
+            'planned_lats': planned_lats,
+            'planned_lons': planned_lons,
+            'destination': destination,
+            'altitude': float(latest['altitude'][i]),
+            'speed': float(latest['speed'][i]),
+            'battery': int(latest['battery'][i]),
+            'mission_type': drone.get('mission', 'Medical Delivery')
+        })
 
+    # The dispatcher routes drones in transit and telemetry keeps their ETAs current
+    return add_etas(flights, get_eta_engine())
+
+# Simulated flights, used until the ingest service has received telemetry
+def generate_flight_data():
+    # ETAs of simulated flights stay out of the shared engine
+    eta_engine = EtaEngine()
     flights = []
     for i in range(5):
-        # Generate flight path
-        start_lat = base_lat + np.random.uniform(-0.02, 0.02)
-        start_lon = base_lon + np.random.uniform(-0.02, 0.02)
-        end_lat = base_lat + np.random.uniform(-0.05, 0.05)
-        end_lon = base_lon + np.random.uniform(-0.05, 0.05)
+        # Planned route from the base station, flown up to the current position
+        destination = STATION_NAMES[i % len(STATION_NAMES)]
+        planned_lats, planned_lons = plan_route(BASE_STATION, MEDICAL_STATIONS[destination])
 
         # Create path points
         num_points = 20
-        path_lats = np.linspace(start_lat, end_lat, num_points)
-        path_lons = np.linspace(start_lon, end_lon, num_points)
+        path_lats, path_lons = resample_path(planned_lats, planned_lons, num_points)
 
         # Add some realistic deviation
         path_lats += np.random.normal(0, 0.0005, num_points)
@@ -42,19 +122,39 @@ def generate_flight_data():
             'status': np.random.choice(['Active', 'Returning', 'Landed']),
             'current_lat': path_lats[-5],  # Current position
             'current_lon': path_lons[-5],
-            'path_lats': path_lats.tolist(),
-            'path_lons': path_lons.tolist(),
-            'destination': f'Medical Station {chr(65+i)}',
+            'path_lats': path_lats[:-4].tolist(),
+            'path_lons': path_lons[:-4].tolist(),
+            'planned_lats': planned_lats,
+            'planned_lons': planned_lons,
+            'destination': destination,
             'altitude': np.random.uniform(50, 150),
             'speed': np.random.uniform(45, 85),
-            'eta': datetime.now() + timedelta(minutes=np.random.randint(5, 30)),
             'battery': np.random.randint(40, 95),
             'mission_type': np.random.choice(['Emergency Delivery', 'Scheduled Supply', 'Search & Rescue'])
         })
+        eta_engine.set_route(flights[-1]['drone_id'], planned_lats, planned_lons)
+
+    # One simulated fix per flight, the way a telemetry batch would arrive
+    eta_engine.update(
+        [f['drone_id'] for f in flights],
+        [f['current_lat'] for f in flights],
+        [f['current_lon'] for f in flights],
+        [f['speed'] for f in flights],
+        np.full(len(flights), datetime.now().timestamp()),
+    )
+    return add_etas(flights, eta_engine)
 
-    return flights
+flight_data = get_flight_data()
 
-flight_data = generate_flight_data()
+# Check every vertex of every flown and planned path against the no-fly zones
+geofence = get_geofence_engine()
+checked_paths = {
+    f['drone_id']: (f['path_lats'] + f['planned_lats'], f['path_lons'] + f['planned_lons'])
+    for f in flight_data
+}
+airspace_hits = geofence.check_paths(checked_paths)
+# Raised as grouped alerts so they outlive this render
+get_path_alerts()(checked_paths, airspace_hits)
 
 # Flight status overview
 st.subheader("✈️ Active Flight Status")
@@ -114,6 +214,17 @@ with col_left:
             popup=f"{flight['drone_id']} - {flight['mission_type']}"
         ).add_to(m)
 
+        # Planned route to the destination; drones without a delivery have none
+        if flight['planned_lats']:
+            folium.PolyLine(
+                list(zip(flight['planned_lats'], flight['planned_lons'])),
+                color=status_colors.get(flight['status'], '#2196F3'),
+                weight=2,
+                opacity=0.6,
+                dash_array='6 6',
+                tooltip=f"{flight['drone_id']} planned route"
+            ).add_to(m)
+
         # Current drone position
         popup_html = f"""
         <div style="width: 200px;">
@@ -124,7 +235,7 @@ with col_left:
             <p><b>Altitude:</b> {flight['altitude']:.0f}m</p>
             <p><b>Speed:</b> {flight['speed']:.0f} km/h</p>
             <p><b>Battery:</b> {flight['battery']}%</p>
-            <p><b>ETA:</b> {flight['eta'].strftime('%H:%M')}</p>
+            <p><b>ETA:</b> {flight['eta']}</p>
         </div>
         """
 
@@ -140,33 +251,35 @@ with col_left:
         ).add_to(m)
 
         # Add destination marker
-        dest_lat = flight['path_lats'][-1]
-        dest_lon = flight['path_lons'][-1]
-
-        folium.CircleMarker(
-            [dest_lat, dest_lon],
-            radius=8,
-            popup=f"Destination: {flight['destination']}",
-            color=status_colors.get(flight['status'], '#2196F3'),
-            fill=True,
-            weight=2
-        ).add_to(m)
-
-    # Add no-fly zones (example)
-    folium.Circle(
-        [28.6239, 77.2190],
-        radius=1000,
-        popup='Restricted Airspace',
-        color='red',
-        fill=True,
-        fillColor='red',
-        fillOpacity=0.2,
-        weight=2
+        if flight['planned_lats']:
+            folium.CircleMarker(
+                [flight['planned_lats'][-1], flight['planned_lons'][-1]],
+                radius=8,
+                popup=f"Destination: {flight['destination']}",
+                color=status_colors.get(flight['status'], '#2196F3'),
+                fill=True,
+                weight=2
+            ).add_to(m)
+
+    # No-fly zones
+    folium.GeoJson(
+        geofence.to_geojson(),
+        name='No-fly zones',
+        style_function=lambda _: {'color': 'red', 'weight': 2, 'fillColor': 'red', 'fillOpacity': 0.2},
+        tooltip=folium.GeoJsonTooltip(fields=['name'], aliases=['Restricted:'])
     ).add_to(m)
 
     # Display map
     map_data = st_folium(m, width=800, height=500)
 
+    # Airspace conflicts along the displayed paths
+    for hit in airspace_hits:
+        if hit['kind'] == VIOLATION:
+            st.error(f"🚫 {hit['drone_id']} path enters {hit['zone']} "
+                     f"({-hit['distance_km'] * 1000:.0f} m inside)")
+        else:
+            st.warning(f"⚠️ {hit['drone_id']} path passes {hit['distance_km'] * 1000:.0f} m from {hit['zone']}")
+
 with col_right:
     st.subheader("📋 Flight Details")
 
@@ -187,7 +300,7 @@ with col_right:
             <p style="margin: 5px 0;"><b>Altitude:</b> {flight['altitude']:.0f}m</p>
             <p style="margin: 5px 0;"><b>Speed:</b> {flight['speed']:.0f} km/h</p>
             <p style="margin: 5px 0;"><b>Battery:</b> {flight['battery']}%</p>
-            <p style="margin: 5px 0;"><b>ETA:</b> {flight['eta'].strftime('%H:%M')}</p>
+            <p style="margin: 5px 0;"><b>ETA:</b> {flight['eta']}</p>
         </div>
         """, unsafe_allow_html=True)
 
@@ -238,6 +351,23 @@ with col_chart2:
     )
     st.plotly_chart(fig_battery, use_container_width=True)
 
+# Altitude profiles, min/max envelopes from the downsampled flight series
+fig_altitude = go.Figure()
+for flight in flight_data:
+    times, low, high = get_flight_series().series(flight['drone_id'], 'altitude', budget=CHART_BUDGET)
+    if not len(times):
+        continue
+    times = pd.to_datetime(times, unit='s')
+    fig_altitude.add_trace(go.Scatter(x=times, y=low, mode='lines', line_width=0,
+                                      legendgroup=flight['drone_id'], showlegend=False))
+    fig_altitude.add_trace(go.Scatter(x=times, y=high, mode='lines', fill='tonexty',
+                                      name=flight['drone_id'], legendgroup=flight['drone_id']))
+
+if fig_altitude.data:
+    fig_altitude.update_layout(title="Altitude Profiles (sortie)", xaxis_title="Time (UTC)",
+                               yaxis_title="Altitude (m)", height=350)
+    st.plotly_chart(fig_altitude, use_container_width=True)
+
 # Weather information
 st.subheader("🌤️ Weather Conditions")
 
@@ -8,41 +8,36 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.failure_model import COMPONENTS
+from utils.maintenance import HEALTH_STATUSES, TECHNICIANS
+from utils.scheduling import DUE, OVERDUE
+from utils.shared import (get_maintenance_manager, get_maintenance_scheduler, get_maintenance_snapshot,
+                          get_snapshot_cache)
+
 st.set_page_config(page_title="Maintenance", page_icon="🔧", layout="wide")
 
 st.title("🔧 Drone Maintenance & Diagnostics")
 st.markdown("Comprehensive maintenance tracking and predictive analytics for VTOL medical drone fleet")
 
-# Generate maintenance data
-def generate_maintenance_data():
-    drone_ids = [f'LLA-{i:03d}' for i in range(1, 16)]
-    components = ['Rotors', 'Battery', 'GPS Module', 'Camera', 'Communication', 'Landing Gear', 'Cargo Bay', 'Flight Controller']
-
-    maintenance_records = []
-    for drone_id in drone_ids:
-        for component in components:
-            health_score = np.random.uniform(60, 100)
-            last_service = datetime.now() - timedelta(days=np.random.randint(1, 180))
-            next_service = last_service + timedelta(days=np.random.randint(30, 90))
-
-            maintenance_records.append({
-                'drone_id': drone_id,
-                'component': component,
-                'health_score': health_score,
-                'status': 'Critical' if health_score < 70 else 'Warning' if health_score < 85 else 'Good',
-                'last_service': last_service,
-                'next_service': next_service,
-                'flight_hours': np.random.uniform(0, 500),
-                'cycles': np.random.randint(0, 1000),
-                'failure_probability': max(0, (100 - health_score) / 100),
-                'estimated_cost': np.random.uniform(100, 2000),
-                'technician': np.random.choice(['Tech-A', 'Tech-B', 'Tech-C', 'Tech-D']),
-                'priority': np.random.choice(['High', 'Medium', 'Low'])
-            })
-
-    return pd.DataFrame(maintenance_records)
-
-maintenance_df = generate_maintenance_data()
+# Drones shown in the component heatmap; larger fleets show their weakest drones
+HEATMAP_DRONES = 50
+# Rows of the detailed records table; larger selections show their worst records
+TABLE_ROWS = 500
+
+# Component records; failure probabilities come from the trained model and
+# only components whose features changed are re-scored. The summary comes
+# from the shared snapshot, so one dashboard process scores for all of them;
+# record tables are filtered in the manager before any frame is built
+maintenance_manager = get_maintenance_manager()
+maintenance_snapshot = get_maintenance_snapshot()
+maintenance_summary = maintenance_snapshot['summary']
+component_means = maintenance_snapshot['component_means']
+status_counts = maintenance_summary['status_counts']
+status_costs = maintenance_summary['status_costs']
+
+# Due and overdue numbers come from the scheduler's due-date index
+maintenance_scheduler = get_maintenance_scheduler()
+service_states = maintenance_scheduler.state_counts()
 
 # Fleet Health Overview
 st.subheader("🏥 Fleet Health Overview")
@@ -50,23 +45,21 @@ st.subheader("🏥 Fleet Health Overview")
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    avg_health = maintenance_df['health_score'].mean()
+    avg_health = component_means['health_score'].mean()
     st.metric("🎯 Avg Fleet Health", f"{avg_health:.1f}%", f"+{np.random.uniform(0.5, 2.0):.1f}%")
 
 with col2:
-    critical_components = len(maintenance_df[maintenance_df['status'] == 'Critical'])
-    st.metric("🚨 Critical Components", critical_components, f"-{np.random.randint(1, 3)}")
+    st.metric("🚨 Critical Components", status_counts['Critical'], f"-{np.random.randint(1, 3)}")
 
 with col3:
-    overdue_maintenance = len(maintenance_df[maintenance_df['next_service'] < datetime.now()])
-    st.metric("⏰ Overdue Maintenance", overdue_maintenance)
+    st.metric("⏰ Overdue Maintenance", service_states[OVERDUE])
 
 with col4:
-    total_flight_hours = maintenance_df['flight_hours'].sum()
+    total_flight_hours = maintenance_summary['flight_hours']
     st.metric("✈️ Total Flight Hours", f"{total_flight_hours:.0f}h", f"+{np.random.randint(10, 50)}h")
 
 with col5:
-    estimated_costs = maintenance_df[maintenance_df['status'].isin(['Critical', 'Warning'])]['estimated_cost'].sum()
+    estimated_costs = status_costs['Critical'] + status_costs['Warning']
     st.metric("💰 Est. Repair Costs", f"${estimated_costs:.0f}", f"+${np.random.randint(200, 800)}")
 
 # Main maintenance dashboard
@@ -75,20 +68,21 @@ col_left, col_right = st.columns([2, 1])
 with col_left:
     st.subheader("🔍 Component Health Analysis")
 
-    # Component health heatmap
-    pivot_df = maintenance_df.pivot_table(
-        index='drone_id', 
-        columns='component', 
-        values='health_score', 
-        aggfunc='mean'
-    )
+    # Component health heatmap, straight from the drone x component matrix
+    heatmap_scope = ""
+    if len(maintenance_manager.drone_ids()) > HEATMAP_DRONES:
+        weakest = maintenance_manager.worst_components(HEATMAP_DRONES)['drone_id'].tolist()
+        health_matrix, heatmap_drones, heatmap_components = maintenance_manager.health_matrix(weakest)
+        heatmap_scope = f" ({HEATMAP_DRONES} weakest drones)"
+    else:
+        health_matrix, heatmap_drones, heatmap_components = maintenance_manager.health_matrix()
 
     fig_heatmap = px.imshow(
-        pivot_df.values,
-        x=pivot_df.columns,
-        y=pivot_df.index,
+        health_matrix,
+        x=heatmap_components,
+        y=heatmap_drones,
         color_continuous_scale='RdYlGn',
-        title="Component Health Heatmap",
+        title="Component Health Heatmap" + heatmap_scope,
         labels={'color': 'Health Score (%)'}
     )
     fig_heatmap.update_layout(height=400)
@@ -97,14 +91,16 @@ with col_left:
     # Maintenance schedule timeline
     st.subheader("📅 Maintenance Schedule")
 
-    # Filter for upcoming maintenance
-    upcoming_maintenance = maintenance_df[
-        (maintenance_df['next_service'] >= datetime.now()) & 
-        (maintenance_df['next_service'] <= datetime.now() + timedelta(days=30))
-    ].sort_values('next_service')
+    # Next services within 30 days, in due order
+    now = datetime.now()
+    upcoming_maintenance = maintenance_manager.service_between(
+        now.timestamp(), (now + timedelta(days=30)).timestamp(), limit=10
+    )
+    st.caption(f"{service_states[DUE]} components due within "
+               f"{maintenance_scheduler.due_window // 86400:.0f} days · {service_states[OVERDUE]} overdue")
 
     if not upcoming_maintenance.empty:
-        for _, record in upcoming_maintenance.head(10).iterrows():
+        for _, record in upcoming_maintenance.iterrows():
             days_until = (record['next_service'] - datetime.now()).days
             urgency_color = '#f44336' if days_until <= 3 else '#ff9800' if days_until <= 7 else '#4caf50'
 
@@ -122,10 +118,10 @@ with col_right:
     st.subheader("🚨 Critical Alerts")
 
     # Critical components needing immediate attention
-    critical_alerts = maintenance_df[maintenance_df['status'] == 'Critical'].sort_values('health_score')
+    critical_alerts = maintenance_manager.get_records(status='Critical', limit=8)
 
     if not critical_alerts.empty:
-        for _, alert in critical_alerts.head(8).iterrows():
+        for _, alert in critical_alerts.iterrows():
             st.markdown(f"""
             <div style="padding: 10px; margin: 5px 0; background: #ffebee; border: 1px solid #f44336; border-radius: 5px;">
                 <strong style="color: #f44336;">🚨 {alert['drone_id']}</strong><br>
@@ -139,10 +135,10 @@ with col_right:
         st.success("✅ No critical maintenance alerts")
 
     st.subheader("⚠️ Warnings")
-    warning_alerts = maintenance_df[maintenance_df['status'] == 'Warning'].sort_values('health_score')
+    warning_alerts = maintenance_manager.get_records(status='Warning', limit=5)
 
     if not warning_alerts.empty:
-        for _, warning in warning_alerts.head(5).iterrows():
+        for _, warning in warning_alerts.iterrows():
             st.markdown(f"""
             <div style="padding: 10px; margin: 5px 0; background: #fff3e0; border: 1px solid #ff9800; border-radius: 5px;">
                 <strong style="color: #ff9800;">⚠️ {warning['drone_id']}</strong><br>
@@ -159,25 +155,23 @@ st.subheader("📋 Detailed Maintenance Records")
 col_f1, col_f2, col_f3 = st.columns(3)
 
 with col_f1:
-    drone_filter = st.selectbox("Filter by Drone", ['All'] + list(maintenance_df['drone_id'].unique()))
+    drone_filter = st.selectbox("Filter by Drone", ['All'] + maintenance_manager.drone_ids())
 
 with col_f2:
-    component_filter = st.selectbox("Filter by Component", ['All'] + list(maintenance_df['component'].unique()))
+    component_filter = st.selectbox("Filter by Component", ['All'] + list(COMPONENTS))
 
 with col_f3:
-    status_filter = st.selectbox("Filter by Status", ['All', 'Critical', 'Warning', 'Good'])
-
-# Apply filters
-filtered_maintenance = maintenance_df.copy()
-
-if drone_filter != 'All':
-    filtered_maintenance = filtered_maintenance[filtered_maintenance['drone_id'] == drone_filter]
-
-if component_filter != 'All':
-    filtered_maintenance = filtered_maintenance[filtered_maintenance['component'] == component_filter]
-
-if status_filter != 'All':
-    filtered_maintenance = filtered_maintenance[filtered_maintenance['status'] == status_filter]
+    status_filter = st.selectbox("Filter by Status", ['All'] + HEALTH_STATUSES)
+
+# Filters are pushed down to the manager
+filtered_maintenance = maintenance_manager.get_records(
+    drone_ids=None if drone_filter == 'All' else [drone_filter],
+    component=None if component_filter == 'All' else component_filter,
+    status=None if status_filter == 'All' else status_filter,
+    limit=TABLE_ROWS,
+)
+if len(filtered_maintenance) == TABLE_ROWS:
+    st.caption(f"Showing the {TABLE_ROWS} records in the worst health")
 
 # Configure table columns
 column_config = {
@@ -230,26 +224,26 @@ col_chart1, col_chart2 = st.columns(2)
 
 with col_chart1:
     # Component health distribution
-    component_health = maintenance_df.groupby('component')['health_score'].mean().sort_values(ascending=True)
+    component_health = component_means.sort_values('health_score')
 
     fig_component = px.bar(
-        x=component_health.values,
-        y=component_health.index,
+        x=component_health['health_score'],
+        y=component_health['component'],
         orientation='h',
         title="Average Component Health Scores",
-        color=component_health.values,
+        color=component_health['health_score'],
         color_continuous_scale='RdYlGn'
     )
     st.plotly_chart(fig_component, use_container_width=True)
 
 with col_chart2:
-    # Flight hours vs health score correlation
+    # Flight hours vs health score correlation, for the drones in the heatmap
     fig_scatter = px.scatter(
-        maintenance_df,
+        maintenance_manager.get_records(drone_ids=heatmap_drones),
         x='flight_hours',
         y='health_score',
         color='component',
-        title='Flight Hours vs Health Score',
+        title='Flight Hours vs Health Score' + heatmap_scope,
         hover_data=['drone_id', 'status']
     )
     st.plotly_chart(fig_scatter, use_container_width=True)
@@ -259,13 +253,13 @@ col_pred1, col_pred2 = st.columns(2)
 
 with col_pred1:
     # Failure probability by component
-    failure_prob = maintenance_df.groupby('component')['failure_probability'].mean().sort_values(ascending=False)
+    failure_prob = component_means.sort_values('failure_probability', ascending=False)
 
     fig_failure = px.bar(
-        x=failure_prob.index,
-        y=failure_prob.values,
+        x=failure_prob['component'],
+        y=failure_prob['failure_probability'],
         title="Component Failure Probability",
-        color=failure_prob.values,
+        color=failure_prob['failure_probability'],
         color_continuous_scale='Reds'
     )
     fig_failure.update_layout(xaxis_tickangle=-45)
@@ -273,11 +267,9 @@ with col_pred1:
 
 with col_pred2:
     # Maintenance cost trends
-    cost_by_status = maintenance_df.groupby('status')['estimated_cost'].sum()
-
     fig_cost = px.pie(
-        values=cost_by_status.values,
-        names=cost_by_status.index,
+        values=list(status_costs.values()),
+        names=list(status_costs),
         title="Estimated Repair Costs by Status",
         color_discrete_map={
             'Critical': '#f44336',
@@ -315,13 +307,13 @@ col_team1, col_team2 = st.columns(2)
 
 with col_team1:
     # Technician workload
-    tech_workload = maintenance_df[maintenance_df['status'].isin(['Critical', 'Warning'])].groupby('technician').size()
+    tech_workload = maintenance_summary['technician_workload']
 
     fig_workload = px.bar(
-        x=tech_workload.index,
-        y=tech_workload.values,
+        x=list(tech_workload),
+        y=list(tech_workload.values()),
         title="Technician Workload (Critical & Warning Items)",
-        color=tech_workload.values,
+        color=list(tech_workload.values()),
         color_continuous_scale='Blues'
     )
     st.plotly_chart(fig_workload, use_container_width=True)
@@ -351,24 +343,30 @@ with col_team2:
 with st.sidebar:
     st.subheader("🔧 Maintenance Controls")
 
-    # Quick maintenance log
+    # Quick maintenance log: a service restores the component and reschedules
+    # it, an inspection records the measured health
     with st.form("maintenance_log"):
         st.write("**Quick Maintenance Log**")
-        log_drone = st.selectbox("Drone", maintenance_df['drone_id'].unique())
-        log_component = st.selectbox("Component", maintenance_df['component'].unique())
+        log_drone = st.selectbox("Drone", maintenance_manager.drone_ids())
+        log_component = st.selectbox("Component", COMPONENTS)
+        log_entry = st.radio("Entry", ['Service', 'Inspection'], horizontal=True)
+        log_health = st.slider("Inspected Health (%)", min_value=0, max_value=100, value=100)
         log_action = st.text_area("Action Taken")
-        log_technician = st.selectbox("Technician", ['Tech-A', 'Tech-B', 'Tech-C', 'Tech-D'])
+        log_technician = st.selectbox("Technician", TECHNICIANS)
 
         if st.form_submit_button("Log Maintenance"):
             if log_action:
-                st.success(f"Maintenance logged for {log_drone}!")
+                if log_entry == 'Service':
+                    maintenance_manager.log_service(log_drone, log_component, technician=log_technician)
+                else:
+                    maintenance_manager.report_component(log_drone, log_component, float(log_health))
+                get_snapshot_cache().invalidate('maintenance')
+                st.success(f"{log_entry} of {log_drone} {log_component} logged!")
+            else:
+                st.warning("Describe the action taken")
 
     st.subheader("📊 Quick Stats")
-    overdue_count = len(maintenance_df[maintenance_df['next_service'] < datetime.now()])
-    st.metric("Overdue Items", overdue_count)
-
-    critical_count = len(maintenance_df[maintenance_df['status'] == 'Critical'])
-    st.metric("Critical Items", critical_count)
+    st.metric("Overdue Items", service_states[OVERDUE])
 
-    avg_health_all = maintenance_df['health_score'].mean()
-    st.metric("Fleet Health", f"{avg_health_all:.1f}%")
+    st.metric("Critical Items", status_counts['Critical'])
+    st.metric("Fleet Health", f"{avg_health:.1f}%")
@@ -13,55 +13,22 @@ st.set_page_config(page_title="Medical Cargo", page_icon="⚕️", layout="wide"
 st.title("⚕️ Medical Cargo Management")
 st.markdown("Advanced medical supply tracking and inventory management system")
 
-# Generate medical inventory data
-def generate_medical_inventory():
-    medical_items = [
-        {'category': 'Blood Products', 'items': ['O+ Blood Pack', 'O- Blood Pack', 'A+ Blood Pack', 'A- Blood Pack', 'B+ Blood Pack', 'AB+ Blood Pack']},
-        {'category': 'Emergency Medications', 'items': ['Epinephrine', 'Morphine', 'Atropine', 'Naloxone', 'Adenosine', 'Amiodarone']},
-        {'category': 'IV Fluids', 'items': ['Normal Saline', 'Lactated Ringers', 'D5W', 'Plasma Expander']},
-        {'category': 'Surgical Supplies', 'items': ['Trauma Kit', 'Suture Kit', 'Emergency Airway Kit', 'Chest Tube Kit']},
-        {'category': 'Vaccines', 'items': ['COVID-19 Vaccine', 'Hepatitis B', 'Tetanus Toxoid', 'Rabies Vaccine']},
-        {'category': 'Equipment', 'items': ['Portable Defibrillator', 'Oxygen Tank', 'Blood Glucose Monitor', 'Thermometer']}
-    ]
-
-    inventory = []
-    for cat in medical_items:
-        for item in cat['items']:
-            inventory.append({
-                'item_id': f"MED-{len(inventory)+1:04d}",
-                'category': cat['category'],
-                'item_name': item,
-                'current_stock': np.random.randint(5, 100),
-                'min_stock': np.random.randint(10, 25),
-                'max_stock': np.random.randint(80, 150),
-                'temperature_req': np.random.choice(['2-8°C', 'Room Temp', '-20°C']),
-                'expiry_date': datetime.now() + timedelta(days=np.random.randint(30, 730)),
-                'priority': np.random.choice(['Critical', 'High', 'Medium', 'Low']),
-                'location': f"Storage Unit {np.random.choice(['A', 'B', 'C', 'D'])}",
-                'batch_number': f"BT{np.random.randint(1000, 9999)}",
-                'supplier': np.random.choice(['MedCorp', 'HealthSupply Inc', 'BioTech Ltd', 'MediCore']),
-                'cost_per_unit': np.random.uniform(10, 500)
-            })
-
-    return pd.DataFrame(inventory)
-
-inventory_df = generate_medical_inventory()
-
-# Calculate stock status
-def get_stock_status(row):
-    if row['current_stock'] <= row['min_stock']:
-        return 'Critical'
-    elif row['current_stock'] <= row['min_stock'] * 1.5:
-        return 'Low'
-    elif row['current_stock'] >= row['max_stock'] * 0.8:
-        return 'Overstocked'
-    else:
-        return 'Normal'
-
-inventory_df['stock_status'] = inventory_df.apply(get_stock_status, axis=1)
-
-# Calculate days until expiry
-inventory_df['days_to_expiry'] = (inventory_df['expiry_date'] - datetime.now()).dt.days
+from utils.medical_supplies import PRIORITIES as ITEM_PRIORITIES, STOCK_STATUSES, STORAGE_UNITS, TEMPERATURE_BANDS
+from utils.dispatch import DELIVERY_STATUSES, PRIORITIES
+from utils.routing import MEDICAL_STATIONS
+from utils.shared import (get_cold_chain_monitor, get_dispatcher, get_eta_engine, get_inventory_snapshot,
+                          get_medical_manager, get_snapshot_cache, get_telemetry_service)
+
+# Payload temperatures and drone positions arrive with live telemetry
+get_telemetry_service()
+medical_manager = get_medical_manager()
+dispatcher = get_dispatcher()
+
+# Stock status is classified by the manager and kept current as stock changes;
+# the table comes from the shared snapshot, which stock changes here invalidate
+inventory_snapshot = get_inventory_snapshot()
+inventory_df = inventory_snapshot['inventory']
+status_counts = inventory_snapshot['status_counts']
 
 # Inventory Overview Dashboard
 st.subheader("📊 Inventory Overview")
@@ -73,7 +40,7 @@ with col1:
     st.metric("📦 Total Items", total_items)
 
 with col2:
-    critical_stock = len(inventory_df[inventory_df['stock_status'] == 'Critical'])
+    critical_stock = status_counts['Critical']
     st.metric("🚨 Critical Stock", critical_stock, delta=f"-{np.random.randint(1, 5)}")
 
 with col3:
@@ -112,7 +79,7 @@ with col_left:
     with col_f3:
         status_filter = st.selectbox(
             "Filter by Stock Status",
-            ['All'] + list(inventory_df['stock_status'].unique())
+            ['All'] + [status for status in STOCK_STATUSES if status_counts[status]]
         )
 
     # Apply filters
@@ -187,19 +154,19 @@ with col_right:
     else:
         st.success("✅ No critical stock alerts")
 
-    # Expiring items
+    # Expiring batches, read from the ledger's expiry heap
     st.subheader("⏰ Expiring Items")
-    expiring_items = inventory_df[inventory_df['days_to_expiry'] <= 30].sort_values('days_to_expiry')
+    expiring_items = medical_manager.get_expiring_batches(k=5, within_days=30)
 
     if not expiring_items.empty:
-        for _, item in expiring_items.head(5).iterrows():
+        for _, item in expiring_items.iterrows():
             color = "#f44336" if item['days_to_expiry'] <= 7 else "#ff9800"
             st.markdown(f"""
             <div style="padding: 10px; margin: 5px 0; background: #fff3e0; border: 1px solid {color}; border-radius: 5px;">
                 <strong style="color: {color};">⏰ {item['item_name']}</strong><br>
                 Expires in: {item['days_to_expiry']} days<br>
-                Batch: {item['batch_number']}<br>
-                Stock: {item['current_stock']} units
+                Batch: {item['batch']}<br>
+                Stock: {item['quantity']} units
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -212,11 +179,9 @@ col_chart1, col_chart2 = st.columns(2)
 
 with col_chart1:
     # Stock status distribution
-    status_counts = inventory_df['stock_status'].value_counts()
-
     fig_status = px.pie(
-        values=status_counts.values,
-        names=status_counts.index,
+        values=list(status_counts.values()),
+        names=list(status_counts.keys()),
         title="Stock Status Distribution",
         color_discrete_map={
             'Critical': '#f44336',
@@ -269,29 +234,36 @@ with col_temp2:
 # Active Deliveries Section
 st.subheader("🚚 Active Medical Deliveries")
 
-# Generate active delivery data
-def generate_active_deliveries():
-    deliveries = []
-    for i in range(8):
-        start_time = datetime.now() - timedelta(minutes=np.random.randint(5, 60))
-        deliveries.append({
-            'delivery_id': f'DEL-{2024000 + i:06d}',
-            'drone_id': f'LLA-{np.random.randint(1, 15):03d}',
-            'medical_item': np.random.choice(inventory_df['item_name'].tolist()),
-            'quantity': np.random.randint(1, 10),
-            'destination': f'Medical Station {chr(65 + np.random.randint(0, 5))}',
-            'priority': np.random.choice(['Critical', 'High', 'Medium']),
-            'status': np.random.choice(['In Transit', 'Delivered', 'Loading'], p=[0.6, 0.3, 0.1]),
-            'start_time': start_time,
-            'eta': start_time + timedelta(minutes=np.random.randint(10, 45)),
-            'temperature_status': np.random.choice(['Normal', 'Alert'], p=[0.9, 0.1]),
-            'gps_status': 'Active',
-            'chain_of_custody': 'Verified'
-        })
-
-    return pd.DataFrame(deliveries)
-
-deliveries_df = generate_active_deliveries()
+# Active deliveries come from the dispatcher, which assigns drones in optimal batches
+def get_active_deliveries():
+    deliveries = dispatcher.deliveries()
+    start_time = deliveries['start_time'].fillna(deliveries['requested_at'])
+
+    # Drones in the air are tracked along their planned route, registered by the dispatcher
+    eta = get_eta_engine().etas(deliveries['drone_id'].fillna('').tolist())['eta']
+    eta = eta.where((deliveries['status'] == 'In Transit').to_numpy())
+
+    # Payload temperatures stream from telemetry into the cold-chain monitor during the flight
+    temperatures = get_cold_chain_monitor().status(deliveries['delivery_id'].tolist())
+
+    return pd.DataFrame({
+        'delivery_id': deliveries['delivery_id'],
+        'drone_id': deliveries['drone_id'].fillna('Unassigned'),
+        'medical_item': deliveries['medical_item'],
+        'quantity': deliveries['quantity'],
+        'destination': deliveries['destination'],
+        'priority': deliveries['priority'],
+        'status': deliveries['status'],
+        'start_time': start_time,
+        'eta': eta.to_numpy(),
+        'batches': [', '.join(batch for batch, _, _ in picks) for picks in deliveries['batches']],
+        'payload_temp': temperatures['temperature'].to_numpy(),
+        'temperature_status': temperatures['temperature_status'].to_numpy(),
+        'gps_status': 'Active',
+        'chain_of_custody': 'Verified'
+    })
+
+deliveries_df = get_active_deliveries()
 
 # Display active deliveries
 delivery_column_config = {
@@ -306,7 +278,7 @@ delivery_column_config = {
     ),
     "status": st.column_config.SelectboxColumn(
         "Status", 
-        options=["In Transit", "Delivered", "Loading", "Delayed"]
+        options=DELIVERY_STATUSES + ["Delayed"]
     ),
     "start_time": st.column_config.DatetimeColumn(
         "Start Time",
@@ -316,6 +288,11 @@ delivery_column_config = {
         "ETA",
         format="HH:mm"
     ),
+    "batches": "Batches",
+    "payload_temp": st.column_config.NumberColumn(
+        "Payload Temp",
+        format="%.1f °C"
+    ),
     "temperature_status": "Temp Status"
 }
 
@@ -332,8 +309,25 @@ st.subheader("⚡ Quick Actions")
 col_act1, col_act2, col_act3, col_act4 = st.columns(4)
 
 with col_act1:
-    if st.button("📦 New Delivery", use_container_width=True):
-        st.success("New delivery request initiated!")
+    with st.popover("📦 New Delivery", use_container_width=True):
+        with st.form("new_delivery"):
+            delivery_station = st.selectbox("Destination", list(MEDICAL_STATIONS))
+            delivery_item = st.selectbox("Medical Item", inventory_df['item_name'].unique())
+            delivery_quantity = st.number_input("Quantity", min_value=1, max_value=50, value=1)
+            delivery_priority = st.selectbox("Priority", PRIORITIES, index=2)
+
+            if st.form_submit_button("Request Delivery"):
+                delivery_id = dispatcher.request(delivery_station, *MEDICAL_STATIONS[delivery_station],
+                                                 priority=delivery_priority, medical_item=delivery_item,
+                                                 quantity=int(delivery_quantity))
+                result = dispatcher.dispatch()
+                get_snapshot_cache().invalidate('inventory')
+                if delivery_id in result['assigned']:
+                    st.success(f"{delivery_id} assigned to {result['assigned'][delivery_id]}")
+                else:
+                    st.info(f"{delivery_id} queued until a drone is available")
+                if result['preempted']:
+                    st.warning(f"Preempted for a critical delivery: {', '.join(result['preempted'])}")
 
 with col_act2:
     if st.button("📊 Generate Report", use_container_width=True):
@@ -345,7 +339,13 @@ with col_act3:
 
 with col_act4:
     if st.button("⚠️ Emergency Restock", use_container_width=True):
-        st.warning("Emergency restock protocol activated!")
+        restocked = medical_manager.restock()
+        get_snapshot_cache().invalidate('inventory')
+        if restocked:
+            st.warning(f"Emergency restock: {sum(restocked.values())} units received "
+                       f"across {len(restocked)} items")
+        else:
+            st.success("All items are above their low-stock level")
 
 # Sidebar controls
 with st.sidebar:
@@ -357,22 +357,42 @@ with st.sidebar:
         new_category = st.selectbox("Category", inventory_df['category'].unique())
         new_item = st.text_input("Item Name")
         new_quantity = st.number_input("Initial Stock", min_value=0, max_value=1000)
-        new_priority = st.selectbox("Priority", ['Critical', 'High', 'Medium', 'Low'])
+        new_priority = st.selectbox("Priority", ITEM_PRIORITIES)
+        new_temperature = st.selectbox("Temperature", TEMPERATURE_BANDS)
+        new_location = st.selectbox("Storage Location", STORAGE_UNITS)
 
         if st.form_submit_button("Add Item"):
             if new_item:
-                st.success(f"Added {new_item} to inventory!")
+                try:
+                    item_id = medical_manager.add_item(new_item.strip(), new_category, int(new_quantity),
+                                                       priority=new_priority, temperature=new_temperature,
+                                                       location=new_location)
+                except ValueError as error:
+                    st.error(str(error))
+                else:
+                    get_snapshot_cache().invalidate('inventory')
+                    st.success(f"Added {new_item} to inventory as {item_id}!")
 
     st.subheader("🔍 Search & Filters")
     search_term = st.text_input("Search items...")
-
-    if search_term:
-        search_results = inventory_df[
-            inventory_df['item_name'].str.contains(search_term, case=False, na=False)
-        ]
+    search_category = st.selectbox("Category", ['All'] + list(inventory_df['category'].unique()), key="search_category")
+    search_temperature = st.selectbox("Temperature", ['All'] + TEMPERATURE_BANDS, key="search_temperature")
+    search_location = st.selectbox("Location", ['All'] + STORAGE_UNITS, key="search_location")
+
+    # Fuzzy lookups against the manager's trigram index; misspelled names still match
+    if search_term or (search_category, search_temperature, search_location) != ('All', 'All', 'All'):
+        search_results = medical_manager.search_items(
+            search_term,
+            category=None if search_category == 'All' else search_category,
+            temperature=None if search_temperature == 'All' else search_temperature,
+            location=None if search_location == 'All' else search_location,
+        )
         st.write(f"Found {len(search_results)} items")
+        st.dataframe(search_results[['item_name', 'current_stock', 'location']].head(20), hide_index=True,
+                     use_container_width=True)
 
     st.subheader("📈 Quick Stats")
-    st.metric("Low Stock Items", len(inventory_df[inventory_df['stock_status'].isin(['Critical', 'Low'])]))
+    st.metric("Low Stock Items", status_counts['Critical'] + status_counts['Low'])
     st.metric("Total Categories", inventory_df['category'].nunique())
     st.metric("Avg Days to Expiry", f"{inventory_df['days_to_expiry'].mean():.0f}")
+    st.metric("Stock Movements", len(medical_manager.ledger))
@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,29 +13,20 @@ st.set_page_config(page_title="Mission Analytics", page_icon="📊", layout="wid
 st.title("📊 Mission Analytics")
 st.markdown("Comprehensive analysis of drone mission performance")
 
-# Generate sample mission data
-def generate_mission_data():
-    dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='D')
-    missions_data = []
+from utils.mission_archive import ZONES
+from utils.shared import get_mission_archive, get_mission_rollups
 
-    for date in dates[-30:]:  # Last 30 days
-        daily_missions = np.random.poisson(8)  # Average 8 missions per day
-        success_rate = np.random.normal(94, 3)  # 94% average success rate
-        avg_delivery_time = np.random.normal(12, 2)  # 12 min average
+# KPIs compare the last 30 days with the 30 days before
+KPI_WINDOW_DAYS = 30
+TREND_DAYS = 30
+WEEKLY_WEEKS = 5
+# Default range of the mission history section
+HISTORY_DAYS = 365
 
-        missions_data.append({
-            'date': date,
-            'missions_completed': daily_missions,
-            'missions_failed': max(0, int(daily_missions * (1 - success_rate/100))),
-            'success_rate': max(85, min(99, success_rate)),
-            'avg_delivery_time': max(8, avg_delivery_time),
-            'medical_supplies_delivered': np.random.poisson(15),
-            'distance_covered': np.random.normal(180, 30)
-        })
-
-    return pd.DataFrame(missions_data)
-
-mission_df = generate_mission_data()
+rollups = get_mission_rollups()
+mission_df = rollups.daily(TREND_DAYS)
+current = rollups.totals(KPI_WINDOW_DAYS)
+previous = rollups.totals(KPI_WINDOW_DAYS, end=date.today() - timedelta(days=KPI_WINDOW_DAYS))
 
 # Key Performance Indicators
 st.subheader("🎯 Key Performance Indicators")
@@ -43,20 +34,22 @@ st.subheader("🎯 Key Performance Indicators")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_missions = mission_df['missions_completed'].sum()
-    st.metric("🎯 Total Missions (30d)", total_missions, f"+{np.random.randint(5, 15)}")
+    total_missions = current['missions_completed']
+    st.metric("🎯 Total Missions (30d)", total_missions, f"{total_missions - previous['missions_completed']:+d}")
 
 with col2:
-    avg_success_rate = mission_df['success_rate'].mean()
-    st.metric("✅ Success Rate", f"{avg_success_rate:.1f}%", f"+{np.random.uniform(0.5, 2.0):.1f}%")
+    avg_success_rate = current['success_rate']
+    success_change = avg_success_rate - previous['success_rate'] if previous['missions_completed'] else 0.0
+    st.metric("✅ Success Rate", f"{avg_success_rate:.1f}%", f"{success_change:+.1f}%")
 
 with col3:
-    avg_delivery_time = mission_df['avg_delivery_time'].mean()
-    st.metric("⏱️ Avg Delivery Time", f"{avg_delivery_time:.1f} min", f"-{np.random.uniform(0.2, 1.0):.1f} min")
+    avg_delivery_time = current['avg_delivery_time']
+    time_change = avg_delivery_time - previous['avg_delivery_time'] if previous['missions_completed'] else 0.0
+    st.metric("⏱️ Avg Delivery Time", f"{avg_delivery_time:.1f} min", f"{time_change:+.1f} min", delta_color="inverse")
 
 with col4:
-    total_supplies = mission_df['medical_supplies_delivered'].sum()
-    st.metric("📦 Supplies Delivered", total_supplies, f"+{np.random.randint(10, 30)}")
+    total_supplies = current['medical_supplies_delivered']
+    st.metric("📦 Supplies Delivered", total_supplies, f"{total_supplies - previous['medical_supplies_delivered']:+d}")
 
 # Mission Performance Charts
 col_left, col_right = st.columns(2)
@@ -76,7 +69,8 @@ with col_left:
     st.plotly_chart(fig_missions, use_container_width=True)
 
     # Success rate gauge
-    current_success_rate = mission_df['success_rate'].iloc[-1]
+    daily_rates = mission_df['success_rate'].dropna()
+    current_success_rate = daily_rates.iloc[-1] if len(daily_rates) else 0.0
 
     fig_gauge = go.Figure(go.Indicator(
         mode = "gauge+number+delta",
@@ -119,8 +113,8 @@ with col_right:
     success_data = pd.DataFrame({
         'Status': ['Successful', 'Failed'],
         'Count': [
-            mission_df['missions_completed'].sum() - mission_df['missions_failed'].sum(),
-            mission_df['missions_failed'].sum()
+            current['missions_completed'] - current['missions_failed'],
+            current['missions_failed']
         ]
     })
 
@@ -152,12 +146,7 @@ with col_a:
 
 with col_b:
     # Weekly performance comparison
-    mission_df['week'] = mission_df['date'].dt.isocalendar().week
-    weekly_data = mission_df.groupby('week').agg({
-        'missions_completed': 'sum',
-        'success_rate': 'mean',
-        'avg_delivery_time': 'mean'
-    }).reset_index()
+    weekly_data = rollups.weekly(WEEKLY_WEEKS)
 
     fig_weekly = px.bar(
         weekly_data,
@@ -169,28 +158,71 @@ with col_b:
     )
     st.plotly_chart(fig_weekly, use_container_width=True)
 
-# Mission Details Table
-st.subheader("📋 Recent Mission Details")
+# Mission history from the Parquet archive; only the partitions in range are read
+st.subheader("🗓️ Mission History")
 
-# Generate recent missions
-recent_missions = []
-for i in range(20):
-    mission_time = datetime.now() - timedelta(hours=i)
-    recent_missions.append({
-        'mission_id': f'M-{2024001 + i:06d}',
-        'drone_id': f'LLA-{np.random.randint(1, 15):03d}',
-        'start_time': mission_time,
-        'end_time': mission_time + timedelta(minutes=np.random.randint(8, 25)),
-        'destination': f'Zone {np.random.choice(["Alpha", "Beta", "Gamma", "Delta"])}',
-        'cargo': np.random.choice(['Blood Pack', 'Emergency Kit', 'Medications', 'Vaccines', 'IV Fluids']),
-        'status': np.random.choice(['Completed', 'In Progress', 'Failed'], p=[0.85, 0.10, 0.05]),
-        'distance': f'{np.random.uniform(5, 25):.1f} km'
-    })
+archive = get_mission_archive()
+archived = archive.date_range()
+if archived is None:
+    st.info("The mission archive is empty. Seed it with `python -m utils.mission_archive seed`.")
+    archived = (date.today(), date.today())
+history_end = min(archived[1], date.today())
+history_start = max(archived[0], history_end - timedelta(days=HISTORY_DAYS - 1))
+
+col_range, col_zones = st.columns([1, 1])
+
+with col_range:
+    history_range = st.date_input("Date Range", (history_start, history_end),
+                                  min_value=archived[0], max_value=archived[1], key="history_range")
+
+with col_zones:
+    history_zones = st.multiselect("Zones", ZONES, default=ZONES, key="history_zones")
+
+# The picker returns a single date while the second one is being chosen
+if len(history_range) == 2:
+    history_start, history_end = history_range
+zones = history_zones if len(history_zones) < len(ZONES) else None
+
+history_df = archive.daily(history_start, history_end, zones=zones)
+history_missions = int(history_df['missions_completed'].sum())
+history_failed = int(history_df['missions_failed'].sum())
 
-missions_df = pd.DataFrame(recent_missions)
+col_h1, col_h2, col_h3, col_h4 = st.columns(4)
+
+with col_h1:
+    st.metric("🎯 Missions", history_missions)
+
+with col_h2:
+    history_rate = (history_missions - history_failed) / history_missions * 100 if history_missions else 0.0
+    st.metric("✅ Success Rate", f"{history_rate:.1f}%")
+
+with col_h3:
+    history_time = (history_df['avg_delivery_time'] * history_df['missions_completed']).sum()
+    st.metric("⏱️ Avg Delivery Time", f"{history_time / history_missions if history_missions else 0.0:.1f} min")
+
+with col_h4:
+    st.metric("📦 Supplies Delivered", int(history_df['medical_supplies_delivered'].sum()))
+
+fig_history = px.line(
+    history_df,
+    x='date',
+    y='missions_completed',
+    title='Daily Mission Completions',
+    labels={'missions_completed': 'Missions', 'date': 'Date'}
+)
+fig_history.update_traces(line_color='#4ECDC4')
+st.plotly_chart(fig_history, use_container_width=True)
+
+# Mission Details Table
+st.subheader("📋 Recent Mission Details")
 
-# Calculate duration
-missions_df['duration'] = (missions_df['end_time'] - missions_df['start_time']).dt.total_seconds() / 60
+# Latest missions in the selected range and zones
+missions_df = archive.missions(history_start, history_end, zones=zones, limit=20)
+missions_df['start_time'] = missions_df['completed_at'] - pd.to_timedelta(missions_df['delivery_minutes'], unit='m')
+missions_df['duration'] = missions_df['delivery_minutes']
+missions_df['destination'] = 'Zone ' + missions_df['zone']
+missions_df['status'] = np.where(missions_df['success'], 'Completed', 'Failed')
+missions_df['distance'] = missions_df['distance_km'].map('{:.1f} km'.format)
 
 column_config = {
     "mission_id": "Mission ID",
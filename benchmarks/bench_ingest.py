@@ -0,0 +1,143 @@
+"""Telemetry ingest throughput with the dashboard's full sink chain
+
+Starts a TelemetryIngestService wired like utils.shared.get_telemetry_service
+(fleet store, flight series, geofence, ETA and cold-chain sinks) and floods
+it with UDP frames from a separate sender process at a target rate. Routes
+and cold-chain deliveries are registered for a share of the drones so every
+sink does real work. Reports, per run:
+
+* frames sent, stored and dropped, and the stored rate,
+* wall time per 1k frames of the store write (on the event loop) and of each
+  sink (on the sink worker thread),
+* ingest lag at the end of the run.
+
+Frames the kernel dropped before the service read them show up as sent
+but not received.
+
+    python benchmarks/bench_ingest.py                         # 500 drones, 20k frames/s, 10 s
+    python benchmarks/bench_ingest.py --drones 2000 --rate 40000
+
+Exits non-zero when frames are lost or dropped, or a sink fails.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from utils.telemetry import FRAME_SIZE, FRAMES_PER_DATAGRAM, TelemetrySimulator  # noqa: E402
+
+# Share of drones flying a routed delivery with a payload sensor
+ROUTED_SHARE = 0.5
+
+
+def send(drone_ids, port, rate, duration, ready, sent):
+    """Sender process: every drone reports rate / len(drone_ids) times a second"""
+    # Routed drones carry 2-8°C cargo, the rest no payload sensor
+    setpoints = np.full(len(drone_ids), np.nan)
+    setpoints[:int(len(drone_ids) * ROUTED_SHARE)] = 5.0
+
+    async def run():
+        simulator = TelemetrySimulator(drone_ids, port=port, rate_hz=rate / len(drone_ids),
+                                       payload_setpoints=lambda _: setpoints, seed=1)
+        ready.set()
+        await simulator.run(duration)
+        return simulator.frames_sent
+
+    sent.value = asyncio.run(run())
+
+
+def timed(name, sink, clock):
+    def apply(frames):
+        started = time.perf_counter()
+        sink(frames)
+        clock[name] += time.perf_counter() - started
+    apply.__name__ = name
+    return apply
+
+
+def build_service(drone_count, clock):
+    from utils.alerts import AlertManager
+    from utils.cold_chain import ColdChainMonitor, cold_chain_sink
+    from utils.drone_data import BASE_LAT, BASE_LON, DroneDataManager
+    from utils.eta import EtaEngine, eta_sink
+    from utils.geofence import DEMO_ZONES, GeofenceEngine, geofence_sink
+    from utils.telemetry import TelemetryIngestService, TelemetryStore, fleet_sink
+    from utils.timeseries import TimeSeriesStore
+
+    drone_manager = DroneDataManager(fleet_size=drone_count, seed=0)
+    drone_ids = drone_manager.drone_ids().tolist()
+    alert_manager = AlertManager()
+    geofence = GeofenceEngine()
+    geofence.load(DEMO_ZONES)
+    eta_engine = EtaEngine()
+    cold_chain = ColdChainMonitor(alert_manager)
+
+    rng = np.random.default_rng(0)
+    for i, drone_id in enumerate(drone_ids[:int(drone_count * ROUTED_SHARE)]):
+        lat, lon = BASE_LAT + rng.uniform(-0.05, 0.05), BASE_LON + rng.uniform(-0.05, 0.05)
+        eta_engine.set_route(drone_id, [BASE_LAT, lat], [BASE_LON, lon], key=f'DEL-{i}')
+        cold_chain.track(f'DEL-{i}', drone_id, '2-8°C')
+
+    store = TelemetryStore()
+    sinks = [
+        ('fleet', fleet_sink(drone_manager)),
+        ('flight_series', TimeSeriesStore().ingest),
+        ('geofence', geofence_sink(geofence, alert_manager)),
+        ('eta', eta_sink(eta_engine)),
+        ('cold_chain', cold_chain_sink(cold_chain)),
+    ]
+    ingest = store.ingest
+    store.ingest = timed('store', ingest, clock)
+    service = TelemetryIngestService(store, udp_port=0, tcp_port=None,
+                                     sinks=[timed(name, sink, clock) for name, sink in sinks])
+    return service, drone_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drones', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=20_000, help="target frames per second")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of sending")
+    args = parser.parse_args(argv)
+
+    clock = defaultdict(float)
+    service, drone_ids = build_service(args.drones, clock)
+    service.start_in_thread()
+
+    ready, sent = multiprocessing.Event(), multiprocessing.Value('q', 0)
+    sender = multiprocessing.Process(target=send, args=(drone_ids, service.udp_port, args.rate, args.duration,
+                                                        ready, sent))
+    sender.start()
+    ready.wait(timeout=30)
+    started = time.perf_counter()
+    sender.join()
+    elapsed = time.perf_counter() - started
+    time.sleep(0.5)  # let the last flush land
+
+    stats = service.stats()
+    stored, dropped = stats['frames_stored'], stats['frames_dropped']
+    rate = stored / elapsed
+    print(f"{args.drones} drones, target {args.rate:,.0f} frames/s, {FRAMES_PER_DATAGRAM} frames "
+          f"({FRAMES_PER_DATAGRAM * FRAME_SIZE} B) per datagram")
+    print(f"sent {sent.value:,}  received {stats['frames_received']:,}  stored {stored:,}  "
+          f"dropped {dropped:,}  batches {stats['batches']:,}  sink errors {stats['sink_errors']}")
+    print(f"stored rate {rate:,.0f} frames/s, ingest lag {stats['ingest_lag_s'] * 1000:.1f} ms")
+    print("time per 1k frames:")
+    per_k = 1000 / max(stored, 1)
+    for name, seconds in sorted(clock.items(), key=lambda item: -item[1]):
+        print(f"  {name:<14}{seconds * per_k * 1000:8.3f} ms  ({seconds / elapsed:.0%} of the run)")
+
+    lost = sent.value - stats['frames_received']
+    return 1 if lost or dropped or stats['sink_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
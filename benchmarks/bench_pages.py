@@ -0,0 +1,278 @@
+"""Headless page-rendering benchmarks
+
+Runs every dashboard page with Streamlit's AppTest against simulated fleets
+of several sizes and reports, per page and fleet size:
+
+* cold wall time (first run: imports, shared managers, seeded data),
+* warm wall time (median of the following reruns),
+* peak resident memory of the process,
+* time per section: the main dashboard's live sections, and on the other
+  pages the stretch between one heading (st.title/header/subheader) and
+  the next.
+
+Each (page, fleet size) pair runs in its own interpreter so memory and
+st.cache_resource state never leak between measurements. Live telemetry is
+switched off; pages fall back to their simulated data. Mission_Analytics
+reads a two-year mission archive seeded, before any measurement, into a
+temporary directory with a fixed random seed (or the archive at
+LIFELINE_MISSION_ARCHIVE when that is set).
+
+    python benchmarks/bench_pages.py                      # compare against baselines.json
+    python benchmarks/bench_pages.py --sizes 15 500 --pages Fleet_Dashboard
+    python benchmarks/bench_pages.py --save-baseline      # record new baselines
+
+Exits non-zero when a measurement regresses past the tolerances, or a page
+raises or times out.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINES = Path(__file__).resolve().parent / 'baselines.json'
+
+PAGES = (
+    'streamlit_app',
+    'Fleet_Dashboard',
+    'Flight_Tracking',
+    'Maintenance',
+    'Medical_Cargo',
+    'Mission_Analytics',
+    'Settings',
+)
+FLEET_SIZES = (15, 500, 5_000, 50_000)
+
+# A measurement regresses when it exceeds baseline * (1 + tolerance) + slack
+TIME_TOLERANCE = 0.25
+TIME_SLACK = 0.05  # seconds
+COLD_SLACK = 0.5  # seconds; first runs are dominated by imports and disk cache
+MEMORY_TOLERANCE = 0.15
+MEMORY_SLACK = 20.0  # MB
+
+HEADINGS = ('title', 'header', 'subheader')
+PAGE_SETUP = '(page setup)'
+
+
+class SectionClock:
+    """Accumulates time per section from heading marks and explicit records"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._current = None
+        self._started = None
+
+    def mark(self, name):
+        now = time.perf_counter()
+        if self._current is not None:
+            self.totals[self._current] += now - self._started
+        self._current, self._started = name, now
+
+    def record(self, name, seconds):
+        self.totals[f"section: {name}"] += seconds
+
+    def start(self):
+        self.totals.clear()
+        self.mark(PAGE_SETUP)
+
+    def stop(self):
+        self.mark(None)
+        return dict(self.totals)
+
+
+def _install_heading_marks(clock):
+    """Mark a new section whenever a page draws a heading"""
+    import streamlit as st
+
+    for name in HEADINGS:
+        draw = getattr(st, name)
+
+        def marked(body, *args, _draw=draw, **kwargs):
+            clock.mark(str(body))
+            return _draw(body, *args, **kwargs)
+
+        setattr(st, name, marked)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def measure_page(page, runs, timeout):
+    """Render one page in this process and return its measurements"""
+    from streamlit.testing.v1 import AppTest
+
+    from utils import profiling
+
+    clock = SectionClock()
+    _install_heading_marks(clock)
+    profiling.set_recorder(clock.record)
+
+    app = AppTest.from_file(str(ROOT / f"{page}.py"), default_timeout=timeout)
+    app.session_state['authenticated'] = True
+    app.session_state['username'] = 'benchmark'
+
+    result = {'page': page, 'fleet_size': int(os.environ['LIFELINE_FLEET_SIZE'])}
+    timings, sections = [], defaultdict(list)
+    for i in range(runs + 1):
+        clock.start()
+        started = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - started
+        run_sections = clock.stop()
+
+        if app.exception:
+            result['error'] = app.exception[0].message
+            return result
+        if i == 0:
+            result['cold_s'] = elapsed
+            continue
+        timings.append(elapsed)
+        for name, seconds in run_sections.items():
+            sections[name].append(seconds)
+
+    result['warm_s'] = statistics.median(timings)
+    result['peak_rss_mb'] = _peak_rss_mb()
+    result['sections'] = {name: statistics.median(values) for name, values in sections.items()}
+    return result
+
+
+def run_isolated(page, fleet_size, runs, timeout):
+    """Measure a page in a fresh interpreter with the given fleet size"""
+    env = dict(
+        os.environ,
+        LIFELINE_FLEET_SIZE=str(fleet_size),
+        LIFELINE_TELEMETRY='0',
+        PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])),
+    )
+    cmd = [sys.executable, __file__, '--worker', page, '--runs', str(runs), '--timeout', str(timeout)]
+    try:
+        proc = subprocess.run(cmd, env=env, cwd=ROOT, capture_output=True, text=True,
+                              timeout=timeout * (runs + 1) + 60)
+    except subprocess.TimeoutExpired:
+        return {'page': page, 'fleet_size': fleet_size, 'error': 'timed out'}
+
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        error = proc.stderr.strip().splitlines()[-1:] or [f'exit status {proc.returncode}']
+        return {'page': page, 'fleet_size': fleet_size, 'error': error[0]}
+    return json.loads(lines[-1])
+
+
+def seed_archive(root):
+    """Seed a reproducible simulated mission history at ``root``"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    subprocess.run([sys.executable, '-m', 'utils.mission_archive', 'seed', '--root', str(root), '--seed', '0'],
+                   env=env, cwd=ROOT, check=True, capture_output=True)
+
+
+def find_regressions(results, baselines):
+    """Human-readable regressions of ``results`` against stored baselines"""
+    regressions = []
+    for result in results:
+        label = f"{result['page']} @ {result['fleet_size']}"
+        if 'error' in result:
+            regressions.append(f"{label}: {result['error']}")
+            continue
+
+        base = baselines.get(result['page'], {}).get(str(result['fleet_size']))
+        if base is None:
+            continue
+        for key, tolerance, slack, unit in (
+            ('cold_s', TIME_TOLERANCE, COLD_SLACK, 's'),
+            ('warm_s', TIME_TOLERANCE, TIME_SLACK, 's'),
+            ('peak_rss_mb', MEMORY_TOLERANCE, MEMORY_SLACK, ' MB'),
+        ):
+            limit = base[key] * (1 + tolerance) + slack
+            if result[key] > limit:
+                regressions.append(
+                    f"{label}: {key} {result[key]:.2f}{unit} > {limit:.2f}{unit} (baseline {base[key]:.2f}{unit})"
+                )
+    return regressions
+
+
+def save_baselines(results, path=BASELINES):
+    """Merge results into the baseline file, keyed by page and fleet size"""
+    baselines = json.loads(path.read_text())['pages'] if path.exists() else {}
+    for result in results:
+        if 'error' in result:
+            continue
+        baselines.setdefault(result['page'], {})[str(result['fleet_size'])] = {
+            key: round(result[key], 4) for key in ('cold_s', 'warm_s', 'peak_rss_mb')
+        }
+    path.write_text(json.dumps({
+        'machine': f"{platform.machine()} / {platform.python_implementation()} {platform.python_version()}",
+        'recorded': time.strftime('%Y-%m-%d'),
+        'pages': baselines,
+    }, indent=2, sort_keys=True) + '\n')
+
+
+def print_report(results, top_sections):
+    print(f"{'page':<20}{'fleet':>8}{'cold s':>10}{'warm s':>10}{'peak MB':>10}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['page']:<20}{result['fleet_size']:>8}  ERROR {result['error']}")
+            continue
+        print(f"{result['page']:<20}{result['fleet_size']:>8}{result['cold_s']:>10.3f}"
+              f"{result['warm_s']:>10.3f}{result['peak_rss_mb']:>10.1f}")
+        slowest = sorted(result['sections'].items(), key=lambda item: -item[1])[:top_sections]
+        for name, seconds in slowest:
+            print(f"{'':<28}{seconds * 1000:>9.1f} ms  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pages', nargs='+', default=PAGES, choices=PAGES)
+    parser.add_argument('--sizes', nargs='+', type=int, default=FLEET_SIZES)
+    parser.add_argument('--runs', type=int, default=3, help='warm reruns per page')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds allowed per page run')
+    parser.add_argument('--top-sections', type=int, default=5, help='sections listed per page')
+    parser.add_argument('--output', type=Path, help='write the raw results as JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='record results as the new baselines')
+    parser.add_argument('--worker', choices=PAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure_page(args.worker, args.runs, args.timeout)))
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='lifeline-bench-') as scratch:
+        if 'Mission_Analytics' in args.pages and 'LIFELINE_MISSION_ARCHIVE' not in os.environ:
+            archive = Path(scratch) / 'missions'
+            seed_archive(archive)
+            os.environ['LIFELINE_MISSION_ARCHIVE'] = str(archive)
+        for fleet_size in args.sizes:
+            for page in args.pages:
+                results.append(run_isolated(page, fleet_size, args.runs, args.timeout))
+    print_report(results, args.top_sections)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n')
+    if args.save_baseline:
+        save_baselines(results)
+        print(f"\nBaselines written to {BASELINES.relative_to(ROOT)}")
+        return 0
+
+    baselines = json.loads(BASELINES.read_text())['pages'] if BASELINES.exists() else {}
+    regressions = find_regressions(results, baselines)
+    if regressions:
+        print('\nRegressions:')
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
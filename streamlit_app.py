@@ -6,10 +6,9 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
 import json
-from utils.drone_data import DroneDataManager
-from utils.medical_supplies import MedicalSupplyManager
-from utils.alerts import AlertManager
-from utils.authentication import authenticate_user
+from utils.authentication import authenticate_user, load_operators
+from utils.shared import get_alert_manager, get_fleet_snapshot, get_telemetry_service, init_session_views
+from utils.refresh import live_section, data_version
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -123,12 +122,21 @@ if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'username' not in st.session_state:
     st.session_state.username = ""
-if 'drone_manager' not in st.session_state:
-    st.session_state.drone_manager = DroneDataManager()
-if 'medical_manager' not in st.session_state:
-    st.session_state.medical_manager = MedicalSupplyManager()
-if 'alert_manager' not in st.session_state:
-    st.session_state.alert_manager = AlertManager()
+
+# Read-only views of the process-wide drone, medical and alert managers
+init_session_views()
+
+# Alert groups rendered in the critical alerts section; the rest are summarized as a count
+ALERT_DISPLAY_LIMIT = 5
+
+# Refresh interval (seconds) of each dashboard section while auto refresh is on
+SECTION_REFRESH = {
+    'critical_alerts': 5,
+    'key_metrics': 5,
+    'fleet_overview': 10,
+    'mission_analytics': 30,
+    'recent_activities': 10,
+}
 
 def main():
     # Authentication check
@@ -166,7 +174,7 @@ def main():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🚨 Emergency", use_container_width=True):
-                st.session_state.alert_manager.create_emergency_alert()
+                get_alert_manager().create_emergency_alert()
                 st.success("Emergency protocol activated!")
 
         with col2:
@@ -179,7 +187,7 @@ def main():
         auto_refresh = st.toggle("🔄 Auto Refresh", value=True)
 
         if auto_refresh:
-            st.markdown("*Refreshing every 5 seconds*")
+            st.markdown("*Sections refresh when their data changes*")
 
         # System status
         st.markdown("### 🔧 System Status")
@@ -189,6 +197,15 @@ def main():
             status_color = "🟢" if status == "OK" else "🔴"
             st.markdown(f"{status_color} {component}: {status}")
 
+        # Telemetry ingest counters
+        with st.expander("📡 Telemetry Ingest"):
+            ingest = get_telemetry_service().stats()
+            st.markdown(f"**Frames stored:** {ingest['frames_stored']:,}")
+            st.markdown(f"**Frames dropped:** {ingest['frames_dropped']:,}")
+            st.markdown(f"**Backlog:** {ingest['pending_frames']:,} / {ingest['max_pending_frames']:,}")
+            st.markdown(f"**Senders paused:** {ingest['tcp_pauses']:,} times")
+            st.markdown(f"**Ingest lag:** {ingest['ingest_lag_s']:.2f}s")
+
         # Logout button
         st.markdown("---")
         if st.button("🚪 Logout", use_container_width=True):
@@ -196,12 +213,7 @@ def main():
             st.rerun()
 
     # Main dashboard content
-    display_main_dashboard()
-
-    # Auto-refresh mechanism
-    if auto_refresh:
-        time.sleep(5)
-        st.rerun()
+    display_main_dashboard(auto_refresh)
 
 def show_login():
     """Display login interface"""
@@ -216,6 +228,9 @@ def show_login():
         </div>
         """, unsafe_allow_html=True)
 
+        if not load_operators():
+            st.warning("No operators are configured. Set LIFELINE_OPERATORS to enable login.")
+
         with st.form("login_form"):
             username = st.text_input("👤 Username", placeholder="Enter your username")
             password = st.text_input("🔒 Password", type="password", placeholder="Enter your password")
@@ -234,29 +249,57 @@ def show_login():
                 else:
                     st.error("❌ Invalid credentials. Please try again.")
 
-def display_main_dashboard():
-    """Display the main dashboard content"""
+def display_main_dashboard(auto_refresh=True):
+    """Display the main dashboard content
+
+    Every section is a fragment on its own timer and only reloads its data
+    when the manager versions it depends on have changed.
+    """
+    drone_manager = st.session_state.drone_manager
+    medical_manager = st.session_state.medical_manager
+    alert_manager = st.session_state.alert_manager
+
+    def run_every(section):
+        return SECTION_REFRESH[section] if auto_refresh else None
 
     # Critical alerts section
-    display_critical_alerts()
+    live_section('critical_alerts', display_critical_alerts, load_critical_alerts,
+                 depends_on=lambda: data_version(alert_manager),
+                 run_every=run_every('critical_alerts'), shared=True)
 
     # Main metrics
-    display_key_metrics()
+    live_section('key_metrics', display_key_metrics, load_key_metrics,
+                 depends_on=lambda: data_version(drone_manager, medical_manager),
+                 run_every=run_every('key_metrics'), shared=True)
 
-    # Fleet status overview
-    display_fleet_overview()
+    # Fleet status overview; the snapshot cache decides when it is rebuilt, so
+    # every tick takes its current copy rather than keying on this process's version
+    live_section('fleet_overview', display_fleet_overview, load_fleet_overview,
+                 run_every=run_every('fleet_overview'))
 
     # Mission analytics
-    display_mission_analytics()
+    live_section('mission_analytics', display_mission_analytics, load_mission_analytics,
+                 depends_on=lambda: data_version(drone_manager),
+                 run_every=run_every('mission_analytics'), shared=True)
 
     # Recent activities
-    display_recent_activities()
+    live_section('recent_activities', display_recent_activities, load_recent_activities,
+                 depends_on=lambda: data_version(alert_manager),
+                 run_every=run_every('recent_activities'), shared=True)
+
+def load_critical_alerts():
+    """Fetch the top alert groups and the active alert counts"""
+    alert_manager = st.session_state.alert_manager
+    return {
+        'alerts': alert_manager.get_active_alerts(limit=ALERT_DISPLAY_LIMIT),
+        'counts': alert_manager.get_alert_counts(),
+    }
 
-def display_critical_alerts():
+def display_critical_alerts(payload):
     """Display critical system alerts"""
     st.markdown("### 🚨 Critical Alerts")
 
-    alerts = st.session_state.alert_manager.get_active_alerts()
+    alerts, counts = payload['alerts'], payload['counts']
 
     if not alerts:
         st.success("✅ All systems operational - No critical alerts")
@@ -265,23 +308,38 @@ def display_critical_alerts():
     for alert in alerts:
         alert_class = f"alert-{alert['severity'].lower()}"
         icon = {"critical": "🚨", "warning": "⚠️", "info": "ℹ️"}[alert['severity'].lower()]
+        repeats = f" ×{alert['count']}" if alert['count'] > 1 else ""
 
         st.markdown(f"""
         <div class="{alert_class}">
-            <strong>{icon} {alert['title']}</strong><br>
+            <strong>{icon} {alert['title']}{repeats}</strong><br>
             {alert['message']}<br>
             <small>🕐 {alert['timestamp'].strftime('%H:%M:%S')} | 📍 {alert.get('location', 'System')}</small>
         </div>
         """, unsafe_allow_html=True)
 
-def display_key_metrics():
+    hidden = counts['total'] - len(alerts)
+    if hidden > 0:
+        st.caption(
+            f"+{hidden} more active alert groups "
+            f"({counts['Critical']} critical, {counts['Warning']} warning, {counts['Info']} info in total)"
+        )
+
+def load_key_metrics():
+    """Fetch fleet, inventory and mission headline numbers"""
+    return {
+        'fleet': st.session_state.drone_manager.get_fleet_overview(),
+        'medical': st.session_state.medical_manager.get_inventory_overview(),
+        'mission': st.session_state.drone_manager.get_mission_stats(),
+    }
+
+def display_key_metrics(metrics):
     """Display key performance metrics"""
     col1, col2, col3, col4 = st.columns(4)
 
-    # Get real-time data
-    fleet_data = st.session_state.drone_manager.get_fleet_overview()
-    medical_data = st.session_state.medical_manager.get_inventory_overview()
-    mission_data = st.session_state.drone_manager.get_mission_stats()
+    fleet_data = metrics['fleet']
+    medical_data = metrics['medical']
+    mission_data = metrics['mission']
 
     with col1:
         st.metric(
@@ -315,15 +373,16 @@ def display_key_metrics():
             delta_color="inverse"
         )
 
-def display_fleet_overview():
+def load_fleet_overview():
+    """Fetch the fleet table and status counts"""
+    return get_fleet_snapshot()
+
+def display_fleet_overview(overview):
     """Display fleet status overview"""
     st.markdown("### 🚁 Fleet Status Overview")
 
-    # Get fleet data
-    fleet_status = st.session_state.drone_manager.get_detailed_fleet_status()
-
-    # Create DataFrame for display
-    df = pd.DataFrame(fleet_status)
+    # Fleet table, already a DataFrame built from the columnar store
+    df = overview['fleet']
 
     # Custom column configuration
     column_config = {
@@ -355,109 +414,115 @@ def display_fleet_overview():
     )
 
     # Fleet statistics
+    status_counts = overview['status_counts']
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        active_count = len([d for d in fleet_status if d['status'] == 'Active'])
-        st.metric("🟢 Active", active_count)
+        st.metric("🟢 Active", status_counts['Active'])
 
     with col2:
-        charging_count = len([d for d in fleet_status if d['status'] == 'Charging'])
-        st.metric("🟡 Charging", charging_count)
+        st.metric("🟡 Charging", status_counts['Charging'])
 
     with col3:
-        maintenance_count = len([d for d in fleet_status if d['status'] == 'Maintenance'])
-        st.metric("🔴 Maintenance", maintenance_count)
+        st.metric("🔴 Maintenance", status_counts['Maintenance'])
+
+def load_mission_analytics():
+    """Build the mission performance charts"""
+    drone_manager = st.session_state.drone_manager
+
+    # Mission success rate gauge
+    success_rate = drone_manager.get_success_rate()
+
+    fig_gauge = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=success_rate,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Mission Success Rate (%)"},
+        delta={'reference': 95, 'position': "top"},
+        gauge={
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "darkgreen"},
+            'steps': [
+                {'range': [0, 80], 'color': "lightgray"},
+                {'range': [80, 90], 'color': "yellow"},
+                {'range': [90, 100], 'color': "lightgreen"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 95
+            }
+        }
+    ))
+    fig_gauge.update_layout(height=300)
+
+    # Delivery time trends
+    delivery_data = drone_manager.get_delivery_trends()
+
+    fig_line = px.line(
+        delivery_data,
+        x='date',
+        y='avg_delivery_time',
+        title='Average Delivery Time Trend (7 days)',
+        labels={'avg_delivery_time': 'Delivery Time (minutes)', 'date': 'Date'}
+    )
+    fig_line.update_traces(line_color='#4ECDC4', line_width=3)
+    fig_line.update_layout(height=300)
 
-def display_mission_analytics():
+    # Mission distribution pie chart
+    mission_types = drone_manager.get_mission_distribution()
+
+    fig_pie = px.pie(
+        values=list(mission_types.values()),
+        names=list(mission_types.keys()),
+        title="Mission Type Distribution"
+    )
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    fig_pie.update_layout(height=300)
+
+    # Battery status distribution
+    battery_data = drone_manager.get_battery_distribution()
+
+    fig_bar = px.bar(
+        x=list(battery_data.keys()),
+        y=list(battery_data.values()),
+        title="Fleet Battery Status",
+        labels={'x': 'Battery Level', 'y': 'Number of Drones'}
+    )
+    fig_bar.update_traces(marker_color='#FF6B6B')
+    fig_bar.update_layout(height=300)
+
+    return {'gauge': fig_gauge, 'trend': fig_line, 'missions': fig_pie, 'battery': fig_bar}
+
+def display_mission_analytics(figures):
     """Display mission performance analytics"""
     st.markdown("### 📊 Mission Performance Analytics")
 
     col1, col2 = st.columns(2)
 
     with col1:
-        # Mission success rate gauge
-        success_rate = st.session_state.drone_manager.get_success_rate()
-
-        fig_gauge = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=success_rate,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "Mission Success Rate (%)"},
-            delta={'reference': 95, 'position': "top"},
-            gauge={
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "darkgreen"},
-                'steps': [
-                    {'range': [0, 80], 'color': "lightgray"},
-                    {'range': [80, 90], 'color': "yellow"},
-                    {'range': [90, 100], 'color': "lightgreen"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 95
-                }
-            }
-        ))
-
-        fig_gauge.update_layout(height=300)
-        st.plotly_chart(fig_gauge, use_container_width=True)
+        st.plotly_chart(figures['gauge'], use_container_width=True)
 
     with col2:
-        # Delivery time trends
-        delivery_data = st.session_state.drone_manager.get_delivery_trends()
-
-        fig_line = px.line(
-            delivery_data,
-            x='date',
-            y='avg_delivery_time',
-            title='Average Delivery Time Trend (7 days)',
-            labels={'avg_delivery_time': 'Delivery Time (minutes)', 'date': 'Date'}
-        )
-
-        fig_line.update_traces(line_color='#4ECDC4', line_width=3)
-        fig_line.update_layout(height=300)
-        st.plotly_chart(fig_line, use_container_width=True)
+        st.plotly_chart(figures['trend'], use_container_width=True)
 
-    # Mission distribution pie chart
     col3, col4 = st.columns(2)
 
     with col3:
-        mission_types = st.session_state.drone_manager.get_mission_distribution()
-
-        fig_pie = px.pie(
-            values=list(mission_types.values()),
-            names=list(mission_types.keys()),
-            title="Mission Type Distribution"
-        )
-
-        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-        fig_pie.update_layout(height=300)
-        st.plotly_chart(fig_pie, use_container_width=True)
+        st.plotly_chart(figures['missions'], use_container_width=True)
 
     with col4:
-        # Battery status distribution
-        battery_data = st.session_state.drone_manager.get_battery_distribution()
-
-        fig_bar = px.bar(
-            x=list(battery_data.keys()),
-            y=list(battery_data.values()),
-            title="Fleet Battery Status",
-            labels={'x': 'Battery Level', 'y': 'Number of Drones'}
-        )
+        st.plotly_chart(figures['battery'], use_container_width=True)
 
-        fig_bar.update_traces(marker_color='#FF6B6B')
-        fig_bar.update_layout(height=300)
-        st.plotly_chart(fig_bar, use_container_width=True)
+def load_recent_activities():
+    """Fetch the last 10 activities"""
+    return st.session_state.alert_manager.get_recent_activities()[-10:]
 
-def display_recent_activities():
+def display_recent_activities(activities):
     """Display recent system activities"""
     st.markdown("### 📝 Recent Activities")
 
-    activities = st.session_state.alert_manager.get_recent_activities()
-
-    for activity in activities[-10:]:  # Show last 10 activities
+    for activity in activities:
         icon = {
             'mission_completed': '✅',
             'drone_deployed': '🚀',
@@ -476,9 +541,17 @@ def display_recent_activities():
 
 def get_system_health():
     """Get overall system health status"""
+    ingest = get_telemetry_service().stats()
+    if not ingest['frames_stored']:
+        gps_tracking = "No Data"
+    elif ingest['senders_paused'] or ingest['ingest_lag_s'] > 5:
+        gps_tracking = "Falling Behind"
+    else:
+        gps_tracking = "OK"
+
     return {
         "Drone Fleet": "OK",
-        "GPS Tracking": "OK", 
+        "GPS Tracking": gps_tracking,
         "Communication": "OK",
         "Medical Inventory": "OK",
         "Weather Service": "OK",
@@ -0,0 +1,77 @@
+"""DroneDataManager writes and the reads that follow them"""
+import numpy as np
+import pytest
+
+from utils.drone_data import STATUSES, DroneDataManager
+
+
+def _bincounted(manager):
+    codes = np.array([STATUSES.index(status) for status in manager.get_detailed_fleet_status()['status']])
+    return dict(zip(STATUSES, np.bincount(codes, minlength=len(STATUSES)).tolist()))
+
+
+@pytest.fixture
+def manager():
+    return DroneDataManager(fleet_size=20, seed=7)
+
+
+def test_update_drone_is_read_back(manager):
+    drone_id = manager.drone_ids()[3]
+    manager.update_drone(drone_id, status='Emergency', battery=12.5, lat=28.7, lon=77.3, timestamp=1000.0)
+    drone = manager.get_drone(drone_id)
+    assert drone['status'] == 'Emergency'
+    assert drone['battery'] == pytest.approx(12.5)
+    assert (drone['lat'], drone['lon']) == (28.7, 77.3)
+    row = manager.get_detailed_fleet_status().set_index('id').loc[drone_id]
+    assert row['status'] == 'Emergency'
+    assert manager.get_status_counts() == _bincounted(manager)
+
+
+def test_update_many_keeps_status_counts(manager):
+    ids = list(manager.drone_ids()[:6])
+    # A drone listed twice ends on its last status and is counted once
+    manager.update_many(ids + [ids[0]], status=['Active'] * 6 + ['Maintenance'],
+                        battery=np.full(7, 50.0))
+    assert manager.get_drone(ids[0])['status'] == 'Maintenance'
+    assert manager.get_drone(ids[1])['status'] == 'Active'
+    assert manager.get_status_counts() == _bincounted(manager)
+    assert sum(manager.get_status_counts().values()) == len(manager)
+
+
+def test_add_drone_is_counted_and_grows_the_store(manager):
+    for i in range(40):
+        manager.add_drone(f"NEW-{i:03d}", status='Active' if i % 2 else 'Maintenance')
+    assert len(manager) == 60
+    assert 'NEW-039' in manager
+    assert manager.get_drone('NEW-039')['status'] == 'Active'
+    assert manager.get_status_counts() == _bincounted(manager)
+    with pytest.raises(ValueError):
+        manager.add_drone('NEW-000')
+
+
+@pytest.mark.parametrize('fields, error', [
+    ({'status': 'Lost'}, ValueError),
+    ({'altitude': 120.0}, KeyError),
+    ({'last_update': 0.0}, KeyError),
+    ({'battery': 10.0, 'colour': 'red'}, KeyError),
+])
+def test_rejected_update_changes_nothing(manager, fields, error):
+    drone_id = manager.drone_ids()[0]
+    before, counts, version = manager.get_drone(drone_id), manager.get_status_counts(), manager.version
+    with pytest.raises(error):
+        manager.update_drone(drone_id, **fields)
+    assert manager.get_drone(drone_id) == before
+    assert manager.get_status_counts() == counts
+    assert manager.version == version
+
+
+def test_unknown_drone_is_rejected(manager):
+    with pytest.raises(KeyError):
+        manager.update_drone('NOPE', battery=10.0)
+
+
+def test_version_moves_on_every_write(manager):
+    version = manager.version
+    manager.update_drone(manager.drone_ids()[0], battery=40.0)
+    manager.update_many(manager.drone_ids()[:2], battery=[1.0, 2.0])
+    assert manager.version == version + 2
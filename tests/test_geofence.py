@@ -0,0 +1,74 @@
+"""Geofence signed distances, checked in km around each zone"""
+import numpy as np
+import pytest
+
+from utils.geo import from_local_km
+from utils.geofence import NEAR_MISS, VIOLATION, GeofenceEngine
+
+REF = (28.6139, 77.2090)
+
+
+def _engine():
+    engine = GeofenceEngine(near_miss_km=0.2, ref=REF)
+    engine.add_circle('C', *from_local_km(0.0, 0.0, *REF), radius_km=1.0)
+    # A 2 km square centred 5 km east of the reference
+    corners = [(4.0, -1.0), (6.0, -1.0), (6.0, 1.0), (4.0, 1.0)]
+    engine.add_polygon('P', [from_local_km(x, y, *REF) for x, y in corners])
+    return engine
+
+
+def _check(engine, points):
+    lat, lon = from_local_km(*np.array(points, dtype=np.float64).T, *REF)
+    index, zone_ids, distances = engine.check_points(lat, lon)
+    return {(int(i), zone_id): distance for i, zone_id, distance in zip(index, zone_ids, distances)}
+
+
+def test_circle_distances_are_signed():
+    hits = _check(_engine(), [(0.0, 0.0), (0.0, 0.5), (1.1, 0.0), (0.0, -1.3)])
+    assert hits[(0, 'C')] == pytest.approx(-1.0, abs=1e-6)
+    assert hits[(1, 'C')] == pytest.approx(-0.5, abs=1e-6)
+    assert hits[(2, 'C')] == pytest.approx(0.1, abs=1e-6)
+    assert (3, 'C') not in hits  # beyond the near-miss margin
+
+
+def test_polygon_distances_are_signed():
+    hits = _check(_engine(), [(5.0, 0.0), (4.2, 0.5), (6.15, 0.0), (5.0, 1.1), (6.1, 1.1), (7.0, 0.0)])
+    assert hits[(0, 'P')] == pytest.approx(-1.0, abs=1e-6)
+    assert hits[(1, 'P')] == pytest.approx(-0.2, abs=1e-6)
+    assert hits[(2, 'P')] == pytest.approx(0.15, abs=1e-6)
+    assert hits[(3, 'P')] == pytest.approx(0.1, abs=1e-6)
+    assert hits[(4, 'P')] == pytest.approx(np.hypot(0.1, 0.1), abs=1e-6)  # nearest to the corner
+    assert (5, 'P') not in hits
+
+
+def test_points_far_from_every_zone_have_no_hits():
+    index, zone_ids, distances = _engine().check_points(*from_local_km(np.array([-20.0, 30.0]),
+                                                                       np.array([0.0, 30.0]), *REF))
+    assert len(index) == len(zone_ids) == len(distances) == 0
+
+
+def test_check_paths_reports_the_deepest_vertex():
+    engine = _engine()
+    lats, lons = from_local_km(np.array([-3.0, -1.1, -0.4, 2.0, 4.1]), np.zeros(5), *REF)
+    hits = engine.check_paths({'LLA-001': (lats.tolist(), lons.tolist())})
+    by_zone = {hit['zone_id']: hit for hit in hits}
+    assert by_zone['C']['kind'] == VIOLATION
+    assert by_zone['C']['vertex'] == 2
+    assert by_zone['C']['distance_km'] == pytest.approx(-0.6, abs=1e-6)
+    assert by_zone['P']['kind'] == VIOLATION
+    assert by_zone['P']['distance_km'] == pytest.approx(-0.1, abs=1e-6)
+    assert [hit['zone_id'] for hit in hits] == ['C', 'P']
+
+
+def test_near_miss_on_a_path():
+    engine = _engine()
+    lats, lons = from_local_km(np.array([2.0, 3.9]), np.zeros(2), *REF)
+    (hit,) = engine.check_paths({'LLA-002': (lats, lons)})
+    assert (hit['zone_id'], hit['kind'], hit['vertex']) == ('P', NEAR_MISS, 1)
+
+
+def test_zone_changes_rebuild_the_table():
+    engine = _engine()
+    assert (0, 'C') in _check(engine, [(0.0, 0.0)])
+    engine.remove_zone('C')
+    assert _check(engine, [(0.0, 0.0)]) == {}
@@ -0,0 +1,102 @@
+"""InventoryLedger balances, snapshot replay and FEFO takes"""
+import numpy as np
+import pytest
+
+from utils.inventory_ledger import PICK, RECEIPT, TRANSFER, InventoryLedger
+
+DAY = 86400.0
+
+
+def _stock(ledger):
+    ledger.receive('Insulin', 'B1', 'Fridge-1', 40, expires_at=10 * DAY)
+    ledger.receive('Insulin', 'B2', 'Fridge-1', 25, expires_at=5 * DAY)
+    ledger.receive('Saline', 'S1', 'Shelf-A', 100)
+    ledger.transfer('Insulin', 'B1', 'Fridge-1', 'Fridge-2', 15)
+    ledger.pick('Saline', 'S1', 'Shelf-A', 30)
+    ledger.write_off('Insulin', 'B2', 'Fridge-1', 5)
+    ledger.append_many([(RECEIPT, 'Saline', 'S2', 'Shelf-B', 60, None, 'PO-7'),
+                        (TRANSFER, 'Saline', 'S2', 'Shelf-B', 20, 'Shelf-A', None),
+                        (PICK, 'Insulin', 'B1', 'Fridge-2', 10, None, 'DEL-1')])
+
+
+def test_balances_follow_events():
+    ledger = InventoryLedger()
+    _stock(ledger)
+    assert len(ledger) == 9
+    assert ledger.balance('Insulin', 'B1', 'Fridge-1') == 25
+    assert ledger.balance('Insulin', 'B1', 'Fridge-2') == 5
+    assert ledger.balance('Insulin', 'B2', 'Fridge-1') == 20
+    assert ledger.balance('Saline', 'S2', 'Shelf-A') == 20
+    assert ledger.total('Insulin') == 50
+    assert ledger.total('Saline') == 130
+    assert ledger.total('Unknown') == 0
+
+
+def test_rejected_batch_writes_nothing():
+    ledger = InventoryLedger()
+    _stock(ledger)
+    version = ledger.version
+    with pytest.raises(ValueError):
+        ledger.append_many([(PICK, 'Saline', 'S1', 'Shelf-A', 10, None, None),
+                            (PICK, 'Saline', 'S1', 'Shelf-A', 100, None, None)])
+    with pytest.raises(ValueError):
+        ledger.pick('Saline', 'S1', 'Nowhere', 1)
+    assert ledger.version == version
+    assert len(ledger) == 9
+    assert ledger.total('Saline') == 130
+
+
+def test_replay_matches_live_balances():
+    ledger = InventoryLedger()
+    _stock(ledger)
+    replayed = ledger.replay()
+    insulin, saline = ledger.sku_code('Insulin'), ledger.sku_code('Saline')
+    assert sum(units for (s, _, _), units in replayed.items() if s == insulin) == 50
+    assert sum(units for (s, _, _), units in replayed.items() if s == saline) == 130
+    assert all(units > 0 for units in replayed.values())
+
+
+def test_replay_as_of_an_earlier_event():
+    ledger = InventoryLedger()
+    _stock(ledger)
+    # Through the first two receipts only
+    assert sorted(ledger.replay(seq=1).values()) == [25, 40]
+    assert ledger.replay(seq=len(ledger) - 1) == ledger.replay()
+
+
+def test_replay_from_snapshots_matches_full_replay():
+    rng = np.random.default_rng(3)
+    snapshotting, plain = InventoryLedger(snapshot_interval=7), InventoryLedger(snapshot_interval=10 ** 9)
+    for ledger in (snapshotting, plain):
+        ledger.receive('Blood O-', 'BL1', 'Cold-1', 500)
+    for i in range(60):
+        units = int(rng.integers(1, 5))
+        for ledger in (snapshotting, plain):
+            if i % 3:
+                ledger.pick('Blood O-', 'BL1', 'Cold-1', units)
+            else:
+                ledger.receive('Blood O-', 'BL1', 'Cold-1', units)
+    snapshotting.snapshot()
+    for seq in (0, 6, 7, 30, 59, 60):
+        assert snapshotting.replay(seq) == plain.replay(seq)
+    assert snapshotting.replay() == plain.replay()
+
+
+def test_take_draws_first_expired_first_out():
+    ledger = InventoryLedger()
+    ledger.receive('Insulin', 'LATE', 'Fridge-1', 10, expires_at=30 * DAY)
+    ledger.receive('Insulin', 'NONE', 'Fridge-1', 10)
+    ledger.receive('Insulin', 'SOON', 'Fridge-2', 10, expires_at=3 * DAY)
+
+    assert ledger.take('Insulin', 15) == [('SOON', 'Fridge-2', 10), ('LATE', 'Fridge-1', 5)]
+    assert ledger.take('Insulin', 20) == [('LATE', 'Fridge-1', 5), ('NONE', 'Fridge-1', 10)]
+    assert ledger.total('Insulin') == 0
+    assert ledger.take('Insulin', 5) == []
+
+
+def test_expiring_skips_emptied_batches():
+    ledger = InventoryLedger()
+    _stock(ledger)
+    assert ledger.expiring(k=5)['batch'].tolist() == ['B2', 'B1']
+    ledger.write_off('Insulin', 'B2', 'Fridge-1', 20)
+    assert ledger.expiring(k=5)['batch'].tolist() == ['B1']
@@ -0,0 +1,65 @@
+"""Snapshot encoding and the shared snapshot cache"""
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from utils.snapshot_cache import InProcessRedis, SnapshotCache, decode_snapshot, encode_snapshot
+
+
+def _frame():
+    return pd.DataFrame({
+        'drone_id': ['LLA-001', 'LLA-002', None, 'LLA-001'],
+        'status': pd.Categorical(['Active', None, 'Charging', 'Active'],
+                                 categories=['Active', 'Charging', 'Maintenance']),
+        'battery': np.array([80.5, 12.0, np.nan, 99.0], dtype=np.float32),
+        'cycles': np.array([3, 0, 7, 1], dtype=np.int64),
+        'last_update': pd.to_datetime(['2026-01-01 10:00', '2026-01-01 10:01', '2026-01-01 10:02',
+                                       '2026-01-01 10:03']),
+    })
+
+
+def test_round_trip_keeps_frames_and_values():
+    payload = {'fleet': _frame(), 'status_counts': {'Active': np.int64(2), 'Charging': 1},
+               'mean': np.float32(0.5)}
+    decoded, version, created_at = decode_snapshot(encode_snapshot(payload, version=4, created_at=123.0))
+    assert (version, created_at) == (4, 123.0)
+    tm.assert_frame_equal(decoded['fleet'], payload['fleet'])
+    assert decoded['status_counts'] == {'Active': 2, 'Charging': 1}
+    assert decoded['mean'] == 0.5
+
+
+def test_round_trip_keeps_missing_labels():
+    decoded, _, _ = decode_snapshot(encode_snapshot({'fleet': _frame()}))
+    assert decoded['fleet']['drone_id'].tolist() == ['LLA-001', 'LLA-002', None, 'LLA-001']
+    assert decoded['fleet']['status'].isna().tolist() == [False, True, False, False]
+    assert decoded['fleet']['status'].cat.categories.tolist() == ['Active', 'Charging', 'Maintenance']
+
+
+def test_empty_frame_round_trips():
+    empty = _frame().iloc[:0]
+    decoded, _, _ = decode_snapshot(encode_snapshot({'fleet': empty}))
+    assert list(decoded['fleet'].columns) == list(empty.columns)
+    assert decoded['fleet'].empty
+
+
+def test_decode_rejects_foreign_bytes():
+    try:
+        decode_snapshot(b'not a snapshot')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("foreign bytes decoded")
+
+
+def test_get_or_compute_reuses_until_invalidated():
+    cache = SnapshotCache(InProcessRedis())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'fleet': _frame(), 'computed': len(calls)}
+
+    assert cache.get_or_compute('fleet', compute, max_age=60)['computed'] == 1
+    assert cache.get_or_compute('fleet', compute, max_age=60)['computed'] == 1
+    cache.invalidate('fleet')
+    assert cache.get_or_compute('fleet', compute, max_age=60)['computed'] == 2
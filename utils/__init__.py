@@ -0,0 +1 @@
+"""Shared data managers and services for the Life-Line Air dashboard"""
@@ -0,0 +1,234 @@
+"""System alerts and activity feed for the Life-Line Air dashboard
+
+Alerts are grouped by a dedup key: a repeat of an active alert (say, the
+hundredth drone crossing the low-battery threshold) folds into the existing
+group instead of adding a row. Groups sit in a min-heap ordered by severity
+and recency, so the dashboard can ask for the top k without sorting every
+active alert. Repeats inside the rate-limit window only bump the group's
+count; they do not re-rank it, log an activity or trigger a redraw.
+
+New activities are handed to ``activity_sink`` (persistence) from a
+writer thread, never while the manager's lock is held, so a slow sink
+cannot stall alerting or the pages reading the feed.
+"""
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from utils.heaps import compact, heap_top_k
+from utils.sync import new_lock, synchronized
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ['Critical', 'Warning', 'Info']
+_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+# Locations kept per group for display; the group still counts all of them
+MAX_GROUP_LOCATIONS = 20
+
+
+class AlertManager:
+    """Grouped, rate-limited active alerts and the recent activity feed"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('get_active_alerts', 'get_alert_counts', 'get_recent_activities')
+
+    def __init__(self, max_activities=200, rate_limit=30.0):
+        self._lock = new_lock()
+        self.rate_limit = rate_limit
+        self._seq = itertools.count()
+        self._groups = {}
+        self._heap = []  # (severity rank, -last notified, seq, key); stale when seq moved on
+        self._severity_counts = dict.fromkeys(SEVERITIES, 0)
+        self._activities = deque(maxlen=max_activities)
+        self.suppressed = 0
+        self.activity_sink = None  # callable receiving each new activity, e.g. to persist it
+        self._unsent = queue.SimpleQueue()  # activities waiting for activity_sink
+        self._writer = None
+        self.version = 0
+
+        self._seed_activities()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def raise_alert(self, severity, title, message, location='System', key=None, now=None):
+        """Raise an alert, folding it into the active group with the same key
+
+        Returns the group key, which is what resolve_alert() takes.
+        """
+        if severity not in _RANK:
+            raise ValueError(f"Unknown alert severity '{severity}'")
+
+        key = key or title
+        now = time.time() if now is None else now
+        group = self._groups.get(key)
+
+        if group is None:
+            group = self._groups[key] = {
+                'key': key,
+                'severity': severity,
+                'title': title,
+                'message': message,
+                'count': 1,
+                'locations': [location],
+                'location_count': 1,
+                'first_seen': now,
+                'last_seen': now,
+                'notified_at': now,
+            }
+            self._severity_counts[severity] += 1
+            self._push(group)
+            self.log_activity('alert', f"{severity} alert: {title}")
+            return key
+
+        group['count'] += 1
+        group['last_seen'] = now
+        group['message'] = message
+        if location not in group['locations']:
+            group['location_count'] += 1
+            if len(group['locations']) < MAX_GROUP_LOCATIONS:
+                group['locations'].append(location)
+
+        escalated = _RANK[severity] < _RANK[group['severity']]
+        if escalated:
+            self._severity_counts[group['severity']] -= 1
+            self._severity_counts[severity] += 1
+            group['severity'] = severity
+            group['title'] = title
+
+        if escalated or now - group['notified_at'] >= self.rate_limit:
+            group['notified_at'] = now
+            self._push(group)
+            self.log_activity('alert', f"{group['severity']} alert: {group['title']} (x{group['count']})")
+        else:
+            self.suppressed += 1
+        return key
+
+    def create_alert(self, severity, title, message, location='System', key=None):
+        """Raise an alert and return its group key"""
+        return self.raise_alert(severity, title, message, location, key)
+
+    def create_emergency_alert(self, location='System'):
+        """Raise the operator-triggered emergency alert"""
+        return self.raise_alert(
+            'Critical',
+            'Emergency Protocol Activated',
+            'Operator triggered the emergency protocol. All units stand by for instructions.',
+            location,
+            key='emergency_protocol',
+        )
+
+    @synchronized
+    def resolve_alert(self, key):
+        """Clear an active alert group"""
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        self._severity_counts[group['severity']] -= 1
+        self.version += 1
+        if len(self._heap) > 2 * len(self._groups) + 64:
+            compact(self._heap, self._is_live)
+
+    def _push(self, group):
+        group['seq'] = next(self._seq)
+        heapq.heappush(self._heap, (_RANK[group['severity']], -group['notified_at'], group['seq'], group['key']))
+        self.version += 1
+        if len(self._heap) > 2 * len(self._groups) + 64:
+            compact(self._heap, self._is_live)
+
+    def _is_live(self, entry):
+        group = self._groups.get(entry[3])
+        return group is not None and group['seq'] == entry[2]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def get_active_alerts(self, limit=None):
+        """Active alert groups, most severe first and most recent first within a severity
+
+        With a limit only the top ``limit`` groups are visited, in
+        O(limit log limit) rather than a sort of every active group.
+        """
+        if limit is None:
+            entries = sorted(entry for entry in self._heap if self._is_live(entry))
+        else:
+            entries = heap_top_k(self._heap, limit, self._is_live)
+        return [self._as_alert(self._groups[entry[3]]) for entry in entries]
+
+    @synchronized
+    def get_alert_counts(self):
+        """Number of active alert groups per severity, plus the total"""
+        counts = dict(self._severity_counts)
+        counts['total'] = len(self._groups)
+        return counts
+
+    @staticmethod
+    def _as_alert(group):
+        locations = group['locations']
+        location = locations[0] if group['location_count'] == 1 else f"{group['location_count']} locations"
+        return {
+            'id': group['key'],
+            'key': group['key'],
+            'severity': group['severity'],
+            'title': group['title'],
+            'message': group['message'],
+            'location': location,
+            'locations': list(locations),
+            'count': group['count'],
+            'timestamp': datetime.fromtimestamp(group['last_seen']),
+            'first_seen': datetime.fromtimestamp(group['first_seen']),
+        }
+
+    # ------------------------------------------------------------------
+    # Activity feed
+    # ------------------------------------------------------------------
+    @synchronized
+    def log_activity(self, activity_type, description, timestamp=None):
+        """Append an entry to the activity feed"""
+        activity = {
+            'type': activity_type,
+            'description': description,
+            'timestamp': timestamp or datetime.now(),
+        }
+        self._activities.append(activity)
+        if self.activity_sink is not None:
+            self._unsent.put(activity)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._send_activities, name='activity-sink', daemon=True)
+                self._writer.start()
+        self.version += 1
+
+    def _send_activities(self):
+        """Writer thread: hand queued activities to activity_sink without holding the lock"""
+        while True:
+            activity = self._unsent.get()
+            try:
+                self.activity_sink(activity)
+            except Exception:
+                logger.exception("Activity sink failed")
+
+    @synchronized
+    def get_recent_activities(self):
+        """Activity feed, oldest first"""
+        return list(self._activities)
+
+    def _seed_activities(self):
+        """Simulated activity history"""
+        now = datetime.now()
+        seed = [
+            ('drone_deployed', 'LLA-003 deployed to Zone Alpha with trauma kit', 52),
+            ('mission_completed', 'LLA-007 delivered O- blood packs to Medical Station B', 41),
+            ('maintenance', 'LLA-011 rotor inspection completed', 33),
+            ('supply_delivered', 'Epinephrine restock delivered to Medical Station D', 20),
+            ('mission_completed', 'LLA-002 completed search & rescue sweep of Zone Gamma', 8),
+        ]
+        for activity_type, description, minutes_ago in seed:
+            self.log_activity(activity_type, description, now - timedelta(minutes=minutes_ago))
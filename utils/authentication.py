@@ -0,0 +1,32 @@
+"""Operator authentication for the dashboard
+
+Operators are read from LIFELINE_OPERATORS (or a .env file) as
+comma-separated ``username:sha256-of-password`` pairs. Until at least one
+operator is configured nobody can log in.
+"""
+import hashlib
+import hmac
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def load_operators():
+    """Configured operators as username -> password hash; empty if none are configured"""
+    operators = {}
+    for entry in os.environ.get('LIFELINE_OPERATORS', '').split(','):
+        username, _, digest = entry.strip().partition(':')
+        if username and digest:
+            operators[username] = digest.lower()
+    return operators
+
+
+def authenticate_user(username, password):
+    """Check an operator's credentials; always False while no operators are configured"""
+    expected = load_operators().get(username)
+    if expected is None or not password:
+        return False
+    digest = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(digest, expected)
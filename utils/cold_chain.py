@@ -0,0 +1,269 @@
+"""Streaming cold-chain monitor for deliveries in flight
+
+Every tracked delivery has a temperature band from its item's storage
+requirement and one row of state arrays. Payload temperature samples
+(from telemetry, about 1 Hz per drone) are folded into those rows in one
+array pass per batch, with O(1) work per sample:
+
+* the time since the delivery's previous sample counts as out of band
+  when the new sample is out of band (capped at MAX_GAP_SECONDS, so a
+  telemetry dropout does not count as a long excursion);
+* the deviation is how far the sample lies outside the band, 0 inside;
+* running totals keep the out-of-band time, the largest deviation and
+  the number of breaches for the whole flight;
+* the last WINDOW_SECONDS are kept as WINDOW_BUCKETS time buckets per
+  delivery. A sample adds to its bucket, and a bucket is cleared when
+  it comes round again, so windowed totals are a sum over a fixed
+  number of buckets.
+
+A sample that leaves the band raises a Critical alert right away, grouped
+per band so a heat wave folds into one alert; the return into the band
+is logged to the activity feed.
+
+Deliveries are tracked from the dispatcher's status changes (payload_sink)
+and samples arrive from telemetry (cold_chain_sink).
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.dispatch import DELIVERED, IN_TRANSIT
+from utils.drone_data import to_local_datetime64
+from utils.sync import new_lock, synchronized
+
+# Acceptable payload temperature (°C) per storage requirement
+BAND_LIMITS = {
+    '2-8°C': (2.0, 8.0),
+    'Room Temp': (15.0, 25.0),
+    '-20°C': (-25.0, -15.0),
+}
+NO_DATA, NORMAL, EXCURSION, ALERT = 'No Data', 'Normal', 'Excursion', 'Alert'
+# Alert: out of band now; Excursion: back in band, but out of it within the window
+TEMPERATURE_STATUSES = [NO_DATA, NORMAL, EXCURSION, ALERT]
+WINDOW_SECONDS = 600
+WINDOW_BUCKETS = 10
+MAX_GAP_SECONDS = 5.0
+
+
+class ColdChainMonitor:
+    """Windowed and whole-flight temperature excursion state per delivery"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('status', 'setpoints')
+
+    def __init__(self, alert_manager=None, window_seconds=WINDOW_SECONDS, buckets=WINDOW_BUCKETS, capacity=64):
+        self._lock = new_lock()
+        self.alert_manager = alert_manager
+        self.buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self._slots = {}  # delivery_id -> row
+        self._deliveries = []  # (delivery_id, drone_id, item, band) per row
+        self._drones = {}  # drone_id -> row of the delivery it is flying
+
+        self._low = np.zeros(capacity)
+        self._high = np.zeros(capacity)
+        self._last_time = np.full(capacity, np.nan)
+        self._last_temp = np.full(capacity, np.nan)
+        self._out = np.zeros(capacity, dtype=bool)  # last sample was out of band
+        self._out_seconds = np.zeros(capacity)
+        self._max_deviation = np.zeros(capacity)
+        self._breaches = np.zeros(capacity, dtype=np.int32)
+        self._epoch = np.full((capacity, buckets), -1, dtype=np.int64)  # bucket number held by each cell
+        self._window_out = np.zeros((capacity, buckets))
+        self._window_deviation = np.zeros((capacity, buckets))
+        self.version = 0
+
+    def _reserve(self, rows):
+        capacity = len(self._low)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2)
+        for name in ('_low', '_high', '_last_time', '_last_temp', '_out', '_out_seconds', '_max_deviation',
+                     '_breaches', '_epoch', '_window_out', '_window_deviation'):
+            old = getattr(self, name)
+            fill = -1 if name == '_epoch' else np.nan if name in ('_last_time', '_last_temp') else 0
+            grown = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    # ------------------------------------------------------------------
+    # Deliveries
+    # ------------------------------------------------------------------
+    @synchronized
+    def track(self, delivery_id, drone_id, band, item=None):
+        """Start consuming ``drone_id``'s payload samples for a delivery; repeat calls are no-ops"""
+        if delivery_id in self._slots:
+            return
+        if band not in BAND_LIMITS:
+            raise ValueError(f"Unknown temperature band '{band}'")
+        row = self._slots[delivery_id] = len(self._deliveries)
+        self._deliveries.append((delivery_id, drone_id, item, band))
+        self._reserve(row + 1)
+        self._low[row], self._high[row] = BAND_LIMITS[band]
+        self._drones[drone_id] = row
+        self.version += 1
+
+    @synchronized
+    def release(self, delivery_id):
+        """The delivery landed: stop consuming samples, keep its excursion record"""
+        row = self._slots.get(delivery_id)
+        if row is not None and self._drones.get(self._deliveries[row][1]) == row:
+            del self._drones[self._deliveries[row][1]]
+            self.version += 1
+
+    # ------------------------------------------------------------------
+    # Samples
+    # ------------------------------------------------------------------
+    @synchronized
+    def update(self, drone_ids, temperatures, timestamps):
+        """Fold a batch of payload temperature samples into the tracked deliveries
+
+        Samples from drones not flying a tracked delivery, and NaN
+        readings, are ignored. Several samples of one drone in a batch are
+        applied in time order.
+        """
+        rows = np.fromiter((self._drones.get(drone_id, -1) for drone_id in drone_ids), dtype=np.intp,
+                           count=len(drone_ids))
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), rows.shape)
+        keep = (rows >= 0) & ~np.isnan(temperatures)
+        if not keep.any():
+            return
+        rows, temperatures, timestamps = rows[keep], temperatures[keep], timestamps[keep]
+
+        # Rank of each sample within its delivery, so every pass touches each row once
+        order = np.lexsort((timestamps, rows))
+        rows, temperatures, timestamps = rows[order], temperatures[order], timestamps[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        for r in range(int(rank.max()) + 1):
+            sample = rank == r
+            self._apply(rows[sample], temperatures[sample], timestamps[sample])
+        self.version += 1
+
+    def _apply(self, rows, temperatures, timestamps):
+        deviation = np.maximum(np.maximum(self._low[rows] - temperatures, temperatures - self._high[rows]), 0)
+        out = deviation > 0
+        gap = np.nan_to_num(timestamps - self._last_time[rows], nan=0.0)
+        out_seconds = np.where(out, np.clip(gap, 0, MAX_GAP_SECONDS), 0)
+
+        epoch = (timestamps // self.bucket_seconds).astype(np.int64)
+        column = epoch % self.buckets
+        stale = self._epoch[rows, column] != epoch
+        self._epoch[rows[stale], column[stale]] = epoch[stale]
+        self._window_out[rows[stale], column[stale]] = 0
+        self._window_deviation[rows[stale], column[stale]] = 0
+        self._window_out[rows, column] += out_seconds
+        self._window_deviation[rows, column] = np.maximum(self._window_deviation[rows, column], deviation)
+
+        self._out_seconds[rows] += out_seconds
+        self._max_deviation[rows] = np.maximum(self._max_deviation[rows], deviation)
+        breached = out & ~self._out[rows]
+        recovered = ~out & self._out[rows]
+        self._breaches[rows[breached]] += 1
+        self._out[rows] = out
+        self._last_time[rows] = timestamps
+        self._last_temp[rows] = temperatures
+
+        if self.alert_manager is not None:
+            for row in rows[breached].tolist():
+                self._raise(row)
+            for row in rows[recovered].tolist():
+                delivery_id, drone_id, item, band = self._deliveries[row]
+                self.alert_manager.log_activity(
+                    'cold_chain', f"{delivery_id} back within {band} at {self._last_temp[row]:.1f}°C")
+
+    def _raise(self, row):
+        delivery_id, drone_id, item, band = self._deliveries[row]
+        self.alert_manager.raise_alert(
+            'Critical', 'Cold Chain Breach',
+            f"{item or delivery_id} on {delivery_id} at {self._last_temp[row]:.1f}°C, outside {band}",
+            location=drone_id, key=f'cold_chain:{band}',
+        )
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def status(self, delivery_ids, now=None):
+        """Temperature status and excursion totals per delivery; untracked ones are No Data"""
+        now = time.time() if now is None else now
+        rows = np.fromiter((self._slots.get(delivery_id, -1) for delivery_id in delivery_ids), dtype=np.intp,
+                           count=len(delivery_ids))
+        known = rows >= 0
+        r = rows[known]
+
+        # Buckets within the window; older cells are left for reuse
+        current = int(now // self.bucket_seconds)
+        live = self._epoch[r] > current - self.buckets
+        window_out = np.full(len(rows), np.nan)
+        window_deviation = np.full(len(rows), np.nan)
+        window_out[known] = np.where(live, self._window_out[r], 0).sum(axis=1)
+        window_deviation[known] = np.where(live, self._window_deviation[r], 0).max(axis=1, initial=0)
+
+        def gather(column, fill=np.nan):
+            values = np.full(len(rows), fill, dtype=np.float64)
+            values[known] = column[r]
+            return values
+
+        temperature = gather(self._last_temp)
+        last_time = gather(self._last_time)
+        codes = np.select(
+            [np.isnan(temperature), gather(self._out, 0) > 0, window_out > 0],
+            [TEMPERATURE_STATUSES.index(NO_DATA), TEMPERATURE_STATUSES.index(ALERT),
+             TEMPERATURE_STATUSES.index(EXCURSION)],
+            default=TEMPERATURE_STATUSES.index(NORMAL),
+        )
+        return pd.DataFrame({
+            'delivery_id': list(delivery_ids),
+            'temperature': temperature,
+            'last_reading': np.where(np.isnan(last_time), np.datetime64('NaT'),
+                                     to_local_datetime64(np.nan_to_num(last_time))),
+            'temperature_status': np.array(TEMPERATURE_STATUSES, dtype=object)[codes],
+            'window_out_of_band_s': window_out,
+            'window_max_deviation': window_deviation,
+            'out_of_band_s': gather(self._out_seconds),
+            'max_deviation': gather(self._max_deviation),
+            'breaches': gather(self._breaches, 0).astype(np.int64),
+        })
+
+    @synchronized
+    def setpoints(self, drone_ids):
+        """Middle of the band of each drone's tracked delivery; NaN for drones without one"""
+        rows = np.fromiter((self._drones.get(drone_id, -1) for drone_id in drone_ids), dtype=np.intp,
+                           count=len(drone_ids))
+        known = rows >= 0
+        setpoints = np.full(len(rows), np.nan)
+        setpoints[known] = (self._low[rows[known]] + self._high[rows[known]]) / 2
+        return setpoints
+
+
+def cold_chain_sink(monitor):
+    """Telemetry sink that feeds payload temperatures to the cold-chain monitor"""
+    def apply(frames):
+        reading = ~np.isnan(frames['payload_temp'])
+        if not reading.any():
+            return
+        frames = frames[reading]
+        ids = [raw.decode() for raw in frames['drone_id']]
+        monitor.update(ids, frames['payload_temp'], frames['timestamp'])
+    return apply
+
+
+def payload_sink(monitor, bands):
+    """Dispatcher sink that tracks a delivery's payload while it is in transit
+
+    bands -- callable mapping a medical item to its temperature band;
+    deliveries without an item, or whose item has no known band, are
+    not tracked.
+    """
+    def apply(delivery):
+        if delivery['status'] == IN_TRANSIT:
+            item = delivery['medical_item']
+            band = bands(item) if item is not None else None
+            if band in BAND_LIMITS:
+                monitor.track(delivery['delivery_id'], delivery['drone_id'], band, item=item)
+        elif delivery['status'] == DELIVERED:
+            monitor.release(delivery['delivery_id'])
+    return apply
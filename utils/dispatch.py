@@ -0,0 +1,290 @@
+"""Batch drone-to-delivery dispatch
+
+Queued deliveries are assigned to drones in one optimal batch with
+scipy's linear_sum_assignment (the Hungarian method for rectangular cost
+matrices). Each (delivery, drone) cost is the drone's flight distance to
+the destination, plus a penalty for low battery, minus a bonus for the
+delivery's priority. The bonus means that when drones are scarce the
+most urgent deliveries are served first. A pair is infeasible when the
+drone's battery cannot cover the trip to the destination, the return to
+base and the reserve.
+
+Candidate drones come from the fleet's spatial index: destinations are
+clustered into ~1 km cells and each cluster takes the nearest eligible
+drones, enough for every delivery bound there. The cost matrix is built for all candidates in one broadcast.
+
+Critical deliveries may preempt: drones that are loading a lower-priority
+delivery are also candidates for Critical rows, at an extra cost. A
+displaced delivery goes back to the queue and is reassigned in the same
+dispatch round if any drone is left.
+
+With an inventory attached, a delivery's cargo is picked when its drone
+starts loading, first-expired-first-out across the item's batches, and
+put back into the same batches if the delivery is displaced.
+
+Sinks are told of every status change (assigned, displaced, departed,
+delivered) with a copy of the delivery record; they keep per-delivery
+state elsewhere, such as the drone's route in the ETA engine, in step
+with the dispatcher, the one owner of delivery assignments.
+"""
+import itertools
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.drone_data import BASE_LAT, BASE_LON
+from utils.geo import haversine_km
+from utils.routing import MEDICAL_STATIONS
+from utils.sync import new_lock, synchronized
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+# Priority bonus in km-equivalents; larger than any realistic distance gap
+PRIORITY_BONUS = {'Critical': 100.0, 'High': 40.0, 'Medium': 15.0, 'Low': 0.0}
+QUEUED, LOADING, IN_TRANSIT, DELIVERED = 'Queued', 'Loading', 'In Transit', 'Delivered'
+DELIVERY_STATUSES = [QUEUED, LOADING, IN_TRANSIT, DELIVERED]
+DELIVERY_COLUMNS = ['delivery_id', 'drone_id', 'medical_item', 'quantity', 'destination', 'lat', 'lon',
+                    'priority', 'status', 'requested_at', 'start_time', 'batches']
+
+ELIGIBLE_STATUSES = ('Active', 'Charging')
+BATTERY_PCT_PER_KM = 2.5
+BATTERY_RESERVE_PCT = 15.0
+# km-equivalent cost of flying with an empty battery rather than a full one
+LOW_BATTERY_WEIGHT = 5.0
+# Extra cost of taking a drone away from a delivery it is loading
+PREEMPT_PENALTY = 10.0
+CANDIDATES_PER_DELIVERY = 4
+# Destinations in the same cell (~1 km) share one candidate query
+CANDIDATE_CELL_DEG = 0.01
+INFEASIBLE = 1e9
+
+
+def assignment_costs(dest_lat, dest_lon, priorities, drone_lat, drone_lon, battery):
+    """deliveries x drones cost matrix; infeasible pairs cost INFEASIBLE"""
+    outbound = haversine_km(dest_lat[:, None], dest_lon[:, None], drone_lat[None, :], drone_lon[None, :])
+    home = haversine_km(dest_lat, dest_lon, BASE_LAT, BASE_LON)
+    needed = (outbound + home[:, None]) * BATTERY_PCT_PER_KM + BATTERY_RESERVE_PCT
+    bonus = np.array([PRIORITY_BONUS[p] for p in priorities])
+    costs = outbound + LOW_BATTERY_WEIGHT * (1 - battery[None, :] / 100) - bonus[:, None]
+    costs[needed > battery[None, :]] = INFEASIBLE
+    return costs
+
+
+class Dispatcher:
+    """Delivery queue with batch assignment onto a DroneDataManager's fleet"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('deliveries', 'queue_length')
+
+    def __init__(self, drone_manager, seed_items=None, seed=None, inventory=None, sinks=()):
+        self._lock = new_lock()
+        self.drone_manager = drone_manager
+        self.inventory = inventory  # MedicalSupplyManager the cargo is picked from
+        self.sinks = list(sinks)  # callables receiving each delivery whose status changed
+        self._rng = np.random.default_rng(seed)
+        self._ids = itertools.count(2024000)
+        self._deliveries = {}  # delivery_id -> record, in request order
+        self.version = 0
+
+        if seed_items is not None:
+            self._seed_deliveries(seed_items)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def request(self, destination, lat, lon, priority='Medium', medical_item=None, quantity=1):
+        """Queue a delivery; returns its id"""
+        if priority not in PRIORITY_BONUS:
+            raise ValueError(f"Unknown delivery priority '{priority}'")
+        delivery_id = f'DEL-{next(self._ids):06d}'
+        self._deliveries[delivery_id] = {
+            'delivery_id': delivery_id,
+            'drone_id': None,
+            'medical_item': medical_item,
+            'quantity': quantity,
+            'destination': destination,
+            'lat': float(lat),
+            'lon': float(lon),
+            'priority': priority,
+            'status': QUEUED,
+            'requested_at': datetime.now(),
+            'start_time': None,
+            'batches': [],  # (batch, location, units) picked for the cargo
+        }
+        self.version += 1
+        return delivery_id
+
+    @synchronized
+    def dispatch(self):
+        """Assign queued deliveries to drones in one batch
+
+        Returns {'assigned': {delivery_id: drone_id}, 'preempted': [delivery_id]}.
+        """
+        assigned, preempted = self._assign(allow_preempt=True)
+        if preempted:
+            again, _ = self._assign(allow_preempt=False)
+            assigned.update(again)
+        if assigned or preempted:
+            self.version += 1
+        return {'assigned': assigned, 'preempted': preempted}
+
+    @synchronized
+    def depart(self, delivery_id, started_at=None):
+        """A loaded drone took off (now, or at ``started_at``); the delivery can no longer be preempted"""
+        self._set_status(delivery_id, LOADING, IN_TRANSIT, start_time=started_at or datetime.now())
+
+    @synchronized
+    def complete(self, delivery_id):
+        """The delivery reached its destination and freed its drone"""
+        self._set_status(delivery_id, IN_TRANSIT, DELIVERED)
+
+    def _set_status(self, delivery_id, expected, status, **fields):
+        record = self._deliveries.get(delivery_id)
+        if record is None:
+            raise KeyError(f"Unknown delivery '{delivery_id}'")
+        if record['status'] != expected:
+            raise ValueError(f"Delivery '{delivery_id}' is {record['status']}, not {expected}")
+        record['status'] = status
+        record.update(fields)
+        self.version += 1
+        self._notify(record)
+
+    def _notify(self, record):
+        for sink in self.sinks:
+            try:
+                sink(dict(record))
+            except Exception:
+                logger.exception("Dispatch sink %r failed", sink)
+
+    # ------------------------------------------------------------------
+    # Assignment
+    # ------------------------------------------------------------------
+    def _assign(self, allow_preempt):
+        # scipy.optimize is heavy; only processes that dispatch pay for it
+        from scipy.optimize import linear_sum_assignment
+
+        queued = [r for r in self._deliveries.values() if r['status'] == QUEUED]
+        if not queued:
+            return {}, []
+        busy = {r['drone_id']: r for r in self._deliveries.values() if r['status'] in (LOADING, IN_TRANSIT)}
+        candidates = self._candidates(queued, busy)
+
+        # Drones loading a lower-priority delivery are open to Critical rows only
+        critical = np.array([r['priority'] == 'Critical' for r in queued])
+        preemptible = []
+        if allow_preempt and critical.any():
+            preemptible = [r for r in busy.values() if r['status'] == LOADING and r['priority'] != 'Critical']
+            candidates = pd.concat([candidates, self._drone_rows([r['drone_id'] for r in preemptible])],
+                                   ignore_index=True)
+        if candidates.empty:
+            return {}, []
+
+        costs = assignment_costs(
+            np.array([r['lat'] for r in queued]), np.array([r['lon'] for r in queued]),
+            [r['priority'] for r in queued],
+            candidates['lat'].to_numpy(), candidates['lon'].to_numpy(),
+            candidates['battery'].to_numpy(dtype=np.float64),
+        )
+        if preemptible:
+            columns = slice(len(candidates) - len(preemptible), None)
+            costs[:, columns] += PREEMPT_PENALTY
+            costs[~critical, columns] = INFEASIBLE
+
+        rows, cols = linear_sum_assignment(costs)
+        feasible = costs[rows, cols] < INFEASIBLE
+        rows, cols = rows[feasible], cols[feasible]
+
+        assigned, displaced = {}, []
+        held = {r['drone_id']: r for r in preemptible}
+        drone_ids = candidates['id'].to_numpy()
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            record, drone_id = queued[row], drone_ids[col]
+            if drone_id in held:
+                loser = held[drone_id]
+                loser['status'], loser['drone_id'] = QUEUED, None
+                self._unload(loser)
+                displaced.append(loser['delivery_id'])
+                self._notify(loser)
+            record['status'], record['drone_id'] = LOADING, drone_id
+            self._load(record)
+            assigned[record['delivery_id']] = drone_id
+            self._notify(record)
+        return assigned, displaced
+
+    def _load(self, record):
+        if self.inventory is not None and record['medical_item'] is not None:
+            record['batches'] = self.inventory.load_delivery(record['medical_item'], record['quantity'],
+                                                             reference=record['delivery_id'])
+
+    def _unload(self, record):
+        if self.inventory is not None and record['batches']:
+            self.inventory.unload_delivery(record['medical_item'], record['batches'],
+                                           reference=record['delivery_id'])
+            record['batches'] = []
+
+    def _candidates(self, queued, busy):
+        """Nearest eligible free drones around every cluster of destinations"""
+        lat = np.array([r['lat'] for r in queued])
+        lon = np.array([r['lon'] for r in queued])
+        cells = np.floor(np.column_stack([lat, lon]) / CANDIDATE_CELL_DEG).astype(np.int64)
+        _, cluster, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+        cluster = cluster.ravel()
+        centre_lat = np.bincount(cluster, lat) / counts
+        centre_lon = np.bincount(cluster, lon) / counts
+
+        frames = []
+        for c_lat, c_lon, count in zip(centre_lat.tolist(), centre_lon.tolist(), counts.tolist()):
+            nearest = self.drone_manager.nearest_drones(
+                c_lat, c_lon, k=count * CANDIDATES_PER_DELIVERY + len(busy),
+                statuses=ELIGIBLE_STATUSES, min_battery=BATTERY_RESERVE_PCT,
+            )
+            frames.append(nearest[~nearest['id'].isin(busy)])
+        candidates = pd.concat(frames, ignore_index=True).drop_duplicates('id', ignore_index=True)
+        return candidates[['id', 'lat', 'lon', 'battery']]
+
+    def _drone_rows(self, drone_ids):
+        rows = [self.drone_manager.get_drone(drone_id) for drone_id in drone_ids]
+        return pd.DataFrame({
+            'id': drone_ids,
+            'lat': [row['lat'] for row in rows],
+            'lon': [row['lon'] for row in rows],
+            'battery': [row['battery'] for row in rows],
+        })
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def deliveries(self, statuses=None):
+        """Delivery records as a frame, optionally only those in ``statuses``"""
+        records = [r for r in self._deliveries.values() if statuses is None or r['status'] in statuses]
+        return pd.DataFrame(records, columns=DELIVERY_COLUMNS)
+
+    @synchronized
+    def queue_length(self):
+        """Deliveries waiting for a drone"""
+        return sum(r['status'] == QUEUED for r in self._deliveries.values())
+
+    # ------------------------------------------------------------------
+    # Simulated data
+    # ------------------------------------------------------------------
+    def _seed_deliveries(self, items, count=8):
+        """Simulated deliveries, dispatched and partly under way"""
+        rng = self._rng
+        stations = list(MEDICAL_STATIONS)
+        for _ in range(count):
+            station = stations[rng.integers(len(stations))]
+            self.request(station, *MEDICAL_STATIONS[station],
+                         priority=rng.choice(PRIORITIES[:3]),
+                         medical_item=rng.choice(items), quantity=int(rng.integers(1, 10)))
+        self.dispatch()
+        for record in list(self._deliveries.values()):
+            if record['status'] == LOADING and rng.random() < 0.9:
+                self.depart(record['delivery_id'],
+                            started_at=datetime.now() - pd.Timedelta(minutes=int(rng.integers(5, 60))))
+                if rng.random() < 0.33:
+                    self.complete(record['delivery_id'])
@@ -0,0 +1,421 @@
+"""Fleet state store for the Life-Line Air dashboard
+
+Drone state is held column-wise in NumPy arrays with one slot per drone.
+Updating a drone touches a single slot, and every fleet-wide number the
+dashboard shows comes from a vectorized reduction over the live slots.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from utils.spatial import GridIndex
+from utils.sync import new_lock, synchronized
+
+STATUSES = ['Active', 'Charging', 'Maintenance', 'Emergency']
+MISSIONS = ['Medical Delivery', 'Search & Rescue', 'Supply Drop', 'Reconnaissance', 'Standby']
+LOCATIONS = ['Zone Alpha', 'Zone Beta', 'Zone Gamma', 'Base Station', 'En Route']
+
+BASE_LAT, BASE_LON = 28.6139, 77.2090
+
+# Battery bands used by the fleet battery chart, as (label, lower bound)
+BATTERY_BANDS = [
+    ('Critical (<20%)', 0),
+    ('Low (20-50%)', 20),
+    ('Medium (50-80%)', 50),
+    ('High (80%+)', 80),
+]
+
+# Side of the spatial index cells, in km
+GRID_CELL_KM = 0.25
+
+# Column name -> dtype of the columnar store
+COLUMNS = {
+    'status': np.int8,
+    'battery': np.float32,
+    'lat': np.float64,
+    'lon': np.float64,
+    'last_update': np.float64,  # POSIX seconds
+    'mission': np.int8,
+    'location': np.int8,
+}
+
+_CODES = {
+    'status': {name: code for code, name in enumerate(STATUSES)},
+    'mission': {name: code for code, name in enumerate(MISSIONS)},
+    'location': {name: code for code, name in enumerate(LOCATIONS)},
+}
+_LABELS = {
+    'status': np.array(STATUSES, dtype=object),
+    'mission': np.array(MISSIONS, dtype=object),
+    'location': np.array(LOCATIONS, dtype=object),
+}
+
+
+def fleet_drone_ids(fleet_size):
+    """Ids of a simulated fleet: LLA-001 upwards, zero-padded to the fleet size"""
+    width = max(3, len(str(fleet_size)))
+    return [f"LLA-{i:0{width}d}" for i in range(1, fleet_size + 1)]
+
+
+def to_local_datetime64(timestamps):
+    """Convert an array of POSIX seconds to naive local datetime64 values"""
+    offset = datetime.now().astimezone().utcoffset().total_seconds()
+    return ((np.asarray(timestamps, dtype=np.float64) + offset) * 1e6).astype('datetime64[us]')
+
+
+class DroneDataManager:
+    """Columnar store of live drone state, indexed by drone id
+
+    Safe to share between sessions: writes and multi-column reads hold the
+    instance lock.
+    """
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = (
+        'column', 'drone_ids', 'slots_for', 'get_drone', 'get_status_counts',
+        'get_fleet_overview', 'get_detailed_fleet_status', 'get_battery_distribution',
+        'get_mission_distribution', 'get_mission_stats', 'get_success_rate',
+        'get_delivery_trends', 'nearest_drones', 'drones_within',
+    )
+
+    def __init__(self, fleet_size=15, capacity=None, seed=None):
+        self._lock = new_lock()
+        self._rng = np.random.default_rng(seed)
+        self._capacity = max(capacity or fleet_size, 16)
+        self._columns = {name: np.zeros(self._capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._ids = np.empty(self._capacity, dtype=object)
+        self._slots = {}
+        self._size = 0
+        self._grid = GridIndex(BASE_LAT, BASE_LON, cell_km=GRID_CELL_KM, capacity=self._capacity)
+        self._status_counts = np.zeros(len(STATUSES), dtype=np.int64)  # kept current by every write
+        self._active_by_day = {}
+
+        # Bumped on every change so readers can tell when to redraw
+        self.version = 0
+
+        self._seed_fleet(fleet_size)
+        self._seed_mission_history()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def add_drone(self, drone_id, status='Charging', battery=100.0, lat=BASE_LAT, lon=BASE_LON,
+                  mission='Standby', location='Base Station', timestamp=None):
+        """Register a drone and return its slot"""
+        if drone_id in self._slots:
+            raise ValueError(f"Drone {drone_id} is already registered")
+
+        if self._size == self._capacity:
+            self._grow(self._capacity * 2)
+
+        slot = self._size
+        self._size += 1
+        self._slots[drone_id] = slot
+        self._ids[slot] = drone_id
+        # Counted under the slot's zeroed code until _write moves it to its status
+        self._status_counts[self._columns['status'][slot]] += 1
+        self._write(slot, status=status, battery=battery, lat=lat, lon=lon, mission=mission,
+                    location=location, timestamp=timestamp)
+        return slot
+
+    @synchronized
+    def update_drone(self, drone_id, timestamp=None, **fields):
+        """Update one drone in place; fields are any of the store's columns"""
+        try:
+            slot = self._slots[drone_id]
+        except KeyError:
+            raise KeyError(f"Unknown drone {drone_id}") from None
+        self._write(slot, timestamp=timestamp, **fields)
+
+    @synchronized
+    def update_many(self, drone_ids, timestamp=None, **fields):
+        """Update a batch of drones; each field is an array aligned with drone_ids"""
+        slots = self.slots_for(drone_ids)
+        self._check_fields(fields)
+        encoded = {name: self._encode_many(name, values) for name, values in fields.items()}
+        if 'status' in encoded:
+            changed = np.unique(slots)
+            before = np.bincount(self._columns['status'][changed], minlength=len(STATUSES))
+        for name, values in encoded.items():
+            self._columns[name][slots] = values
+        if 'lat' in fields or 'lon' in fields:
+            self._grid.move_many(slots, self._columns['lat'][slots], self._columns['lon'][slots])
+        self._columns['last_update'][slots] = self._timestamp(timestamp)
+        if 'status' in encoded:
+            self._status_counts += np.bincount(self._columns['status'][changed], minlength=len(STATUSES)) - before
+            self._record_active()
+        self.version += 1
+
+    def _write(self, slot, timestamp=None, **fields):
+        self._check_fields(fields)
+        encoded = {name: self._encode(name, value) for name, value in fields.items() if value is not None}
+        if 'status' in encoded:
+            self._status_counts[encoded['status']] += 1
+            self._status_counts[self._columns['status'][slot]] -= 1
+        for name, value in encoded.items():
+            self._columns[name][slot] = value
+        if 'lat' in encoded or 'lon' in encoded:
+            self._grid.move(slot, self._columns['lat'][slot], self._columns['lon'][slot])
+        self._columns['last_update'][slot] = self._timestamp(timestamp)
+        if 'status' in encoded:
+            self._record_active()
+        self.version += 1
+
+    def _check_fields(self, fields):
+        """Reject an update naming an unknown field before anything is written"""
+        unknown = [name for name in fields if name not in self._columns or name == 'last_update']
+        if unknown:
+            raise KeyError(f"Unknown drone field {unknown[0]}")
+
+    def _record_active(self):
+        """Note today's active count, tomorrow's reference for the overview delta"""
+        self._active_by_day[datetime.now().date()] = int(self._status_counts[_CODES['status']['Active']])
+
+    def _grow(self, capacity):
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        ids = np.empty(capacity, dtype=object)
+        ids[:self._size] = self._ids[:self._size]
+        self._ids = ids
+        self._capacity = capacity
+
+    @staticmethod
+    def _encode(name, value):
+        codes = _CODES.get(name)
+        if codes is None or not isinstance(value, str):
+            return value
+        try:
+            return codes[value]
+        except KeyError:
+            raise ValueError(f"Unknown {name} '{value}'") from None
+
+    @staticmethod
+    def _encode_many(name, values):
+        codes = _CODES.get(name)
+        values = np.asarray(values)
+        if codes is None or values.dtype.kind not in 'OUS':
+            return values
+        return np.array([codes[v] for v in values], dtype=COLUMNS[name])
+
+    @staticmethod
+    def _timestamp(timestamp):
+        if timestamp is None:
+            return datetime.now().timestamp()
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        return timestamp
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, drone_id):
+        return drone_id in self._slots
+
+    @synchronized
+    def column(self, name):
+        """Return a read-only view of one column over the live slots"""
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    @synchronized
+    def drone_ids(self):
+        """Return a read-only view of the drone ids in slot order"""
+        view = self._ids[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @synchronized
+    def slots_for(self, drone_ids):
+        """Map drone ids to store slots"""
+        return np.fromiter((self._slots[d] for d in drone_ids), dtype=np.intp, count=len(drone_ids))
+
+    @synchronized
+    def get_drone(self, drone_id):
+        """Return one drone's state as a dict"""
+        slot = self._slots[drone_id]
+        return {
+            'id': drone_id,
+            'status': STATUSES[self._columns['status'][slot]],
+            'battery': float(self._columns['battery'][slot]),
+            'mission': MISSIONS[self._columns['mission'][slot]],
+            'location': LOCATIONS[self._columns['location'][slot]],
+            'lat': float(self._columns['lat'][slot]),
+            'lon': float(self._columns['lon'][slot]),
+            'last_update': datetime.fromtimestamp(self._columns['last_update'][slot]),
+        }
+
+    @synchronized
+    def get_status_counts(self):
+        """Number of drones per status"""
+        return dict(zip(STATUSES, self._status_counts.tolist()))
+
+    @synchronized
+    def get_fleet_overview(self):
+        """Headline fleet numbers for the metrics row"""
+        counts = self.get_status_counts()
+        battery = self._columns['battery'][:self._size]
+
+        yesterday = self._active_by_day.get(datetime.now().date() - timedelta(days=1), counts['Active'])
+
+        return {
+            'total': self._size,
+            'active': counts['Active'],
+            'charging': counts['Charging'],
+            'maintenance': counts['Maintenance'],
+            'emergency': counts['Emergency'],
+            'avg_battery': float(battery.mean()) if self._size else 0.0,
+            'change': counts['Active'] - yesterday,
+        }
+
+    @synchronized
+    def get_detailed_fleet_status(self):
+        """Per-drone table for the fleet overview, built straight from the columns"""
+        n = self._size
+        cols = self._columns
+        return pd.DataFrame({
+            'id': self._ids[:n],
+            'status': _LABELS['status'][cols['status'][:n]],
+            'battery': cols['battery'][:n].round().astype(np.int16),
+            'mission': _LABELS['mission'][cols['mission'][:n]],
+            'location': _LABELS['location'][cols['location'][:n]],
+            'last_update': to_local_datetime64(cols['last_update'][:n]),
+        })
+
+    @synchronized
+    def get_battery_distribution(self):
+        """Number of drones in each battery band"""
+        bounds = np.array([lower for _, lower in BATTERY_BANDS[1:]], dtype=np.float32)
+        bands = np.searchsorted(bounds, self._columns['battery'][:self._size], side='right')
+        counts = np.bincount(bands, minlength=len(BATTERY_BANDS))
+        return dict(zip((label for label, _ in BATTERY_BANDS), counts.tolist()))
+
+    @synchronized
+    def get_mission_distribution(self):
+        """Number of drones on each mission type"""
+        counts = np.bincount(self._columns['mission'][:self._size], minlength=len(MISSIONS))
+        return dict(zip(MISSIONS, counts.tolist()))
+
+    # ------------------------------------------------------------------
+    # Spatial queries
+    # ------------------------------------------------------------------
+    def _accept(self, statuses, min_battery):
+        """Slot filter for the spatial index, or None to accept every drone"""
+        if statuses is None and min_battery is None:
+            return None
+        codes = None if statuses is None else [_CODES['status'][status] for status in statuses]
+
+        def accept(slots):
+            mask = np.ones(len(slots), dtype=bool)
+            if codes is not None:
+                mask &= np.isin(self._columns['status'][slots], codes)
+            if min_battery is not None:
+                mask &= self._columns['battery'][slots] >= min_battery
+            return mask
+        return accept
+
+    def _spatial_frame(self, slots, distances):
+        cols = self._columns
+        return pd.DataFrame({
+            'id': self._ids[slots],
+            'status': _LABELS['status'][cols['status'][slots]],
+            'battery': cols['battery'][slots].round().astype(np.int16),
+            'lat': cols['lat'][slots],
+            'lon': cols['lon'][slots],
+            'distance_km': distances,
+        })
+
+    @synchronized
+    def nearest_drones(self, lat, lon, k=5, statuses=None, min_battery=None):
+        """The k drones nearest a point, optionally only those in ``statuses``
+        with at least ``min_battery`` percent; nearest first
+        """
+        slots, distances = self._grid.nearest(lat, lon, k, self._accept(statuses, min_battery))
+        return self._spatial_frame(slots, distances)
+
+    @synchronized
+    def drones_within(self, lat, lon, radius_km, statuses=None, min_battery=None):
+        """Drones within ``radius_km`` of a point, with the same filters; nearest first"""
+        slots, distances = self._grid.within(lat, lon, radius_km, self._accept(statuses, min_battery))
+        return self._spatial_frame(slots, distances)
+
+    # ------------------------------------------------------------------
+    # Mission statistics
+    # ------------------------------------------------------------------
+    @synchronized
+    def get_mission_stats(self):
+        """Today's mission numbers compared with yesterday"""
+        history = self._mission_history
+        today, yesterday = history.iloc[-1], history.iloc[-2]
+        return {
+            'completed_today': int(today['missions_completed']),
+            'change_percent': (today['missions_completed'] - yesterday['missions_completed'])
+                              / max(yesterday['missions_completed'], 1) * 100,
+            'avg_delivery_time': float(today['avg_delivery_time']),
+            'delivery_time_change': float(today['avg_delivery_time'] - yesterday['avg_delivery_time']),
+        }
+
+    @synchronized
+    def get_success_rate(self):
+        """Mission success rate over the tracked history, in percent"""
+        history = self._mission_history
+        completed = history['missions_completed'].sum()
+        failed = history['missions_failed'].sum()
+        return float((completed - failed) / max(completed, 1) * 100)
+
+    @synchronized
+    def get_delivery_trends(self):
+        """Daily average delivery time for the last 7 days"""
+        return self._mission_history[['date', 'avg_delivery_time']].tail(7).reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # Simulated data
+    # ------------------------------------------------------------------
+    def _seed_fleet(self, fleet_size):
+        """Fill the store with a simulated fleet"""
+        rng = self._rng
+        n = fleet_size
+        if n > self._capacity:
+            self._grow(n)
+
+        cols = self._columns
+        cols['status'][:n] = rng.choice(len(STATUSES), size=n, p=[0.6, 0.2, 0.15, 0.05])
+        cols['battery'][:n] = rng.integers(15, 100, size=n)
+        cols['mission'][:n] = rng.integers(0, len(MISSIONS), size=n)
+        cols['location'][:n] = rng.integers(0, len(LOCATIONS), size=n)
+        cols['lat'][:n] = BASE_LAT + rng.uniform(-0.05, 0.05, size=n)
+        cols['lon'][:n] = BASE_LON + rng.uniform(-0.05, 0.05, size=n)
+        cols['last_update'][:n] = datetime.now().timestamp() - rng.integers(0, 30 * 60, size=n)
+
+        self._ids[:n] = fleet_drone_ids(n)
+        self._slots = {drone_id: slot for slot, drone_id in enumerate(self._ids[:n])}
+        self._size = n
+        self._grid.move_many(np.arange(n), cols['lat'][:n], cols['lon'][:n])
+        self._status_counts = np.bincount(cols['status'][:n], minlength=len(STATUSES)).astype(np.int64)
+
+        # Yesterday's active count, so the overview delta has a reference
+        active = int(self._status_counts[_CODES['status']['Active']])
+        yesterday = datetime.now().date() - timedelta(days=1)
+        self._active_by_day[yesterday] = active - int(rng.integers(0, 3))
+        self._record_active()
+        self.version += 1
+
+    def _seed_mission_history(self, days=30):
+        """Simulated daily mission history"""
+        rng = self._rng
+        end = pd.Timestamp(datetime.now().date())
+        completed = rng.poisson(8, size=days)
+        success = np.clip(rng.normal(94, 3, size=days), 85, 99)
+        self._mission_history = pd.DataFrame({
+            'date': pd.date_range(end=end, periods=days, freq='D'),
+            'missions_completed': completed,
+            'missions_failed': (completed * (1 - success / 100)).astype(int),
+            'avg_delivery_time': np.maximum(8, rng.normal(12, 2, size=days)),
+        })
+        self.version += 1
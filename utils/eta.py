@@ -0,0 +1,220 @@
+"""Live ETAs for drones flying a route
+
+Each routed drone has one row of padded per-vertex arrays: the route's
+vertices, their km offsets around the base, and the remaining distance
+from each vertex to the end of the route. Telemetry updates every
+reporting drone in one array pass:
+
+1. ground speed is smoothed with an exponentially weighted moving average;
+2. the drone's next vertex is advanced while its position projects past
+   the end of the current segment;
+3. remaining distance = great-circle distance to the next vertex plus
+   that vertex's precomputed distance to go.
+
+An ETA is the time of the last fix plus remaining distance over smoothed
+speed, so drones without fresh telemetry keep a stable estimate.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.dispatch import DELIVERED, IN_TRANSIT
+from utils.drone_data import BASE_LAT, BASE_LON, to_local_datetime64
+from utils.geo import haversine_km, to_local_km
+from utils.sync import new_lock, synchronized
+from utils.telemetry import latest_per_drone
+
+# Weight of the newest speed sample in the moving average
+SPEED_SMOOTHING = 0.3
+CRUISE_SPEED_KMH = 60.0
+# Floor that keeps hovering or stalled drones from getting endless ETAs
+MIN_SPEED_KMH = 5.0
+ARRIVAL_KM = 0.05
+# Segments a drone may pass between two fixes
+MAX_ADVANCE = 8
+
+
+class EtaEngine:
+    """Remaining distance and ETA of every routed drone, refreshed per telemetry batch"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('etas',)
+
+    def __init__(self, smoothing=SPEED_SMOOTHING, cruise_speed_kmh=CRUISE_SPEED_KMH, capacity=64, width=16):
+        self._lock = new_lock()
+        self.smoothing = smoothing
+        self.cruise_speed_kmh = cruise_speed_kmh
+        self._slots = {}  # drone_id -> row
+        self._keys = []  # route key per row
+        self._lat = np.zeros((capacity, width))
+        self._lon = np.zeros((capacity, width))
+        self._x = np.zeros((capacity, width))
+        self._y = np.zeros((capacity, width))
+        self._to_go = np.zeros((capacity, width))  # km from each vertex to the route end
+        self._last = np.zeros(capacity, dtype=np.intp)  # index of the final vertex
+        self._next = np.ones(capacity, dtype=np.intp)
+        self._remaining = np.full(capacity, np.nan)
+        self._speed = np.full(capacity, np.nan)
+        self._fix_time = np.zeros(capacity)
+        self.version = 0
+
+    def _reserve(self, rows, width):
+        capacity, current = self._lat.shape
+        if rows <= capacity and width <= current:
+            return
+        rows, width = max(rows, capacity * (2 if rows > capacity else 1)), max(width, current)
+        for name in ('_lat', '_lon', '_x', '_y', '_to_go'):
+            grown = np.zeros((rows, width))
+            old = getattr(self, name)
+            grown[:old.shape[0], :old.shape[1]] = old
+            setattr(self, name, grown)
+        for name, fill in (('_last', 0), ('_next', 1), ('_remaining', np.nan), ('_speed', np.nan), ('_fix_time', 0)):
+            old = getattr(self, name)
+            setattr(self, name, np.r_[old, np.full(rows - len(old), fill, dtype=old.dtype)])
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+    @synchronized
+    def set_route(self, drone_id, lats, lons, key=None, started_at=None):
+        """Start tracking a drone along a route of (lat, lon) vertices
+
+        A route already set under the same ``key`` is left as it is, so
+        callers can re-assert a route on every refresh. The drone is placed
+        at the first vertex as of ``started_at`` (POSIX seconds, default now)
+        until telemetry reports its position.
+        """
+        row = self._slots.get(drone_id)
+        if row is not None and key is not None and self._keys[row] == key:
+            return
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        if len(lats) < 2:
+            lats, lons = np.repeat(lats, 2), np.repeat(lons, 2)
+
+        if row is None:
+            row = self._slots[drone_id] = len(self._keys)
+            self._keys.append(key)
+        self._keys[row] = key
+        n = len(lats)
+        self._reserve(row + 1, n)
+
+        legs = haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:])
+        x, y = to_local_km(lats, lons, BASE_LAT, BASE_LON)
+        # Padding repeats the final vertex so gathers past the end stay in range
+        for name, values in (('_lat', lats), ('_lon', lons), ('_x', x), ('_y', y)):
+            getattr(self, name)[row] = values[-1]
+            getattr(self, name)[row, :n] = values
+        self._to_go[row] = 0
+        self._to_go[row, :n - 1] = np.cumsum(legs[::-1])[::-1]
+        self._last[row] = n - 1
+        self._next[row] = 1
+        self._remaining[row] = self._to_go[row, 0]
+        self._fix_time[row] = time.time() if started_at is None else started_at
+        self.version += 1
+
+    @synchronized
+    def clear_route(self, drone_id):
+        """Stop tracking a drone; its row is reused by its next route"""
+        row = self._slots.get(drone_id)
+        if row is not None:
+            self._keys[row] = None
+            self._remaining[row] = np.nan
+            self.version += 1
+
+    def __contains__(self, drone_id):
+        return drone_id in self._slots
+
+    # ------------------------------------------------------------------
+    # Telemetry
+    # ------------------------------------------------------------------
+    @synchronized
+    def update(self, drone_ids, lat, lon, speed, timestamp):
+        """Fold one batch of position fixes into the routed drones; others are ignored"""
+        rows = np.fromiter((self._slots.get(drone_id, -1) for drone_id in drone_ids), dtype=np.intp,
+                           count=len(drone_ids))
+        known = rows >= 0
+        if not known.any():
+            return
+        rows = rows[known]
+        lat, lon = np.asarray(lat, dtype=np.float64)[known], np.asarray(lon, dtype=np.float64)[known]
+        speed = np.asarray(speed, dtype=np.float64)[known]
+
+        previous = self._speed[rows]
+        self._speed[rows] = np.where(np.isnan(previous), speed,
+                                     self.smoothing * speed + (1 - self.smoothing) * previous)
+        self._fix_time[rows] = np.asarray(timestamp, dtype=np.float64)[known]
+
+        # Advance past every segment whose end the drone has already passed
+        px, py = to_local_km(lat, lon, BASE_LAT, BASE_LON)
+        for _ in range(MAX_ADVANCE):
+            nxt = self._next[rows]
+            ax, ay = self._x[rows, nxt - 1], self._y[rows, nxt - 1]
+            bx, by = self._x[rows, nxt], self._y[rows, nxt]
+            dx, dy = bx - ax, by - ay
+            t = ((px - ax) * dx + (py - ay) * dy) / np.maximum(dx * dx + dy * dy, 1e-12)
+            passed = (t >= 1) & (nxt < self._last[rows])
+            if not passed.any():
+                break
+            self._next[rows[passed]] += 1
+
+        nxt = self._next[rows]
+        remaining = haversine_km(lat, lon, self._lat[rows, nxt], self._lon[rows, nxt]) + self._to_go[rows, nxt]
+        arrived = (nxt == self._last[rows]) & (remaining <= ARRIVAL_KM)
+        self._remaining[rows] = np.where(arrived, 0.0, remaining)
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def etas(self, drone_ids):
+        """Remaining km, smoothed speed and ETA per drone; NaN/NaT for untracked drones"""
+        rows = np.fromiter((self._slots.get(drone_id, -1) for drone_id in drone_ids), dtype=np.intp,
+                           count=len(drone_ids))
+        known = rows >= 0
+        remaining = np.full(len(rows), np.nan)
+        speed = np.full(len(rows), np.nan)
+        fix_time = np.full(len(rows), np.nan)
+        remaining[known] = self._remaining[rows[known]]
+        speed[known] = self._speed[rows[known]]
+        fix_time[known] = self._fix_time[rows[known]]
+
+        speed = np.where(np.isnan(speed) & known, self.cruise_speed_kmh, speed)
+        seconds = remaining / np.maximum(speed, MIN_SPEED_KMH) * 3600
+        eta = to_local_datetime64(np.where(np.isnan(seconds), 0, fix_time + seconds))
+        return pd.DataFrame({
+            'drone_id': list(drone_ids),
+            'remaining_km': remaining,
+            'speed_kmh': speed,
+            'eta': np.where(np.isnan(seconds), np.datetime64('NaT'), eta),
+        })
+
+
+def eta_sink(engine):
+    """Telemetry sink that refreshes the ETAs of every routed drone in the batch"""
+    def apply(frames):
+        latest = latest_per_drone(frames)
+        ids = [raw.decode() for raw in latest['drone_id']]
+        engine.update(ids, latest['lat'], latest['lon'], latest['speed'], latest['timestamp'])
+    return apply
+
+
+def route_sink(engine, planner, origin=(BASE_LAT, BASE_LON)):
+    """Dispatcher sink that tracks a delivery's drone along its planned route while it is in transit
+
+    Routes are keyed by delivery id and registered once, when the drone
+    departs; a route through the no-fly zones that the planner cannot find
+    falls back to the straight line.
+    """
+    def apply(delivery):
+        if delivery['status'] == IN_TRANSIT:
+            destination = (delivery['lat'], delivery['lon'])
+            route = planner.plan(origin, destination)
+            if route is None:
+                route = [origin[0], destination[0]], [origin[1], destination[1]]
+            engine.set_route(delivery['drone_id'], *route, key=delivery['delivery_id'],
+                             started_at=delivery['start_time'].timestamp())
+        elif delivery['status'] == DELIVERED:
+            engine.clear_route(delivery['drone_id'])
+    return apply
@@ -0,0 +1,156 @@
+"""Predictive maintenance: component failure-probability model
+
+The model estimates the probability that a drone component fails before
+its next service window. Its inputs are the component type, accumulated
+flight hours and cycles, the current health score, the health trend
+(points lost per 100 flight hours) and the days since the last service.
+
+Training happens offline:
+
+    python -m utils.failure_model train
+
+It writes a versioned joblib artifact to MODEL_DIR. Dashboard processes
+load the artifact once (see utils.shared.get_failure_model) and train one
+only if none exists for MODEL_VERSION. The model is a standardized
+logistic regression, which is a single affine map: the artifact stores
+it folded into one weight vector, so loading and scoring need neither
+scikit-learn nor a pipeline object, and scoring the whole fleet is one
+float32 matrix product.
+"""
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ['Rotors', 'Battery', 'GPS Module', 'Camera', 'Communication', 'Landing Gear', 'Cargo Bay',
+              'Flight Controller']
+NUMERIC_FEATURES = ['flight_hours', 'cycles', 'health_score', 'health_trend', 'days_since_service']
+FEATURES = [f'component={name}' for name in COMPONENTS] + NUMERIC_FEATURES
+
+# Bump when the features or the training data change; old artifacts are then ignored
+MODEL_VERSION = 1
+MODEL_DIR = Path(os.environ.get('LIFELINE_MODEL_DIR', Path(__file__).resolve().parent.parent / 'models'))
+
+# Relative wear of each component in the simulated history
+_COMPONENT_WEAR = np.array([1.4, 1.6, 0.6, 0.5, 0.7, 1.0, 0.8, 0.9])
+
+
+def component_features(component, flight_hours, cycles, health_score, health_trend, days_since_service):
+    """Model input matrix (float32, one row per component) from aligned arrays
+
+    ``component`` holds indexes into COMPONENTS.
+    """
+    component = np.asarray(component, dtype=np.intp)
+    X = np.zeros((len(component), len(FEATURES)), dtype=np.float32)
+    X[np.arange(len(component)), component] = 1
+    X[:, len(COMPONENTS):] = np.column_stack([flight_hours, cycles, health_score, health_trend, days_since_service])
+    return X
+
+
+def simulate_history(n=200_000, seed=0):
+    """Simulated component history as (X, failed) for training"""
+    rng = np.random.default_rng(seed)
+    component = rng.integers(0, len(COMPONENTS), size=n)
+    wear = _COMPONENT_WEAR[component] * rng.lognormal(0, 0.3, size=n)
+    flight_hours = rng.uniform(0, 500, size=n)
+    cycles = np.maximum(0, flight_hours * 2 + rng.normal(0, 60, size=n)).round()
+    days_since_service = rng.uniform(0, 180, size=n)
+    health_trend = -wear * 6 + rng.normal(0, 1, size=n)
+    health_score = np.clip(100 + health_trend * flight_hours / 100 + rng.normal(0, 4, size=n), 0, 100)
+
+    logit = (-6.0 + 0.09 * (100 - health_score) - 0.25 * health_trend
+             + 0.012 * days_since_service + 0.0008 * cycles)
+    failed = rng.random(n) < 1 / (1 + np.exp(-logit))
+    X = component_features(component, flight_hours, cycles, health_score, health_trend, days_since_service)
+    return X, failed
+
+
+def train(X, y, seed=0):
+    """Fit the model and return ((weights, bias), holdout metrics)"""
+    # Only training needs scikit-learn; dashboards just load the weights
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    holdout = rng.random(len(y)) < 0.2
+    model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    model.fit(X[~holdout], y[~holdout])
+    scores = model.predict_proba(X[holdout])[:, 1]
+    metrics = {'roc_auc': float(roc_auc_score(y[holdout], scores)), 'samples': int(len(y)),
+               'positive_rate': float(y.mean())}
+
+    scaler, regression = model[0], model[-1]
+    weights = (regression.coef_[0] / scaler.scale_).astype(np.float32)
+    bias = float(regression.intercept_[0] - (scaler.mean_ / scaler.scale_) @ regression.coef_[0])
+    return (weights, bias), metrics
+
+
+def artifact_path(model_dir=None, version=MODEL_VERSION):
+    return Path(model_dir or MODEL_DIR) / f'failure_model-v{version}.joblib'
+
+
+def save_artifact(model, metrics, model_dir=None):
+    path = artifact_path(model_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    weights, bias = model
+    joblib.dump({'version': MODEL_VERSION, 'features': FEATURES, 'weights': weights, 'bias': bias,
+                 'metrics': metrics, 'trained_at': time.time()}, path)
+    return path
+
+
+def load_model(model_dir=None, train_if_missing=True):
+    """The artifact for MODEL_VERSION as a FailureModel, trained first if there is none"""
+    path = artifact_path(model_dir)
+    if not path.exists():
+        if not train_if_missing:
+            raise FileNotFoundError(f"No failure model artifact at {path}")
+        logger.info("No failure model v%d at %s; training one", MODEL_VERSION, path)
+        model, metrics = train(*simulate_history())
+        save_artifact(model, metrics, model_dir)
+    artifact = joblib.load(path)
+    if artifact['version'] != MODEL_VERSION or artifact['features'] != FEATURES:
+        raise ValueError(f"Failure model artifact {path} does not match model version {MODEL_VERSION}")
+    return FailureModel(artifact)
+
+
+class FailureModel:
+    """A loaded failure-model artifact"""
+
+    def __init__(self, artifact):
+        self.version = artifact['version']
+        self.metrics = artifact['metrics']
+        self.trained_at = artifact['trained_at']
+        self._weights = np.asarray(artifact['weights'], dtype=np.float32)
+        self._bias = np.float32(artifact['bias'])
+
+    def predict(self, X):
+        """Failure probabilities for a feature matrix from component_features()"""
+        z = X @ self._weights + self._bias
+        return 1 / (1 + np.exp(-z))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Life-Line Air failure model")
+    sub = parser.add_subparsers(dest='command', required=True)
+    train_cmd = sub.add_parser('train', help="train on simulated component history and save the artifact")
+    train_cmd.add_argument('--samples', type=int, default=200_000)
+    train_cmd.add_argument('--seed', type=int, default=0)
+    train_cmd.add_argument('--model-dir', default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    model, metrics = train(*simulate_history(args.samples, args.seed), seed=args.seed)
+    path = save_artifact(model, metrics, args.model_dir)
+    logger.info("Saved failure model v%d to %s (holdout ROC AUC %.3f)", MODEL_VERSION, path, metrics['roc_auc'])
+
+
+if __name__ == '__main__':
+    main()
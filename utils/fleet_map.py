@@ -0,0 +1,131 @@
+"""Fleet map layer for the fleet dashboard
+
+The base map (tiles, base station) is built once per process and handed
+to st_folium unchanged, so its script hash stays stable and the browser
+keeps the mounted map. Drones go in a separate feature group, passed
+through ``feature_group_to_add``, that the frontend swaps in place. The
+group holds one GeoJSON feature collection per status with fixed
+canvas-drawn circle markers, so the payload is plain coordinates and
+properties rather than one Marker object per drone.
+
+Features are kept per drone between updates. When the fleet store's
+version moves, only drones whose position, status, battery or mission
+changed have their feature rewritten.
+"""
+import threading
+
+import folium
+import numpy as np
+from streamlit_folium import st_folium
+
+from utils.drone_data import BASE_LAT, BASE_LON, MISSIONS, STATUSES
+
+STATUS_COLORS = {
+    'Active': '#4CAF50',
+    'Charging': '#FF9800',
+    'Maintenance': '#F44336',
+    'Emergency': '#9C27B0',
+}
+MAP_ZOOM = 11
+BASE_STATION_RADIUS_M = 2000
+# ~1 m at the equator; keeps the payload compact
+COORD_DECIMALS = 5
+
+_TRACKED = ('lat', 'lon', 'status', 'battery', 'mission')
+
+
+def _new_base_map():
+    m = folium.Map(location=[BASE_LAT, BASE_LON], zoom_start=MAP_ZOOM, prefer_canvas=True)
+    folium.Circle(
+        location=[BASE_LAT, BASE_LON],
+        radius=BASE_STATION_RADIUS_M,
+        popup='Base Station',
+        color='blue',
+        fill=True,
+        fillColor='lightblue',
+        fillOpacity=0.3,
+    ).add_to(m)
+    return m
+
+
+class FleetMapLayer:
+    """Per-drone GeoJSON features kept in step with a DroneDataManager"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.base_map = _new_base_map()
+        self._features = []
+        self._previous = {name: np.empty(0) for name in _TRACKED}
+        self._version = None
+        self._group = None
+        self.last_changed = 0
+
+    def feature_group(self, drone_manager):
+        """Drone layer for the manager's current state, rebuilt only for changed drones"""
+        with self._lock:
+            version = drone_manager.version
+            if self._group is not None and version == self._version:
+                return self._group
+
+            ids = drone_manager.drone_ids()
+            current = {name: drone_manager.column(name) for name in _TRACKED}
+            current['lat'] = current['lat'].round(COORD_DECIMALS)
+            current['lon'] = current['lon'].round(COORD_DECIMALS)
+            current['battery'] = current['battery'].round()
+            changed = self._changed_rows(current)
+
+            for i in changed:
+                self._write_feature(i, ids[i], current)
+            self.last_changed = len(changed)
+            self._previous = {name: values.copy() for name, values in current.items()}
+            self._group = self._build_group(current['status'])
+            self._version = version
+            return self._group
+
+    def _changed_rows(self, current):
+        n, known = len(current['lat']), len(self._features)
+        self._features.extend({} for _ in range(n - known))
+        same = np.ones(known, dtype=bool)
+        for name, values in current.items():
+            same &= values[:known] == self._previous[name]
+        return np.r_[np.flatnonzero(~same), np.arange(known, n)]
+
+    def _write_feature(self, i, drone_id, current):
+        self._features[i] = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [float(current['lon'][i]), float(current['lat'][i])]},
+            'properties': {
+                'id': drone_id,
+                'status': STATUSES[current['status'][i]],
+                'battery': int(current['battery'][i]),
+                'mission': MISSIONS[current['mission'][i]],
+            },
+        }
+
+    def _build_group(self, status):
+        group = folium.FeatureGroup(name='Drones')
+        features = self._features
+        for code, name in enumerate(STATUSES):
+            rows = np.flatnonzero(status == code)
+            if not len(rows):
+                continue
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': [features[i] for i in rows]},
+                name=name,
+                marker=folium.CircleMarker(radius=6, color=STATUS_COLORS[name], fill=True,
+                                           fill_color=STATUS_COLORS[name], fill_opacity=0.85, weight=1),
+                tooltip=folium.GeoJsonTooltip(fields=['id', 'status', 'battery', 'mission'],
+                                              aliases=['Drone', 'Status', 'Battery %', 'Mission']),
+            ).add_to(group)
+        return group
+
+    def render(self, group, key='fleet_map', width=700, height=400):
+        """Draw the base map with the drone layer swapped in"""
+        with self._lock:
+            try:
+                return st_folium(self.base_map, key=key, width=width, height=height,
+                                 feature_group_to_add=group, returned_objects=[])
+            finally:
+                # st_folium attaches the group to the map; detach it so the
+                # base map script, and with it the component key, stays the same
+                self.base_map._children.pop(group.get_name(), None)
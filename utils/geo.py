@@ -0,0 +1,31 @@
+"""Geodesic helpers shared by the spatial, routing and ETA code"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = np.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def to_local_km(lat, lon, ref_lat, ref_lon):
+    """Equirectangular (x, y) km offsets from a reference point
+
+    Accurate to well under 1% over the tens of km a regional fleet covers.
+    """
+    scale = np.cos(np.radians(ref_lat))
+    x = (np.asarray(lon, dtype=np.float64) - ref_lon) * KM_PER_DEG_LAT * scale
+    y = (np.asarray(lat, dtype=np.float64) - ref_lat) * KM_PER_DEG_LAT
+    return x, y
+
+
+def from_local_km(x, y, ref_lat, ref_lon):
+    """Inverse of to_local_km"""
+    scale = np.cos(np.radians(ref_lat))
+    lat = ref_lat + np.asarray(y, dtype=np.float64) / KM_PER_DEG_LAT
+    lon = ref_lon + np.asarray(x, dtype=np.float64) / (KM_PER_DEG_LAT * scale)
+    return lat, lon
@@ -0,0 +1,389 @@
+"""No-fly zones and vectorized airspace checks
+
+Zones are circles or polygons. They are stored column-wise in km around
+the base (see utils.geo.to_local_km): one row per circle, one row per
+polygon edge. A check takes any number of points in one call:
+
+1. points are binned into GRID_KM cells and joined against a cell -> zone
+   table built from each zone's bounding box, widened by the near-miss
+   margin;
+2. candidate (point, zone) pairs outside the zone's widened bounding box
+   are dropped;
+3. the remaining pairs get a signed distance to the zone boundary. For
+   circles this is the distance to the centre minus the radius. For
+   polygons it is the nearest edge distance, negated when an even-odd ray
+   cast puts the point inside. All edges of all candidate pairs go through
+   one vectorized pass.
+
+A negative distance is a violation; a distance up to the near-miss margin
+is a near miss. ``version`` moves whenever the zones change.
+"""
+import numpy as np
+
+from utils.drone_data import BASE_LAT, BASE_LON
+from utils.geo import from_local_km, to_local_km
+from utils.sync import new_lock, synchronized
+from utils.telemetry import latest_per_drone
+
+GRID_KM = 1.0
+NEAR_MISS_KM = 0.2
+CIRCLE, POLYGON = 'circle', 'polygon'
+VIOLATION, NEAR_MISS = 'violation', 'near_miss'
+
+# Restricted areas loaded into the shared engine for the demo
+DEMO_ZONES = [
+    {'id': 'NFZ-01', 'name': 'Restricted Airspace', 'kind': CIRCLE, 'lat': 28.6239, 'lon': 77.2190, 'radius_km': 1.0},
+    {'id': 'NFZ-02', 'name': 'Government Quarter', 'kind': POLYGON,
+     'vertices': [(28.6080, 77.1930), (28.6165, 77.1960), (28.6150, 77.2040), (28.6060, 77.2010)]},
+]
+
+_HALF = 1 << 30
+
+
+def _pack(ix, iy):
+    return (np.asarray(ix, dtype=np.int64) + _HALF) << 32 | (np.asarray(iy, dtype=np.int64) + _HALF)
+
+
+def _expand_ranges(starts, counts):
+    """Concatenated aranges starts[i] .. starts[i] + counts[i]"""
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.intp)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+class GeofenceEngine:
+    """Circle and polygon no-fly zones checked against many points at once"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('check_points', 'check_paths', 'zones', 'to_geojson')
+
+    def __init__(self, near_miss_km=NEAR_MISS_KM, ref=(BASE_LAT, BASE_LON)):
+        self._lock = new_lock()
+        self.near_miss_km = near_miss_km
+        self.ref = ref
+        self._zones = {}  # zone_id -> definition, in insertion order
+        self._table = None
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Zones
+    # ------------------------------------------------------------------
+    @synchronized
+    def add_circle(self, zone_id, lat, lon, radius_km, name=None):
+        """Add or replace a circular zone"""
+        if radius_km <= 0:
+            raise ValueError("Zone radius must be positive")
+        self._zones[zone_id] = {'id': zone_id, 'name': name or zone_id, 'kind': CIRCLE,
+                                'lat': float(lat), 'lon': float(lon), 'radius_km': float(radius_km)}
+        self._changed()
+
+    @synchronized
+    def add_polygon(self, zone_id, vertices, name=None):
+        """Add or replace a polygonal zone given as [(lat, lon), ...]"""
+        vertices = np.asarray(vertices, dtype=np.float64)
+        if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+            raise ValueError("A polygon zone needs at least three (lat, lon) vertices")
+        if np.array_equal(vertices[0], vertices[-1]):
+            vertices = vertices[:-1]
+        self._zones[zone_id] = {'id': zone_id, 'name': name or zone_id, 'kind': POLYGON,
+                                'vertices': vertices}
+        self._changed()
+
+    @synchronized
+    def remove_zone(self, zone_id):
+        """Drop a zone; unknown ids are ignored"""
+        if self._zones.pop(zone_id, None) is not None:
+            self._changed()
+
+    def load(self, zones):
+        """Add zones given as dicts like DEMO_ZONES"""
+        for zone in zones:
+            if zone['kind'] == CIRCLE:
+                self.add_circle(zone['id'], zone['lat'], zone['lon'], zone['radius_km'], zone.get('name'))
+            else:
+                self.add_polygon(zone['id'], zone['vertices'], zone.get('name'))
+
+    def _changed(self):
+        self._table = None
+        self.version += 1
+
+    @synchronized
+    def zones(self):
+        """Zone definitions, in the order they were added"""
+        return [dict(zone) for zone in self._zones.values()]
+
+    def __len__(self):
+        return len(self._zones)
+
+    # ------------------------------------------------------------------
+    # Lookup table
+    # ------------------------------------------------------------------
+    def _build_table(self):
+        zones = list(self._zones.values())
+        n = len(zones)
+        ref_lat, ref_lon = self.ref
+        bbox = np.empty((n, 4))  # x0, y0, x1, y1
+        circle = np.zeros((n, 3))  # x, y, r
+        edge_start = np.zeros(n, dtype=np.intp)
+        edge_count = np.zeros(n, dtype=np.intp)
+        edges, edge_total = [], 0
+
+        for i, zone in enumerate(zones):
+            if zone['kind'] == CIRCLE:
+                x, y = to_local_km(zone['lat'], zone['lon'], ref_lat, ref_lon)
+                r = zone['radius_km']
+                circle[i] = x, y, r
+                bbox[i] = x - r, y - r, x + r, y + r
+            else:
+                x, y = to_local_km(zone['vertices'][:, 0], zone['vertices'][:, 1], ref_lat, ref_lon)
+                edge_start[i], edge_count[i] = edge_total, len(x)
+                edge_total += len(x)
+                edges.append(np.column_stack([x, y, np.roll(x, -1), np.roll(y, -1)]))
+                bbox[i] = x.min(), y.min(), x.max(), y.max()
+
+        margin = self.near_miss_km
+        bbox += [-margin, -margin, margin, margin]
+
+        # Cell -> zones table over the widened bounding boxes
+        cx0, cy0 = np.floor(bbox[:, 0] / GRID_KM).astype(np.int64), np.floor(bbox[:, 1] / GRID_KM).astype(np.int64)
+        cx1, cy1 = np.floor(bbox[:, 2] / GRID_KM).astype(np.int64), np.floor(bbox[:, 3] / GRID_KM).astype(np.int64)
+        width, height = cx1 - cx0 + 1, cy1 - cy0 + 1
+        cells = width * height
+        zone_of_cell = np.repeat(np.arange(n), cells)
+        offset = _expand_ranges(np.zeros(n, dtype=np.intp), cells)
+        keys = _pack(cx0[zone_of_cell] + offset % width[zone_of_cell],
+                     cy0[zone_of_cell] + offset // width[zone_of_cell])
+        order = np.argsort(keys, kind='stable')
+        keys, cell_zones = keys[order], zone_of_cell[order]
+        cell_keys, cell_start, cell_count = np.unique(keys, return_index=True, return_counts=True)
+
+        self._table = {
+            'ids': [zone['id'] for zone in zones],
+            'is_polygon': np.array([zone['kind'] == POLYGON for zone in zones], dtype=bool),
+            'bbox': bbox,
+            'circle': circle,
+            'edge_start': edge_start,
+            'edge_count': edge_count,
+            'edges': np.vstack(edges) if edges else np.empty((0, 4)),
+            'cell_keys': cell_keys,
+            'cell_start': cell_start,
+            'cell_count': cell_count,
+            'cell_zones': cell_zones,
+        }
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+    @synchronized
+    def check_points(self, lat, lon):
+        """Zone hits of the given points as (point index, zone id, signed distance km)
+
+        Negative distances are inside the zone (violations); non-negative
+        ones are within the near-miss margin of its boundary.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=object), np.empty(0))
+        if not self._zones or not len(lat):
+            return empty
+        if self._table is None:
+            self._build_table()
+        table = self._table
+
+        # 1. Cell join
+        px, py = to_local_km(lat, lon, *self.ref)
+        keys = _pack(np.floor(px / GRID_KM), np.floor(py / GRID_KM))
+        pos = np.searchsorted(table['cell_keys'], keys)
+        pos = np.minimum(pos, len(table['cell_keys']) - 1)
+        hit = table['cell_keys'][pos] == keys
+        points = np.flatnonzero(hit)
+        counts = table['cell_count'][pos[points]]
+        point = np.repeat(points, counts)
+        zone = table['cell_zones'][_expand_ranges(table['cell_start'][pos[points]], counts)]
+
+        # 2. Bounding box prefilter
+        bbox = table['bbox'][zone]
+        x, y = px[point], py[point]
+        inside_box = (x >= bbox[:, 0]) & (x <= bbox[:, 2]) & (y >= bbox[:, 1]) & (y <= bbox[:, 3])
+        point, zone, x, y = point[inside_box], zone[inside_box], x[inside_box], y[inside_box]
+
+        # 3. Signed distances
+        distance = np.empty(len(point))
+        polygon = table['is_polygon'][zone]
+
+        circles = np.flatnonzero(~polygon)
+        cx, cy, r = table['circle'][zone[circles]].T
+        distance[circles] = np.hypot(x[circles] - cx, y[circles] - cy) - r
+
+        pairs = np.flatnonzero(polygon)
+        if len(pairs):
+            distance[pairs] = self._polygon_distance(table, zone[pairs], x[pairs], y[pairs])
+
+        near = distance <= self.near_miss_km
+        ids = np.array(table['ids'], dtype=object)
+        return point[near], ids[zone[near]], distance[near]
+
+    @staticmethod
+    def _polygon_distance(table, zone, x, y):
+        """Signed distance of each (point, polygon) pair to the polygon boundary"""
+        counts = table['edge_count'][zone]
+        edge = _expand_ranges(table['edge_start'][zone], counts)
+        pair = np.repeat(np.arange(len(zone)), counts)
+        ax, ay, bx, by = table['edges'][edge].T
+        qx, qy = x[pair], y[pair]
+
+        # Even-odd ray cast towards +x
+        straddles = (ay > qy) != (by > qy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = ax + (qy - ay) * (bx - ax) / (by - ay)
+        crossings = np.bincount(pair, weights=straddles & (qx < crossing_x), minlength=len(zone))
+
+        # Distance to the nearest edge
+        ex, ey = bx - ax, by - ay
+        length_sq = ex * ex + ey * ey
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(((qx - ax) * ex + (qy - ay) * ey) / length_sq, 0, 1)
+        t = np.where(length_sq > 0, t, 0)
+        edge_distance = np.hypot(qx - (ax + t * ex), qy - (ay + t * ey))
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        nearest = np.minimum.reduceat(edge_distance, starts)
+
+        return np.where(crossings % 2 == 1, -nearest, nearest)
+
+    def check_paths(self, paths):
+        """Zone hits along flight paths
+
+        paths -- {drone_id: (lats, lons)}; planned and flown paths alike
+        Returns one dict per (drone, zone) with the deepest hit on the path.
+        """
+        owners, lats, lons, vertex = [], [], [], []
+        for drone_id, (path_lats, path_lons) in paths.items():
+            owners += [drone_id] * len(path_lats)
+            lats.append(np.asarray(path_lats, dtype=np.float64))
+            lons.append(np.asarray(path_lons, dtype=np.float64))
+            vertex.append(np.arange(len(path_lats)))
+        if not owners:
+            return []
+
+        points, zone_ids, distances = self.check_points(np.concatenate(lats), np.concatenate(lons))
+        owners = np.array(owners, dtype=object)
+        vertex = np.concatenate(vertex)
+        names = {zone['id']: zone['name'] for zone in self.zones()}
+
+        deepest = {}
+        for point, zone_id, distance in zip(points.tolist(), zone_ids.tolist(), distances.tolist()):
+            key = (owners[point], zone_id)
+            if key not in deepest or distance < deepest[key]['distance_km']:
+                deepest[key] = {
+                    'drone_id': owners[point],
+                    'zone_id': zone_id,
+                    'zone': names[zone_id],
+                    'kind': VIOLATION if distance < 0 else NEAR_MISS,
+                    'distance_km': distance,
+                    'vertex': int(vertex[point]),
+                }
+        return sorted(deepest.values(), key=lambda hit: hit['distance_km'])
+
+    # ------------------------------------------------------------------
+    # Display
+    # ------------------------------------------------------------------
+    @synchronized
+    def to_geojson(self, circle_segments=48):
+        """Zones as a GeoJSON FeatureCollection, circles approximated by polygons"""
+        features = []
+        angles = np.linspace(0, 2 * np.pi, circle_segments + 1)
+        ref_lat, ref_lon = self.ref
+        for zone in self._zones.values():
+            if zone['kind'] == CIRCLE:
+                x, y = to_local_km(zone['lat'], zone['lon'], ref_lat, ref_lon)
+                lats, lons = from_local_km(x + zone['radius_km'] * np.cos(angles),
+                                           y + zone['radius_km'] * np.sin(angles), ref_lat, ref_lon)
+            else:
+                lats, lons = np.r_[zone['vertices'][:, 0], zone['vertices'][0, 0]], \
+                             np.r_[zone['vertices'][:, 1], zone['vertices'][0, 1]]
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [np.column_stack([lons, lats]).round(6).tolist()]},
+                'properties': {'id': zone['id'], 'name': zone['name']},
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def geofence_sink(engine, alert_manager):
+    """Telemetry sink that raises alerts for drones entering or skirting no-fly zones
+
+    Each (drone, zone, kind) is alerted once when it starts; a drone that
+    leaves and re-enters is alerted again. Alerts group per zone and kind,
+    so a zone with many intruders is one growing alert rather than many.
+    """
+    active = set()
+
+    def apply(frames):
+        latest = latest_per_drone(frames)
+        ids = np.array([raw.decode() for raw in latest['drone_id']], dtype=object)
+        points, zone_ids, distances = engine.check_points(latest['lat'], latest['lon'])
+
+        current = set()
+        for point, zone_id, distance in zip(points.tolist(), zone_ids.tolist(), distances.tolist()):
+            kind = VIOLATION if distance < 0 else NEAR_MISS
+            current.add((ids[point], zone_id, kind))
+
+        reported = set(ids.tolist())
+        for drone_id, zone_id, kind in current - active:
+            raise_geofence_alert(alert_manager, drone_id, zone_id, kind, engine.near_miss_km)
+        # Drones missing from this batch keep their state until they report again
+        active.difference_update({entry for entry in active if entry[0] in reported} - current)
+        active.update(current)
+
+    return apply
+
+
+def raise_geofence_alert(alert_manager, drone_id, zone_id, kind, margin_km=NEAR_MISS_KM):
+    """Raise (or fold into) the alert group of a zone and hit kind"""
+    if kind == VIOLATION:
+        alert_manager.raise_alert('Critical', 'Restricted Airspace Violation',
+                                  f"{drone_id} entered no-fly zone {zone_id}",
+                                  location=drone_id, key=f"geofence:{zone_id}:{kind}")
+    else:
+        alert_manager.raise_alert('Warning', 'Restricted Airspace Near Miss',
+                                  f"{drone_id} within {margin_km * 1000:.0f} m of no-fly zone {zone_id}",
+                                  location=drone_id, key=f"geofence:{zone_id}:{kind}")
+
+
+def path_alerts(alert_manager):
+    """Callable raising alerts for check_paths() hits, like geofence_sink does for positions
+
+    Call it with the checked drone ids and their hits. Each (drone, zone,
+    kind) is alerted once when it first appears and again only after it
+    has cleared, so pages re-checking the same paths on every rerun do not
+    inflate the alert. Alerts group per zone and kind.
+    """
+    lock = new_lock()
+    active = set()
+
+    def apply(drone_ids, hits):
+        current = {(hit['drone_id'], hit['zone_id'], hit['kind']) for hit in hits}
+        names = {hit['zone_id']: hit['zone'] for hit in hits}
+        with lock:
+            new = current - active
+            checked = set(drone_ids)
+            active.difference_update({entry for entry in active if entry[0] in checked} - current)
+            active.update(current)
+        for drone_id, zone_id, kind in new:
+            raise_path_alert(alert_manager, drone_id, names[zone_id], zone_id, kind)
+
+    return apply
+
+
+def raise_path_alert(alert_manager, drone_id, zone, zone_id, kind):
+    """Raise (or fold into) the alert group of flight paths crossing or skirting a zone"""
+    if kind == VIOLATION:
+        alert_manager.raise_alert('Critical', 'Flight Path Through Restricted Airspace',
+                                  f"{drone_id}'s path enters no-fly zone {zone}",
+                                  location=drone_id, key=f"geofence-path:{zone_id}:{kind}")
+    else:
+        alert_manager.raise_alert('Warning', 'Flight Path Near Restricted Airspace',
+                                  f"{drone_id}'s path passes close to no-fly zone {zone}",
+                                  location=drone_id, key=f"geofence-path:{zone_id}:{kind}")
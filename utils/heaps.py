@@ -0,0 +1,31 @@
+"""Heap helpers shared by the alert and expiry indexes"""
+import heapq
+
+
+def heap_top_k(heap, k, is_live=None):
+    """The k smallest live entries of a binary heap, in order, without popping
+
+    Walks the heap best-first with a small frontier heap seeded at the root:
+    every visited node pushes its two children, so finding k entries costs
+    O(k log k) plus one step per stale (lazily deleted) entry passed over.
+    """
+    out = []
+    if not heap or k <= 0:
+        return out
+
+    frontier = [(heap[0], 0)]
+    size = len(heap)
+    while frontier and len(out) < k:
+        entry, i = heapq.heappop(frontier)
+        if is_live is None or is_live(entry):
+            out.append(entry)
+        for child in (2 * i + 1, 2 * i + 2):
+            if child < size:
+                heapq.heappush(frontier, (heap[child], child))
+    return out
+
+
+def compact(heap, is_live):
+    """Drop stale entries in place and restore the heap invariant"""
+    heap[:] = [entry for entry in heap if is_live(entry)]
+    heapq.heapify(heap)
@@ -0,0 +1,430 @@
+"""Append-only medical inventory ledger
+
+Every stock movement is an event appended to a columnar log:
+
+* a receipt adds units of a SKU batch at a location,
+* a pick removes units for a delivery,
+* a transfer moves units from one location to another,
+* a write-off removes damaged or expired units.
+
+Events are never edited; a correction is another event.
+
+Current stock per (SKU, batch, location) is a dict updated as events are
+appended, so a balance is one lookup and a SKU total one array read.
+Every SNAPSHOT_INTERVAL events the balances are copied into a snapshot
+tagged with its log position. Rebuilding the balances (after a restart,
+as of an earlier event, or to audit the live ones) starts from the
+nearest snapshot and replays only the events after it, as one
+vectorized scatter-add.
+
+Batches received with an expiry date sit in a min-heap keyed on expiry
+while they hold stock. The k soonest-expiring batches are a best-first
+walk of the heap's top (O(k log k), see utils.heaps) rather than a scan
+and sort of every batch; batches that ran out are dropped lazily. Picks
+draw a SKU down first-expired-first-out.
+
+Writers serialize on the ledger's lock; balance reads never take it. Each
+write publishes fresh per-SKU totals and per-SKU position lists by
+swapping references, the log count moves only after the rows are
+written, and a balance read is a single dict lookup. A burst of
+restocking therefore never stalls a dashboard render. Only the expiry
+walk takes the lock, for its few microseconds.
+"""
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.drone_data import to_local_datetime64
+from utils.heaps import compact, heap_top_k
+from utils.sync import new_lock, synchronized
+
+RECEIPT, PICK, TRANSFER, WRITE_OFF = 'Receipt', 'Pick', 'Transfer', 'Write-off'
+EVENT_KINDS = [RECEIPT, PICK, TRANSFER, WRITE_OFF]
+_KIND = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+EVENT_COLUMNS = ['seq', 'timestamp', 'kind', 'sku', 'batch', 'location', 'to_location', 'quantity', 'reference']
+
+SNAPSHOT_INTERVAL = 10_000
+SNAPSHOTS_KEPT = 4
+
+# Location codes are stored as int16
+MAX_LOCATIONS = np.iinfo(np.int16).max + 1
+
+
+def _bits(count):
+    """Bits that hold every code below ``count``"""
+    return max(count - 1, 1).bit_length()
+
+
+def _pack(sku, batch, location, batch_bits, location_bits):
+    """One int64 key per (sku, batch, location); the widths cover every registered code"""
+    return ((sku.astype(np.int64) << (batch_bits + location_bits)) | (batch.astype(np.int64) << location_bits)
+            | location.astype(np.int64))
+
+
+def _unpack(keys, batch_bits, location_bits):
+    return (keys >> (batch_bits + location_bits), (keys >> location_bits) & ((1 << batch_bits) - 1),
+            keys & ((1 << location_bits) - 1))
+
+
+class InventoryLedger:
+    """Event log of stock movements with O(1) balances and snapshot replay"""
+
+    def __init__(self, capacity=1024, snapshot_interval=SNAPSHOT_INTERVAL):
+        self._lock = new_lock()
+        self.snapshot_interval = snapshot_interval
+
+        # Label registries; codes are positions in the label lists
+        self._skus, self._sku_labels = {}, []
+        self._batches, self._batch_labels = {}, []  # keyed by (sku code, batch label)
+        self._batch_sku, self._batch_expiry = [], []
+        self._batch_units = []  # units per batch across all locations
+        self._locations, self._location_labels = {}, []
+
+        # The log, one row per event
+        self._count = 0
+        self._time = np.zeros(capacity)
+        self._kind = np.zeros(capacity, dtype=np.int8)
+        self._sku = np.zeros(capacity, dtype=np.int32)
+        self._batch = np.zeros(capacity, dtype=np.int32)
+        self._location = np.zeros(capacity, dtype=np.int16)
+        self._to_location = np.full(capacity, -1, dtype=np.int16)
+        self._quantity = np.zeros(capacity, dtype=np.int64)
+        self._reference = np.empty(capacity, dtype=object)
+
+        # Derived state
+        self._balances = {}  # (sku, batch, location) codes -> units
+        self._positions = {}  # sku code -> tuple of (batch, location) codes ever stocked
+        self._totals = np.zeros(0, dtype=np.int64)  # published units per SKU
+        self._totals.setflags(write=False)
+        self._snapshots = deque(maxlen=SNAPSHOTS_KEPT)  # (seq, balances)
+        self._expiry_heap = []  # (expires_at, batch, generation); stale when the batch emptied or was re-filed
+        self._generation = []  # per batch, bumped every time it is filed in the heap
+        self.version = 0
+
+    def __len__(self):
+        return self._count
+
+    # ------------------------------------------------------------------
+    # Labels
+    # ------------------------------------------------------------------
+    def _code(self, registry, labels, label):
+        code = registry.get(label)
+        if code is None:
+            code = registry[label] = len(labels)
+            labels.append(label)
+        return code
+
+    def _batch_code(self, sku, batch, expires_at=None):
+        key = (sku, batch)
+        code = self._batches.get(key)
+        if code is None:
+            code = self._batches[key] = len(self._batch_labels)
+            self._batch_labels.append(batch)
+            self._batch_sku.append(sku)
+            self._batch_expiry.append(np.nan if expires_at is None else float(expires_at))
+            self._batch_units.append(0)
+            self._generation.append(0)
+        elif expires_at is not None and np.isnan(self._batch_expiry[code]):
+            self._batch_expiry[code] = float(expires_at)
+            if self._batch_units[code] > 0:
+                self._file_batch(code)
+        return code
+
+    def _file_batch(self, b):
+        """Put a batch that holds stock into the expiry heap"""
+        if np.isnan(self._batch_expiry[b]):
+            return
+        self._generation[b] += 1
+        heapq.heappush(self._expiry_heap, (self._batch_expiry[b], b, self._generation[b]))
+        if len(self._expiry_heap) > 2 * len(self._batch_labels) + 64:
+            compact(self._expiry_heap, self._is_live)
+
+    def _is_live(self, entry):
+        _, b, generation = entry
+        return self._generation[b] == generation and self._batch_units[b] > 0
+
+    def sku_code(self, sku):
+        """Code of a SKU label, or None if the ledger has never seen it"""
+        return self._skus.get(sku)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def receive(self, sku, batch, location, quantity, expires_at=None, reference=None, timestamp=None):
+        """Units of a batch arrived at a location; ``expires_at`` is POSIX seconds"""
+        return self.append_many([(RECEIPT, sku, batch, location, quantity, None, reference)],
+                                expires_at={(sku, batch): expires_at}, timestamp=timestamp)
+
+    def pick(self, sku, batch, location, quantity, reference=None, timestamp=None):
+        """Units left a location for a delivery"""
+        return self.append_many([(PICK, sku, batch, location, quantity, None, reference)], timestamp=timestamp)
+
+    def transfer(self, sku, batch, from_location, to_location, quantity, reference=None, timestamp=None):
+        """Units moved between locations"""
+        return self.append_many([(TRANSFER, sku, batch, from_location, quantity, to_location, reference)],
+                                timestamp=timestamp)
+
+    def write_off(self, sku, batch, location, quantity, reference=None, timestamp=None):
+        """Units were discarded (expired, damaged, lost)"""
+        return self.append_many([(WRITE_OFF, sku, batch, location, quantity, None, reference)],
+                                timestamp=timestamp)
+
+    @synchronized
+    def take(self, sku, quantity, kind=PICK, reference=None, timestamp=None):
+        """Remove up to ``quantity`` units of a SKU from wherever it is stocked
+
+        Batches are drawn down first-expired-first-out; batches without an
+        expiry date go last, in the order they were first stocked. Returns
+        the picks as (batch, location, units) tuples, which add up to less
+        than ``quantity`` when the SKU runs out.
+        """
+        if kind not in (PICK, WRITE_OFF):
+            raise ValueError(f"Stock can only be taken by {PICK} or {WRITE_OFF}, not '{kind}'")
+        s = self._skus.get(sku)
+        positions = sorted(self._positions.get(s, ()), key=lambda position: np.nan_to_num(
+            self._batch_expiry[position[0]], nan=np.inf))
+        picks, left = [], int(quantity)
+        for b, loc in positions:
+            if left <= 0:
+                break
+            units = min(left, self._balances.get((s, b, loc), 0))
+            if units > 0:
+                picks.append((self._batch_labels[b], self._location_labels[loc], units))
+                left -= units
+        self.append_many([(kind, sku, batch, location, units, None, reference) for batch, location, units in picks],
+                         timestamp=timestamp)
+        return picks
+
+    @synchronized
+    def append_many(self, events, expires_at=None, timestamp=None):
+        """Append a batch of events atomically; returns the seq of the last one
+
+        Each event is ``(kind, sku, batch, location, quantity, to_location,
+        reference)``; ``to_location`` is only used by transfers.
+        ``expires_at`` maps (sku, batch) labels to the expiry of new batches.
+        The whole batch is rejected with ValueError if any event is invalid
+        or would take a balance below zero; nothing is registered or
+        written until every event has passed.
+        """
+        events = list(events)
+        expires_at = expires_at or {}
+
+        # Validate against the balances as the batch goes, keyed by labels
+        pending, new_locations = {}, set()
+        for kind, sku, batch, location, quantity, to_location, reference in events:
+            if kind not in _KIND:
+                raise ValueError(f"Unknown ledger event kind '{kind}'")
+            quantity = int(quantity)
+            if quantity <= 0:
+                raise ValueError(f"Ledger quantities must be positive, got {quantity}")
+            if kind == TRANSFER and to_location is None:
+                raise ValueError("A transfer needs a destination location")
+            new_locations.update(label for label in (location, to_location)
+                                 if label is not None and label not in self._locations)
+
+            key = (sku, batch, location)
+            if kind == RECEIPT:
+                pending[key] = pending[key] if key in pending else self.balance(*key)
+                pending[key] += quantity
+            else:
+                available = pending[key] if key in pending else self.balance(*key)
+                if quantity > available:
+                    raise ValueError(f"Only {available} units of {sku} batch {batch} at {location}, "
+                                     f"cannot remove {quantity}")
+                pending[key] = available - quantity
+                if kind == TRANSFER:
+                    to_key = (sku, batch, to_location)
+                    pending[to_key] = (pending[to_key] if to_key in pending else self.balance(*to_key)) + quantity
+        if len(self._location_labels) + len(new_locations) > MAX_LOCATIONS:
+            raise ValueError(f"The ledger holds at most {MAX_LOCATIONS} locations")
+        if not events:
+            return self._count - 1
+
+        # Every event passed: register its labels and write it
+        rows = []
+        for kind, sku, batch, location, quantity, to_location, reference in events:
+            s = self._code(self._skus, self._sku_labels, sku)
+            b = self._batch_code(s, batch, expires_at.get((sku, batch)))
+            loc = self._code(self._locations, self._location_labels, location)
+            to = self._code(self._locations, self._location_labels, to_location) if kind == TRANSFER else -1
+            rows.append((_KIND[kind], s, b, loc, to, int(quantity), reference))
+        balances = {}
+        for (sku, batch, location), units in pending.items():
+            s = self._skus[sku]
+            balances[(s, self._batches[(s, batch)], self._locations[location])] = units
+
+        self._write_rows(rows, time.time() if timestamp is None else timestamp)
+        self._apply(balances)
+        if self._count // self.snapshot_interval > (self._count - len(rows)) // self.snapshot_interval:
+            self._snapshots.append((self._count, dict(self._balances)))
+        self.version += 1
+        return self._count - 1
+
+    def _write_rows(self, rows, timestamp):
+        start, end = self._count, self._count + len(rows)
+        self._reserve(end)
+        kind, sku, batch, location, to_location, quantity, reference = zip(*rows)
+        self._time[start:end] = timestamp
+        self._kind[start:end] = kind
+        self._sku[start:end] = sku
+        self._batch[start:end] = batch
+        self._location[start:end] = location
+        self._to_location[start:end] = to_location
+        self._quantity[start:end] = quantity
+        self._reference[start:end] = reference
+        # Readers slice up to _count, so it moves only once the rows are in place
+        self._count = end
+
+    def _reserve(self, rows):
+        capacity = len(self._time)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2)
+        for name, fill in (('_time', 0), ('_kind', 0), ('_sku', 0), ('_batch', 0), ('_location', 0),
+                           ('_to_location', -1), ('_quantity', 0), ('_reference', None)):
+            old = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _apply(self, pending):
+        """Commit new balances and publish the SKU totals and positions they change"""
+        totals = np.zeros(len(self._sku_labels), dtype=np.int64)
+        totals[:len(self._totals)] = self._totals
+        positions = {}
+        for key, units in pending.items():
+            s, b, loc = key
+            previous = self._balances.get(key)
+            if previous is None:
+                known = positions.get(s, self._positions.get(s, ()))
+                positions[s] = known + ((b, loc),)
+                previous = 0
+            self._balances[key] = units
+            totals[s] += units - previous
+            held = self._batch_units[b]
+            self._batch_units[b] = held + units - previous
+            if held <= 0 < self._batch_units[b]:
+                self._file_batch(b)
+        self._positions.update(positions)
+        totals.setflags(write=False)
+        self._totals = totals
+
+    @synchronized
+    def snapshot(self):
+        """Snapshot the current balances now; returns the log position it covers"""
+        self._snapshots.append((self._count, dict(self._balances)))
+        return self._count
+
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+    def replay(self, seq=None):
+        """Balances as of event ``seq`` (inclusive; default the whole log)
+
+        Starts from the newest snapshot at or before that point and folds in
+        the events after it. Returns a dict of (sku, batch, location) codes
+        to units, without zero balances.
+        """
+        end = self._count if seq is None else min(seq + 1, self._count)
+        start, balances = 0, {}
+        for position, snapshot in reversed(tuple(self._snapshots)):
+            if position <= end:
+                start, balances = position, dict(snapshot)
+                break
+
+        kind = self._kind[start:end]
+        quantity = self._quantity[start:end]
+        sign = np.where(kind == _KIND[RECEIPT], 1, -1)
+        moved = kind == _KIND[TRANSFER]
+        sku = np.concatenate([self._sku[start:end], self._sku[start:end][moved]])
+        batch = np.concatenate([self._batch[start:end], self._batch[start:end][moved]])
+        location = np.concatenate([self._location[start:end], self._to_location[start:end][moved]])
+        delta = np.concatenate([sign * quantity, quantity[moved]])
+
+        # Label lists only grow, so their lengths bound every code read above
+        batch_bits, location_bits = _bits(len(self._batch_labels)), _bits(len(self._location_labels))
+        if _bits(len(self._sku_labels)) + batch_bits + location_bits < 63:
+            keys, inverse = np.unique(_pack(sku, batch, location, batch_bits, location_bits), return_inverse=True)
+            codes = _unpack(keys, batch_bits, location_bits)
+        else:
+            keys, inverse = np.unique(np.column_stack([sku, batch, location]), axis=0, return_inverse=True)
+            codes = keys.T
+        sums = np.bincount(inverse.ravel(), weights=delta, minlength=len(keys)).astype(np.int64)
+        for s, b, loc, units in zip(*(part.tolist() for part in codes), sums.tolist()):
+            balances[(s, b, loc)] = balances.get((s, b, loc), 0) + units
+        return {key: units for key, units in balances.items() if units}
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def expiring(self, k=10, before=None):
+        """The k soonest-expiring batches that hold stock, soonest first
+
+        Only batches expiring before ``before`` (POSIX seconds) when given.
+        """
+        entries = heap_top_k(self._expiry_heap, k, self._is_live)
+        if before is not None:
+            entries = [entry for entry in entries if entry[0] < before]
+        batches = [b for _, b, _ in entries]
+        return pd.DataFrame({
+            'sku': [self._sku_labels[self._batch_sku[b]] for b in batches],
+            'batch': [self._batch_labels[b] for b in batches],
+            'quantity': np.array([self._batch_units[b] for b in batches], dtype=np.int64),
+            'expires_at': to_local_datetime64(np.array([expiry for expiry, _, _ in entries], dtype=np.float64)),
+        })
+
+    # Lock-free reads
+    def balance(self, sku, batch, location):
+        """Units of one SKU batch at one location"""
+        s = self._skus.get(sku)
+        b = self._batches.get((s, batch))
+        loc = self._locations.get(location)
+        return self._balances.get((s, b, loc), 0)
+
+    def sku_totals(self):
+        """Read-only array of units per SKU, indexed by SKU code"""
+        return self._totals
+
+    def total(self, sku):
+        """Units of a SKU across all batches and locations"""
+        s = self._skus.get(sku)
+        totals = self._totals
+        return int(totals[s]) if s is not None and s < len(totals) else 0
+
+    def positions(self, sku):
+        """Batches and locations holding a SKU, with units and batch expiry"""
+        s = self._skus.get(sku)
+        keys = self._positions.get(s, ())
+        units = [self._balances.get((s, b, loc), 0) for b, loc in keys]
+        expiry = np.array([self._batch_expiry[b] for b, _ in keys], dtype=np.float64)
+        frame = pd.DataFrame({
+            'batch': [self._batch_labels[b] for b, _ in keys],
+            'location': [self._location_labels[loc] for _, loc in keys],
+            'quantity': np.array(units, dtype=np.int64),
+            'expires_at': to_local_datetime64(expiry),
+        })
+        return frame[frame['quantity'] > 0].reset_index(drop=True)
+
+    def events(self, limit=None):
+        """The latest ``limit`` events (default all), oldest first"""
+        end = self._count
+        start = 0 if limit is None else max(0, end - limit)
+        kind, sku = self._kind[start:end], self._sku[start:end]
+        batch, location = self._batch[start:end], self._location[start:end]
+        to_location = self._to_location[start:end]
+        locations = np.array(self._location_labels + [None], dtype=object)  # -1 picks the trailing None
+        return pd.DataFrame({
+            'seq': np.arange(start, end),
+            'timestamp': to_local_datetime64(self._time[start:end]),
+            'kind': np.array(EVENT_KINDS, dtype=object)[kind],
+            'sku': np.array(self._sku_labels, dtype=object)[sku],
+            'batch': np.array(self._batch_labels, dtype=object)[batch],
+            'location': locations[location],
+            'to_location': locations[to_location],
+            'quantity': self._quantity[start:end],
+            'reference': self._reference[start:end],
+        }, columns=EVENT_COLUMNS)
@@ -0,0 +1,310 @@
+"""Component maintenance records for the Life-Line Air fleet
+
+One record per (drone, component), held column-wise in NumPy arrays; the
+record of drone row d and component c sits at d * len(COMPONENTS) + c.
+Health is a dense float32 drones x components matrix (the flat record
+column is a view of it). A component report updates its cell in place,
+the per-component running sums and that drone's worst component. The
+heatmap, per-component means and worst-drone queries then read the
+matrix and sums directly instead of reshaping a frame. Records are also
+filed in a ServiceIndex by next service time, so due and overdue lookups
+are binary searches.
+Failure probabilities come from the trained model in utils.failure_model
+and are cached per record. A component report or service marks only that
+record for re-scoring. The day count since service moves for every record
+at midnight, so the first read of a new day re-scores them all once.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.drone_data import to_local_datetime64
+from utils.failure_model import COMPONENTS, component_features
+from utils.scheduling import ServiceIndex
+from utils.sync import new_lock, synchronized
+
+HEALTH_STATUSES = ['Critical', 'Warning', 'Good']
+# Health below these scores is Critical / Warning
+CRITICAL_HEALTH = 70
+WARNING_HEALTH = 85
+TECHNICIANS = ['Tech-A', 'Tech-B', 'Tech-C', 'Tech-D']
+MAINTENANCE_PRIORITIES = ['High', 'Medium', 'Low']
+SERVICE_INTERVAL_DAYS = 60
+# Weight of the newest reading in the health trend average
+TREND_SMOOTHING = 0.3
+
+_LABELS = {
+    'component': np.array(COMPONENTS, dtype=object),
+    'status': np.array(HEALTH_STATUSES, dtype=object),
+    'technician': np.array(TECHNICIANS, dtype=object),
+    'priority': np.array(MAINTENANCE_PRIORITIES, dtype=object),
+}
+
+
+def health_status(health):
+    """Status codes (indexes into HEALTH_STATUSES) for health scores"""
+    return np.select([health < CRITICAL_HEALTH, health < WARNING_HEALTH], [0, 1], default=2).astype(np.int8)
+
+
+class MaintenanceManager:
+    """Per-component health, usage and service state with cached failure scores"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('get_records', 'failure_probabilities', 'drone_ids', 'health_matrix', 'component_means',
+                    'status_summary', 'worst_components', 'service_between', 'service_count')
+
+    def __init__(self, drone_ids, model, seed=None):
+        self._lock = new_lock()
+        self.model = model
+        self._ids = np.array(drone_ids, dtype=object)
+        self._rows = {drone_id: i for i, drone_id in enumerate(drone_ids)}
+        self._columns = {component: i for i, component in enumerate(COMPONENTS)}
+        n = len(drone_ids) * len(COMPONENTS)
+        self._component = np.tile(np.arange(len(COMPONENTS), dtype=np.int8), len(drone_ids))
+
+        self._health_matrix = np.zeros((len(drone_ids), len(COMPONENTS)), dtype=np.float32)
+        self._health = self._health_matrix.reshape(-1)  # flat record view of the matrix
+        self._health_sum = np.zeros(len(COMPONENTS))  # per-component running sums
+        self._worst = np.zeros(len(drone_ids), dtype=np.intp)  # column of each drone's lowest health
+        self._trend = np.zeros(n, dtype=np.float32)  # health points per 100 flight hours
+        self._flight_hours = np.zeros(n, dtype=np.float32)
+        self._cycles = np.zeros(n, dtype=np.int32)
+        self._last_service = np.zeros(n)  # POSIX seconds
+        self._next_service = np.zeros(n)
+        self._cost = np.zeros(n, dtype=np.float32)
+        self._technician = np.zeros(n, dtype=np.int8)
+        self._priority = np.zeros(n, dtype=np.int8)
+
+        self._failure = np.zeros(n, dtype=np.float32)
+        self._failure_sum = np.zeros(len(COMPONENTS))
+        self._dirty = np.ones(n, dtype=bool)
+        self._scored_day = None
+        self.last_scored = 0
+        self.version = 0
+
+        self._seed_records(np.random.default_rng(seed))
+        self._schedule = ServiceIndex(self._next_service)
+
+    def __len__(self):
+        return len(self._health)
+
+    def _record(self, drone_id, component):
+        return self._rows[drone_id] * len(COMPONENTS) + self._columns[component]
+
+    def _set_health(self, r, health_score):
+        """Write one cell of the health matrix and keep the sums and worst column current"""
+        d, c = divmod(r, len(COMPONENTS))
+        self._health_sum[c] += health_score - self._health[r]
+        self._health[r] = health_score
+        self._worst[d] = self._health_matrix[d].argmin()
+
+    def _recount(self):
+        """Recompute the running sums and worst columns from scratch"""
+        self._health_sum = self._health_matrix.sum(axis=0, dtype=np.float64)
+        self._failure_sum = self._failure.reshape(self._health_matrix.shape).sum(axis=0, dtype=np.float64)
+        self._worst = self._health_matrix.argmin(axis=1)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def report_component(self, drone_id, component, health_score, flight_hours=None, cycles=None):
+        """Record a component health reading and, optionally, its usage counters"""
+        r = self._record(drone_id, component)
+        if flight_hours is not None:
+            flown = flight_hours - self._flight_hours[r]
+            if flown > 0:
+                rate = (health_score - self._health[r]) / flown * 100
+                self._trend[r] = TREND_SMOOTHING * rate + (1 - TREND_SMOOTHING) * self._trend[r]
+            self._flight_hours[r] = flight_hours
+        if cycles is not None:
+            self._cycles[r] = cycles
+        self._set_health(r, health_score)
+        self._dirty[r] = True
+        self.version += 1
+
+    @synchronized
+    def log_service(self, drone_id, component, technician=None, timestamp=None):
+        """A component was serviced: health restored and the next service scheduled"""
+        r = self._record(drone_id, component)
+        now = datetime.now().timestamp() if timestamp is None else timestamp
+        self._set_health(r, 100)
+        self._trend[r] = 0
+        self._last_service[r] = now
+        self._schedule.move(r, self._next_service[r], now + SERVICE_INTERVAL_DAYS * 86400)
+        self._next_service[r] = now + SERVICE_INTERVAL_DAYS * 86400
+        if technician is not None:
+            self._technician[r] = TECHNICIANS.index(technician)
+        self._dirty[r] = True
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def _refresh_scores(self):
+        """Re-score the records whose features changed since they were last scored"""
+        now = datetime.now().timestamp()
+        today = int(now // 86400)
+        rollover = today != self._scored_day
+        if rollover:
+            self._dirty[:] = True
+            self._scored_day = today
+
+        rows = np.flatnonzero(self._dirty)
+        self.last_scored = len(rows)
+        if not len(rows):
+            return
+        days_since_service = np.floor((now - self._last_service[rows]) / 86400)
+        X = component_features(self._component[rows], self._flight_hours[rows], self._cycles[rows],
+                               self._health[rows], self._trend[rows], days_since_service)
+        scores = self.model.predict(X)
+        self._failure_sum += np.bincount(self._component[rows], scores - self._failure[rows],
+                                         minlength=len(COMPONENTS))
+        self._failure[rows] = scores
+        self._dirty[rows] = False
+        if rollover:
+            # Full re-score: also clear any drift in the running sums
+            self._recount()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def drone_ids(self):
+        """Ids of the drones with records, in row order"""
+        return self._ids.tolist()
+
+    @synchronized
+    def failure_probabilities(self):
+        """Failure probability of every record, in record order"""
+        self._refresh_scores()
+        return self._failure.copy()
+
+    @synchronized
+    def health_matrix(self, drone_ids=None):
+        """(drones x components float32 matrix, drone ids, component names)
+
+        All drones in row order, or only ``drone_ids`` in the given order.
+        """
+        if drone_ids is None:
+            return self._health_matrix.copy(), self._ids.tolist(), list(COMPONENTS)
+        rows = np.fromiter((self._rows[drone_id] for drone_id in drone_ids), dtype=np.intp, count=len(drone_ids))
+        return self._health_matrix[rows], list(drone_ids), list(COMPONENTS)
+
+    @synchronized
+    def component_means(self):
+        """Mean health score and failure probability per component"""
+        self._refresh_scores()
+        drones = max(len(self._ids), 1)
+        return pd.DataFrame({
+            'component': COMPONENTS,
+            'health_score': self._health_sum / drones,
+            'failure_probability': self._failure_sum / drones,
+        })
+
+    @synchronized
+    def worst_components(self, k=10):
+        """The k drones whose weakest component is in the worst health, worst first"""
+        self._refresh_scores()
+        worst_health = self._health_matrix[np.arange(len(self._ids)), self._worst]
+        k = min(k, len(worst_health))
+        rows = np.argpartition(worst_health, k - 1)[:k] if k < len(worst_health) else np.arange(k)
+        rows = rows[np.argsort(worst_health[rows], kind='stable')]
+        records = rows * len(COMPONENTS) + self._worst[rows]
+        return pd.DataFrame({
+            'drone_id': self._ids[rows],
+            'component': _LABELS['component'][self._worst[rows]],
+            'health_score': worst_health[rows],
+            'failure_probability': self._failure[records],
+        })
+
+    @synchronized
+    def service_between(self, start=None, end=None, limit=None):
+        """Records due for service in [start, end) (POSIX seconds), soonest first"""
+        records = self._schedule.between(start, end, limit)
+        rows = records // len(COMPONENTS)
+        return pd.DataFrame({
+            'drone_id': self._ids[rows],
+            'component': _LABELS['component'][self._component[records]],
+            'next_service': to_local_datetime64(self._next_service[records]),
+            'health_score': self._health[records],
+            'priority': _LABELS['priority'][self._priority[records]],
+        })
+
+    @synchronized
+    def service_count(self, start=None, end=None):
+        """Number of records due for service in [start, end)"""
+        return self._schedule.count(start, end)
+
+    @synchronized
+    def status_summary(self):
+        """Record counts, repair costs and open items per technician by health status, and total flight hours"""
+        status = health_status(self._health)
+        open_items = status < HEALTH_STATUSES.index('Good')
+        counts = np.bincount(status, minlength=len(HEALTH_STATUSES))
+        costs = np.bincount(status, self._cost, minlength=len(HEALTH_STATUSES))
+        workload = np.bincount(self._technician[open_items], minlength=len(TECHNICIANS))
+        return {
+            'status_counts': dict(zip(HEALTH_STATUSES, counts.tolist())),
+            'status_costs': dict(zip(HEALTH_STATUSES, costs.tolist())),
+            'technician_workload': dict(zip(TECHNICIANS, workload.tolist())),
+            'flight_hours': float(self._flight_hours.sum(dtype=np.float64)),
+        }
+
+    @synchronized
+    def get_records(self, drone_ids=None, component=None, status=None, limit=None):
+        """One row per (drone, component) for the maintenance tables and charts
+
+        The filters select records on the columns before the frame is built.
+        With ``limit``, only that many records are returned, worst health first;
+        otherwise they are in record order.
+        """
+        self._refresh_scores()
+        if drone_ids is None:
+            records = np.arange(len(self._health))
+        else:
+            rows = np.fromiter((self._rows[drone_id] for drone_id in drone_ids), dtype=np.intp,
+                               count=len(drone_ids))
+            records = (rows[:, None] * len(COMPONENTS) + np.arange(len(COMPONENTS))).reshape(-1)
+        if component is not None:
+            records = records[self._component[records] == self._columns[component]]
+        if status is not None:
+            records = records[health_status(self._health[records]) == HEALTH_STATUSES.index(status)]
+        if limit is not None:
+            if limit < len(records):
+                records = records[np.argpartition(self._health[records], limit - 1)[:limit]]
+            records = records[np.argsort(self._health[records], kind='stable')]
+
+        health = self._health[records]
+        return pd.DataFrame({
+            'drone_id': self._ids[records // len(COMPONENTS)],
+            'component': _LABELS['component'][self._component[records]],
+            'health_score': health,
+            'status': _LABELS['status'][health_status(health)],
+            'last_service': to_local_datetime64(self._last_service[records]),
+            'next_service': to_local_datetime64(self._next_service[records]),
+            'flight_hours': self._flight_hours[records],
+            'cycles': self._cycles[records],
+            'failure_probability': self._failure[records],
+            'estimated_cost': self._cost[records],
+            'technician': _LABELS['technician'][self._technician[records]],
+            'priority': _LABELS['priority'][self._priority[records]],
+        })
+
+    # ------------------------------------------------------------------
+    # Simulated data
+    # ------------------------------------------------------------------
+    def _seed_records(self, rng):
+        """Simulated component state for the whole fleet"""
+        n = len(self._health)
+        now = datetime.now().timestamp()
+        self._health[:] = rng.uniform(60, 100, size=n)
+        self._flight_hours[:] = rng.uniform(0, 500, size=n)
+        self._cycles[:] = rng.integers(0, 1000, size=n)
+        self._trend[:] = np.clip(-(100 - self._health) / np.maximum(self._flight_hours, 10) * 100, -30, 0)
+        self._last_service[:] = now - rng.integers(1, 180, size=n) * 86400.0
+        self._next_service[:] = self._last_service + rng.integers(30, 90, size=n) * 86400.0
+        self._cost[:] = rng.uniform(100, 2000, size=n)
+        self._technician[:] = rng.integers(0, len(TECHNICIANS), size=n)
+        self._priority[:] = rng.integers(0, len(MAINTENANCE_PRIORITIES), size=n)
+        self._recount()
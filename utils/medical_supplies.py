@@ -0,0 +1,358 @@
+"""Medical supply inventory manager for the Life-Line Air dashboard
+
+Stock levels are kept by an append-only InventoryLedger (see
+utils.inventory_ledger): receipts, picks and restocks are ledger events,
+and an item's current stock is its ledger total. Every item carries a
+stock status code. Codes are classified for the whole inventory in one
+vectorized pass, and a stock change reclassifies only the items it
+touched. Per-status counts are adjusted by the difference, so the
+overview never rescans the inventory.
+
+Item search goes through a trigram index (utils.search) built once over
+the catalogue and extended as items are added.
+
+Deliveries are loaded first-expired-first-out from the ledger's batches,
+and the expiring-items panel reads the ledger's batch expiry heap.
+
+Ledger writes happen outside the manager's lock; the lock is held only
+to pull the new totals in and reclassify, so a burst of restocking does
+not hold up dashboard reads.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from utils.drone_data import to_local_datetime64
+from utils.inventory_ledger import PICK, RECEIPT, InventoryLedger
+from utils.search import TrigramIndex
+from utils.sync import new_lock, synchronized
+
+MEDICAL_CATALOGUE = {
+    'Blood Products': ['O+ Blood Pack', 'O- Blood Pack', 'A+ Blood Pack', 'A- Blood Pack', 'B+ Blood Pack', 'AB+ Blood Pack'],
+    'Emergency Medications': ['Epinephrine', 'Morphine', 'Atropine', 'Naloxone', 'Adenosine', 'Amiodarone'],
+    'IV Fluids': ['Normal Saline', 'Lactated Ringers', 'D5W', 'Plasma Expander'],
+    'Surgical Supplies': ['Trauma Kit', 'Suture Kit', 'Emergency Airway Kit', 'Chest Tube Kit'],
+    'Vaccines': ['COVID-19 Vaccine', 'Hepatitis B', 'Tetanus Toxoid', 'Rabies Vaccine'],
+    'Equipment': ['Portable Defibrillator', 'Oxygen Tank', 'Blood Glucose Monitor', 'Thermometer'],
+}
+
+STOCK_STATUSES = ['Critical', 'Low', 'Normal', 'Overstocked']
+CRITICAL, LOW, NORMAL, OVERSTOCKED = range(len(STOCK_STATUSES))
+# Stock up to this multiple of the minimum is Low; at or above this share of the maximum, Overstocked
+LOW_STOCK_FACTOR = 1.5
+OVERSTOCK_FACTOR = 0.8
+
+TEMPERATURE_BANDS = ['2-8°C', 'Room Temp', '-20°C']
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+STORAGE_UNITS = ['Storage Unit A', 'Storage Unit B', 'Storage Unit C', 'Storage Unit D']
+SUPPLIERS = ['MedCorp', 'HealthSupply Inc', 'BioTech Ltd', 'MediCore']
+# Shelf life given to batches received without an expiry date
+DEFAULT_SHELF_LIFE_DAYS = 365
+
+
+def classify_stock(current, minimum, maximum):
+    """Stock status codes (indexes into STOCK_STATUSES) for aligned stock arrays
+
+    The first matching rule wins: at or below the minimum is Critical, up to
+    LOW_STOCK_FACTOR x minimum is Low, from OVERSTOCK_FACTOR x maximum up is
+    Overstocked, anything else is Normal.
+    """
+    return np.select(
+        [current <= minimum, current <= minimum * LOW_STOCK_FACTOR, current >= maximum * OVERSTOCK_FACTOR],
+        [CRITICAL, LOW, OVERSTOCKED],
+        default=NORMAL,
+    ).astype(np.int8)
+
+
+class MedicalSupplyManager:
+    """Stock levels of the medical catalogue, held as NumPy columns over an inventory ledger"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('get_inventory_overview', 'get_inventory', 'get_status_counts', 'get_stock', 'item_names',
+                    'get_positions', 'get_movements', 'get_expiring_batches', 'search_items',
+                    'get_temperature_band')
+
+    def __init__(self, seed=None, ledger=None):
+        self._lock = new_lock()
+        self._rng = rng = np.random.default_rng(seed)
+        self.ledger = ledger or InventoryLedger()
+
+        self._names = [item for items in MEDICAL_CATALOGUE.values() for item in items]
+        self._index = {name: i for i, name in enumerate(self._names)}
+        n = len(self._names)
+        self._current = np.zeros(n, dtype=np.int32)
+        self._min = rng.integers(10, 25, size=n).astype(np.int32)
+        self._max = rng.integers(80, 150, size=n).astype(np.int32)
+
+        # Descriptive columns (simulated)
+        self._ids = np.array([f"MED-{i + 1:04d}" for i in range(n)], dtype=object)
+        self._categories = np.array([category for category, items in MEDICAL_CATALOGUE.items() for _ in items], dtype=object)
+        self._temperature = rng.integers(0, len(TEMPERATURE_BANDS), size=n).astype(np.int8)
+        self._expiry = datetime.now().timestamp() + rng.integers(30, 730, size=n) * 86400.0
+        self._priority = rng.integers(0, len(PRIORITIES), size=n).astype(np.int8)
+        self._location = rng.integers(0, len(STORAGE_UNITS), size=n).astype(np.int8)
+        self._batch = np.array([f"BT{b}" for b in rng.integers(1000, 9999, size=n)], dtype=object)
+        self._supplier = rng.integers(0, len(SUPPLIERS), size=n).astype(np.int8)
+        self._cost = rng.uniform(10, 500, size=n)
+
+        self._search = TrigramIndex(self._names, facets={
+            'category': self._categories,
+            'temperature': [TEMPERATURE_BANDS[code] for code in self._temperature],
+            'location': [STORAGE_UNITS[code] for code in self._location],
+        })
+
+        self._seed_stock(rng)
+        self._current[:] = [self.ledger.total(name) for name in self._names]
+        self._status = classify_stock(self._current, self._min, self._max)
+        self._status_counts = np.bincount(self._status, minlength=len(STOCK_STATUSES))
+
+        # Yesterday's availability, so the overview delta has a reference
+        self._availability_by_day = {
+            datetime.now().date() - timedelta(days=1): self._availability() + rng.uniform(-3, 3)
+        }
+        self._record_availability()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    def _availability(self):
+        """Percentage of catalogue items stocked above their minimum"""
+        return float((1 - self._status_counts[CRITICAL] / len(self._names)) * 100)
+
+    def _home(self, i):
+        """(batch, location) labels that new units of item row ``i`` are received into"""
+        return self._batch[i], STORAGE_UNITS[self._location[i]]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def adjust_stock(self, item_name, delta, reference=None):
+        """Add (or remove, with a negative delta) units of one item"""
+        self.adjust_many([item_name], [delta], reference=reference)
+
+    def adjust_many(self, item_names, deltas, reference=None):
+        """Apply a batch of stock changes as ledger events; repeated items accumulate
+
+        Additions are received into the item's home batch and location;
+        removals are picked from wherever the item is stocked, and never
+        take it below zero.
+        """
+        net = {}
+        for name, delta in zip(item_names, deltas):
+            if name not in self._index:
+                raise KeyError(f"Unknown item '{name}'")
+            net[name] = net.get(name, 0) + int(delta)
+
+        receipts = []
+        for name, delta in net.items():
+            if delta > 0:
+                batch, location = self._home(self._index[name])
+                receipts.append((RECEIPT, name, batch, location, delta, None, reference))
+        self.ledger.append_many(receipts)
+        for name, delta in net.items():
+            if delta < 0:
+                self.ledger.take(name, -delta, kind=PICK, reference=reference)
+        self._sync(net)
+
+    def restock(self, item_names=None, reference='Emergency restock'):
+        """Receive a fresh batch of every Critical or Low item (or just ``item_names``) up to its maximum
+
+        Returns {item name: units received}.
+        """
+        with self._lock:
+            if item_names is None:
+                rows = np.flatnonzero(self._status <= LOW)
+            else:
+                rows = np.fromiter((self._index[name] for name in item_names), dtype=np.intp)
+            shortfall = self._max[rows] - self._current[rows]
+            rows, shortfall = rows[shortfall > 0], shortfall[shortfall > 0]
+            batches = [f"BT{b}" for b in self._rng.integers(1000, 9999, size=len(rows))]
+            locations = [STORAGE_UNITS[self._location[i]] for i in rows]
+            names = [self._names[i] for i in rows]
+
+        expires_at = datetime.now().timestamp() + DEFAULT_SHELF_LIFE_DAYS * 86400.0
+        self.ledger.append_many(
+            [(RECEIPT, name, batch, location, int(units), None, reference)
+             for name, batch, location, units in zip(names, batches, locations, shortfall)],
+            expires_at={(name, batch): expires_at for name, batch in zip(names, batches)},
+        )
+        self._sync(names)
+        return dict(zip(names, shortfall.tolist()))
+
+    def add_item(self, item_name, category, initial_stock=0, priority='Medium', temperature='Room Temp',
+                 location=STORAGE_UNITS[0], min_stock=10, max_stock=100, cost_per_unit=0.0, supplier=SUPPLIERS[0]):
+        """Add an item to the catalogue and receive its initial stock; returns its item id"""
+        if not item_name:
+            raise ValueError("An item needs a name")
+        expires_at = datetime.now().timestamp() + DEFAULT_SHELF_LIFE_DAYS * 86400.0
+        batch = f"BT{self._rng.integers(1000, 9999)}"
+        with self._lock:
+            if item_name in self._index:
+                raise ValueError(f"'{item_name}' is already in the inventory")
+            i = len(self._names)
+            item_id = f"MED-{i + 1:04d}"
+            self._names.append(item_name)
+            self._index[item_name] = i
+            for name, value in (('_current', 0), ('_min', min_stock), ('_max', max_stock), ('_ids', item_id),
+                                ('_categories', category), ('_temperature', TEMPERATURE_BANDS.index(temperature)),
+                                ('_expiry', expires_at), ('_priority', PRIORITIES.index(priority)),
+                                ('_location', STORAGE_UNITS.index(location)), ('_batch', batch),
+                                ('_supplier', SUPPLIERS.index(supplier)), ('_cost', cost_per_unit),
+                                ('_status', CRITICAL)):
+                column = getattr(self, name)
+                setattr(self, name, np.append(column, np.array([value], dtype=column.dtype)))
+            self._status_counts[CRITICAL] += 1
+            self._search.add(item_name, category=category, temperature=temperature, location=location)
+            self.version += 1
+
+        if initial_stock > 0:
+            self.ledger.receive(item_name, batch, location, initial_stock, expires_at=expires_at,
+                                reference='Initial stock')
+        self._sync([item_name])
+        return item_id
+
+    def load_delivery(self, item_name, quantity, reference=None):
+        """Pick a delivery's units first-expired-first-out; returns the (batch, location, units) picks"""
+        if item_name not in self._index:
+            raise KeyError(f"Unknown item '{item_name}'")
+        picks = self.ledger.take(item_name, quantity, kind=PICK, reference=reference)
+        self._sync([item_name])
+        return picks
+
+    def unload_delivery(self, item_name, picks, reference=None):
+        """Put the picks of a delivery that will not fly back into their batches"""
+        self.ledger.append_many([(RECEIPT, item_name, batch, location, units, None, reference)
+                                 for batch, location, units in picks])
+        self._sync([item_name])
+
+    def _sync(self, item_names):
+        """Pull the ledger totals of the given items into the stock column and reclassify them"""
+        with self._lock:
+            rows = np.unique(np.fromiter((self._index[name] for name in item_names), dtype=np.intp))
+            if not len(rows):
+                return
+            self._current[rows] = [self.ledger.total(self._names[i]) for i in rows]
+            self._reclassify(rows)
+            self._record_availability()
+            self.version += 1
+
+    def _record_availability(self):
+        """Note today's availability, tomorrow's reference for the overview delta"""
+        self._availability_by_day[datetime.now().date()] = self._availability()
+
+    def _reclassify(self, rows):
+        """Refresh the status of the given items and the per-status counts"""
+        before = self._status[rows]
+        after = classify_stock(self._current[rows], self._min[rows], self._max[rows])
+        self._status[rows] = after
+        self._status_counts += (np.bincount(after, minlength=len(STOCK_STATUSES))
+                                - np.bincount(before, minlength=len(STOCK_STATUSES)))
+
+    @synchronized
+    def get_stock(self, item_name):
+        """Current units of one item"""
+        return int(self._current[self._index[item_name]])
+
+    def item_names(self):
+        """Names of all catalogue items"""
+        return list(self._names)
+
+    @synchronized
+    def get_temperature_band(self, item_name):
+        """Storage temperature requirement of one item, or None for unknown items"""
+        i = self._index.get(item_name)
+        return None if i is None else TEMPERATURE_BANDS[self._temperature[i]]
+
+    @synchronized
+    def get_inventory_overview(self):
+        """Headline inventory numbers for the metrics row"""
+        availability = self._availability()
+        yesterday = self._availability_by_day.get(datetime.now().date() - timedelta(days=1), availability)
+
+        return {
+            'items': len(self._names),
+            'availability': availability,
+            'change': availability - yesterday,
+            'critical': int(self._status_counts[CRITICAL]),
+        }
+
+    @synchronized
+    def get_status_counts(self):
+        """Number of items in each stock status"""
+        return dict(zip(STOCK_STATUSES, self._status_counts.tolist()))
+
+    def get_positions(self, item_name):
+        """Batches and storage units holding an item, from the ledger"""
+        return self.ledger.positions(item_name)
+
+    def get_expiring_batches(self, k=5, within_days=None):
+        """The k soonest-expiring batches in stock, optionally only those expiring within ``within_days``"""
+        now = datetime.now().timestamp()
+        before = None if within_days is None else now + within_days * 86400
+        batches = self.ledger.expiring(k, before=before)
+        days = (batches['expires_at'] - np.datetime64(datetime.fromtimestamp(now))) // pd.Timedelta(days=1)
+        return batches.rename(columns={'sku': 'item_name'}).assign(days_to_expiry=days.astype(np.int64))
+
+    def get_movements(self, limit=20):
+        """The latest stock movements, newest first"""
+        return self.ledger.events(limit).iloc[::-1].reset_index(drop=True)
+
+    @synchronized
+    def search_items(self, query, category=None, temperature=None, location=None, limit=None):
+        """Items whose name fuzzily matches ``query``, best match first, within the given facets"""
+        rows = self._search.search(query, limit=limit, category=category, temperature=temperature,
+                                   location=location)
+        return pd.DataFrame({
+            'item_id': self._ids[rows],
+            'item_name': np.array(self._names, dtype=object)[rows],
+            'category': self._categories[rows],
+            'current_stock': self._current[rows],
+            'stock_status': pd.Categorical.from_codes(self._status[rows], STOCK_STATUSES),
+            'temperature_req': np.array(TEMPERATURE_BANDS, dtype=object)[self._temperature[rows]],
+            'location': np.array(STORAGE_UNITS, dtype=object)[self._location[rows]],
+        })
+
+    @synchronized
+    def get_inventory(self):
+        """The whole inventory as a DataFrame, one row per item"""
+        now = datetime.now().timestamp()
+        return pd.DataFrame({
+            'item_id': self._ids,
+            'category': self._categories,
+            'item_name': self._names,
+            'current_stock': self._current.copy(),
+            'min_stock': self._min.copy(),
+            'max_stock': self._max.copy(),
+            'stock_status': pd.Categorical.from_codes(self._status, STOCK_STATUSES),
+            'temperature_req': np.array(TEMPERATURE_BANDS, dtype=object)[self._temperature],
+            'expiry_date': to_local_datetime64(self._expiry),
+            'days_to_expiry': ((self._expiry - now) // 86400).astype(np.int64),
+            'priority': np.array(PRIORITIES, dtype=object)[self._priority],
+            'location': np.array(STORAGE_UNITS, dtype=object)[self._location],
+            'batch_number': self._batch,
+            'supplier': np.array(SUPPLIERS, dtype=object)[self._supplier],
+            'cost_per_unit': self._cost.copy(),
+        })
+
+    # ------------------------------------------------------------------
+    # Simulated data
+    # ------------------------------------------------------------------
+    def _seed_stock(self, rng, max_batches=3):
+        """Opening stock of every item: its home batch plus up to two older batches elsewhere"""
+        now = datetime.now().timestamp()
+        units = rng.integers(5, 100, size=len(self._names))
+        events, expires_at = [], {}
+        for i, (name, quantity) in enumerate(zip(self._names, units.tolist())):
+            batch, location = self._home(i)
+            older = min(int(rng.integers(0, max_batches)), quantity - 1)
+            for _ in range(older):
+                part = int(rng.integers(1, quantity // 2 + 1))
+                old_batch = f"BT{rng.integers(1000, 9999)}"
+                events.append((RECEIPT, name, old_batch, STORAGE_UNITS[rng.integers(len(STORAGE_UNITS))], part,
+                               None, 'Opening stock'))
+                expires_at[(name, old_batch)] = now + rng.integers(1, max(2, (self._expiry[i] - now) // 86400)) * 86400.0
+                quantity -= part
+            events.append((RECEIPT, name, batch, location, quantity, None, 'Opening stock'))
+            expires_at[(name, batch)] = self._expiry[i]
+        self.ledger.append_many(events, expires_at=expires_at)
@@ -0,0 +1,278 @@
+"""Parquet archive of finished missions, partitioned by day and zone
+
+Missions are written under ARCHIVE_DIR as a hive-partitioned dataset,
+
+    day=2025-03-14/zone=Alpha/part-<token>-0.parquet
+
+so a query for a date range and a set of zones is turned into a filter
+on the partition keys. pyarrow prunes every file outside the range from
+the directory names alone, without opening it, and reads only the
+requested columns of the files that remain.
+
+Writes append new files and never rewrite old ones, so the daily rollup
+sums each file once (four columns of it) and keeps the sums; a range
+query then only adds up cached sums and reads files it has not seen.
+A limited mission listing reads days newest first and stops once it
+has enough rows.
+
+The rollups in utils.missions cover the recent window the dashboard
+updates live; the archive answers analysts' arbitrary ranges.
+
+The dashboard only reads the archive and never writes to it. Seed a
+simulated history with:
+
+    python -m utils.mission_archive seed --days 730
+"""
+import argparse
+import logging
+import os
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.missions import FIELDS, _summaries
+from utils.sync import new_lock, synchronized
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.environ.get('LIFELINE_MISSION_ARCHIVE',
+                                  Path(__file__).resolve().parent.parent / 'data' / 'missions'))
+ZONES = ['Alpha', 'Beta', 'Gamma', 'Delta']
+CARGO = ['Blood Pack', 'Emergency Kit', 'Medications', 'Vaccines', 'IV Fluids']
+MISSION_COLUMNS = ['mission_id', 'drone_id', 'completed_at', 'success', 'delivery_minutes', 'distance_km',
+                   'supplies', 'cargo']
+# Columns the daily rollup reads; the rest stay on disk
+_SUMMED_COLUMNS = ['success', 'delivery_minutes', 'distance_km', 'supplies']
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('mission_id', pa.string()),
+        ('drone_id', pa.dictionary(pa.int16(), pa.string())),
+        ('completed_at', pa.timestamp('ms')),
+        ('success', pa.bool_()),
+        ('delivery_minutes', pa.float32()),
+        ('distance_km', pa.float32()),
+        ('supplies', pa.int16()),
+        ('cargo', pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([('day', pa.date32()), ('zone', pa.string())]), flavor='hive')
+
+
+class MissionArchive:
+    """Date- and zone-partitioned Parquet dataset of finished missions"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('missions', 'daily', 'date_range')
+
+    def __init__(self, root=None):
+        self._lock = new_lock()
+        self.root = Path(root or ARCHIVE_DIR)
+        self._dataset = None  # discovered once, again after every write
+        self._file_sums = {}  # file path -> (day, FIELDS sums) or None if empty; files are never rewritten
+        self.version = 0
+
+    def _discover(self):
+        import pyarrow.dataset as ds
+
+        if self._dataset is None:
+            self._dataset = ds.dataset(self.root, format='parquet', partitioning=_partitioning())
+        return self._dataset
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def write(self, missions):
+        """Append missions (a frame with MISSION_COLUMNS and 'zone'); returns the number written"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if missions.empty:
+            return 0
+        unknown = set(missions['zone']) - set(ZONES)
+        if unknown:
+            raise ValueError(f"Unknown mission zones: {sorted(unknown)}")
+        table = pa.Table.from_pandas(missions[MISSION_COLUMNS], schema=_schema(),
+                                     preserve_index=False, safe=False)
+        days = missions['completed_at'].dt.date
+        table = table.append_column('day', pa.array(days, pa.date32()))
+        table = table.append_column('zone', pa.array(missions['zone'], pa.string()))
+        ds.write_dataset(
+            table, self.root, format='parquet', partitioning=_partitioning(),
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_partitions=max(1024, len(ZONES) * days.nunique()),
+        )
+        self._dataset = None
+        self.version += 1
+        return len(missions)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _filter(self, start, end, zones):
+        import pyarrow.dataset as ds
+
+        condition = (ds.field('day') >= start) & (ds.field('day') <= end)
+        if zones is not None:
+            condition &= ds.field('zone').isin(list(zones))
+        return condition
+
+    def _fragments(self, start, end, zones):
+        """Files of the partitions in range; the rest are pruned by their directory names"""
+        if not self.root.exists():
+            return None, []
+        with self._lock:
+            dataset = self._discover()
+        return dataset, list(dataset.get_fragments(filter=self._filter(start, end, zones)))
+
+    def missions(self, start, end, zones=None, columns=None, limit=None):
+        """Missions completed on days start..end (inclusive dates) in ``zones``, newest first
+
+        With a limit, days are read newest first until they hold enough missions.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        columns = list(columns or MISSION_COLUMNS + ['zone'])
+        dataset, fragments = self._fragments(start, end, zones)
+        if limit is None:
+            batches = [fragments]
+        else:
+            by_day = {}
+            for fragment in fragments:
+                by_day.setdefault(ds.get_partition_keys(fragment.partition_expression)['day'], []).append(fragment)
+            batches = [by_day[day] for day in sorted(by_day, reverse=True)]
+
+        tables, rows = [], 0
+        for batch in batches:
+            if not batch:
+                continue
+            table = ds.FileSystemDataset(batch, dataset.schema, dataset.format).to_table(
+                columns=list(dict.fromkeys(columns + ['completed_at'])))
+            tables.append(table)
+            rows += table.num_rows
+            if limit is not None and rows >= limit:
+                break
+        if not tables:
+            return pd.DataFrame(columns=columns)
+
+        table = pa.concat_tables(tables).sort_by([('completed_at', 'descending')]).select(columns)
+        if limit is not None:
+            table = table.slice(0, limit)
+        return table.to_pandas()
+
+    @synchronized
+    def daily(self, start, end, zones=None):
+        """One row per day from start to end, with the columns of MissionRollups.daily()
+
+        Days without missions have zero counts and NaN rates and means.
+        """
+        days = pd.date_range(start, end, freq='D')
+        sums = np.zeros((len(FIELDS), len(days)))
+        _, fragments = self._fragments(start, end, zones)
+        if fragments:
+            missing = [fragment for fragment in fragments if fragment.path not in self._file_sums]
+            self._summarize(missing)
+            summed = [self._file_sums[fragment.path] for fragment in fragments]
+            summed = [entry for entry in summed if entry is not None]
+            if summed:
+                file_days, file_sums = zip(*summed)
+                first = days[0].to_datetime64().astype('datetime64[D]').astype(np.int64)
+                np.add.at(sums.T, np.array(file_days) - first, np.array(file_sums))
+
+        frame = pd.DataFrame(_summaries(sums))
+        frame.insert(0, 'date', days)
+        return frame
+
+    def _summarize(self, fragments):
+        """Cache the FIELDS sums of each given file, reading only the columns they take
+
+        Files are opened one by one rather than scanned as a dataset: for
+        many small files that is faster and keeps no per-file state.
+        """
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        for fragment in fragments:
+            table = pq.ParquetFile(fragment.path).read(columns=_SUMMED_COLUMNS)
+            if not table.num_rows:
+                self._file_sums[fragment.path] = None
+                continue
+            day = np.datetime64(ds.get_partition_keys(fragment.partition_expression)['day'], 'D')
+            minutes = table['delivery_minutes'].to_numpy().astype(np.float64)
+            # Same order as FIELDS: missions, failures, time_sum, time_sq, distance, supplies
+            self._file_sums[fragment.path] = (int(day.astype(np.int64)), np.array([
+                table.num_rows,
+                table.num_rows - np.count_nonzero(table['success'].to_numpy(zero_copy_only=False)),
+                minutes.sum(),
+                (minutes ** 2).sum(),
+                table['distance_km'].to_numpy().astype(np.float64).sum(),
+                table['supplies'].to_numpy().sum(),
+            ], dtype=np.float64))
+
+    def date_range(self):
+        """(first, last) archived day from the partition directories, or None if the archive is empty"""
+        if not self.root.exists():
+            return None
+        days = sorted(entry.name[len('day='):] for entry in os.scandir(self.root)
+                      if entry.is_dir() and entry.name.startswith('day='))
+        if not days:
+            return None
+        return date.fromisoformat(days[0]), date.fromisoformat(days[-1])
+
+
+# ----------------------------------------------------------------------
+# Simulated data
+# ----------------------------------------------------------------------
+def simulate_missions(days=730, per_day=60, fleet_size=15, end=None, seed=None):
+    """Simulated finished missions over the ``days`` days up to ``end`` (now by default)"""
+    rng = np.random.default_rng(seed)
+    end = datetime.now() if end is None else end
+    n = int(rng.poisson(per_day * days))
+    offsets = np.sort(rng.uniform(0, days * 86400, size=n))
+    completed_at = pd.Timestamp(end) - pd.to_timedelta(offsets[::-1], unit='s')
+    return pd.DataFrame({
+        'mission_id': [f'M-{i:07d}' for i in range(1, n + 1)],
+        'drone_id': pd.Categorical.from_codes(rng.integers(0, fleet_size, size=n),
+                                              [f'LLA-{i:03d}' for i in range(1, fleet_size + 1)]).astype(str),
+        'completed_at': completed_at,
+        'success': rng.random(n) < 0.94,
+        'delivery_minutes': np.maximum(6, rng.normal(12, 3, size=n)),
+        'distance_km': np.maximum(2, rng.normal(22, 6, size=n)),
+        'supplies': rng.poisson(2, size=n),
+        'cargo': np.array(CARGO)[rng.integers(0, len(CARGO), size=n)],
+        'zone': np.array(ZONES)[rng.integers(0, len(ZONES), size=n)],
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mission archive maintenance")
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed = commands.add_parser('seed', help="append a simulated mission history")
+    seed.add_argument('--days', type=int, default=730)
+    seed.add_argument('--per-day', type=int, default=60)
+    seed.add_argument('--root', type=Path, default=None)
+    seed.add_argument('--seed', type=int, default=None, help="random seed, for a reproducible history")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    archive = MissionArchive(args.root)
+    written = archive.write(simulate_missions(args.days, args.per_day, seed=args.seed))
+    logger.info("Wrote %d missions to %s", written, archive.root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Incrementally maintained mission rollups for the analytics page
+
+Every finished mission is added to two rollups as it is recorded: one
+bucket per local calendar day and one per ISO week. A bucket holds running
+sums (missions, failures, delivery time and its square, distance, supplies),
+so recording a mission is O(1) and the page reads KPIs, trends and weekly
+volumes straight from the buckets instead of re-aggregating mission rows.
+Means and standard deviations are derived from the sums on read.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.sync import new_lock, synchronized
+
+FIELDS = ('missions', 'failures', 'time_sum', 'time_sq', 'distance', 'supplies')
+_MISSIONS, _FAILURES, _TIME_SUM, _TIME_SQ, _DISTANCE, _SUPPLIES = range(len(FIELDS))
+
+# 1970-01-01 was a Thursday; shifting by three days puts week boundaries on Mondays
+_EPOCH_WEEK_SHIFT = 3
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def local_day(timestamps):
+    """Local calendar day (days since 1970-01-01) of POSIX timestamps"""
+    offset = datetime.now().astimezone().utcoffset().total_seconds()
+    return np.floor_divide(np.asarray(timestamps, dtype=np.float64) + offset, 86400).astype(np.int64)
+
+
+def _week_of(days):
+    return np.floor_divide(np.asarray(days) + _EPOCH_WEEK_SHIFT, 7)
+
+
+class _Rollup:
+    """Dense buckets of the summed FIELDS, one column per period"""
+
+    def __init__(self, capacity=64):
+        self.origin = None  # period held in column 0
+        self.data = np.zeros((len(FIELDS), capacity))
+
+    def _reserve(self, first, last):
+        if self.origin is None:
+            self.origin = first
+        end = self.origin + self.data.shape[1]
+        if first >= self.origin and last < end:
+            return
+        start = min(first, self.origin)
+        capacity = max(max(last + 1, end) - start, 2 * self.data.shape[1])
+        grown = np.zeros((len(FIELDS), capacity))
+        shift = self.origin - start
+        grown[:, shift:shift + self.data.shape[1]] = self.data
+        self.data, self.origin = grown, start
+
+    def add(self, period, row):
+        self._reserve(period, period)
+        self.data[:, period - self.origin] += row
+
+    def add_many(self, periods, rows):
+        self._reserve(int(periods.min()), int(periods.max()))
+        np.add.at(self.data.T, periods - self.origin, rows.T)
+
+    def window(self, first, last):
+        """Columns for periods first..last inclusive; empty periods are zero"""
+        out = np.zeros((len(FIELDS), last - first + 1))
+        if self.origin is None:
+            return out
+        lo = max(first, self.origin)
+        hi = min(last + 1, self.origin + self.data.shape[1])
+        if lo < hi:
+            out[:, lo - first:hi - first] = self.data[:, lo - self.origin:hi - self.origin]
+        return out
+
+
+def _summaries(columns):
+    """Rates, means and spreads derived from summed bucket columns"""
+    missions = columns[_MISSIONS]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = columns[_TIME_SUM] / missions
+        variance = np.maximum(columns[_TIME_SQ] / missions - mean ** 2, 0)
+        success = (missions - columns[_FAILURES]) / missions * 100
+    return {
+        'missions_completed': missions.astype(np.int64),
+        'missions_failed': columns[_FAILURES].astype(np.int64),
+        'success_rate': success,
+        'avg_delivery_time': mean,
+        'delivery_time_std': np.sqrt(variance),
+        'medical_supplies_delivered': columns[_SUPPLIES].astype(np.int64),
+        'distance_covered': columns[_DISTANCE],
+    }
+
+
+class MissionRollups:
+    """Daily and ISO-week mission aggregates, updated per finished mission"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('daily', 'weekly', 'totals')
+
+    def __init__(self, seed_days=30, seed=None):
+        self._lock = new_lock()
+        self._rng = np.random.default_rng(seed)
+        self._days = _Rollup()
+        self._weeks = _Rollup()
+        self.version = 0
+
+        if seed_days:
+            self._seed_history(seed_days)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @synchronized
+    def record_mission(self, success, delivery_minutes, distance_km, supplies=0, completed_at=None):
+        """Add one finished mission to its day and week"""
+        completed_at = datetime.now().timestamp() if completed_at is None else completed_at
+        day = int(local_day(completed_at))
+        row = np.array([1, not success, delivery_minutes, delivery_minutes ** 2, distance_km, supplies], dtype=np.float64)
+        self._days.add(day, row)
+        self._weeks.add(int(_week_of(day)), row)
+        self.version += 1
+
+    @synchronized
+    def record_missions(self, completed_at, success, delivery_minutes, distance_km, supplies=None):
+        """Add a batch of finished missions; arguments are aligned arrays"""
+        completed_at = np.asarray(completed_at, dtype=np.float64)
+        if not len(completed_at):
+            return
+        minutes = np.asarray(delivery_minutes, dtype=np.float64)
+        rows = np.vstack([
+            np.ones_like(minutes),
+            ~np.asarray(success, dtype=bool),
+            minutes,
+            minutes ** 2,
+            np.asarray(distance_km, dtype=np.float64),
+            np.zeros_like(minutes) if supplies is None else np.asarray(supplies, dtype=np.float64),
+        ])
+        days = local_day(completed_at)
+        self._days.add_many(days, rows)
+        self._weeks.add_many(_week_of(days), rows)
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _today():
+        return date.today().toordinal() - _EPOCH_ORDINAL
+
+    @synchronized
+    def daily(self, days=30, end=None):
+        """One row per day for the ``days`` days up to ``end`` (today by default)
+
+        Days without missions have zero counts and NaN rates and means.
+        """
+        last = self._today() if end is None else end.toordinal() - _EPOCH_ORDINAL
+        first = last - days + 1
+        frame = pd.DataFrame(_summaries(self._days.window(first, last)))
+        frame.insert(0, 'date', pd.to_datetime(np.arange(first, last + 1), unit='D'))
+        return frame
+
+    @synchronized
+    def weekly(self, weeks=5, end=None):
+        """One row per ISO week for the ``weeks`` weeks up to the week of ``end``"""
+        today = self._today() if end is None else end.toordinal() - _EPOCH_ORDINAL
+        last = int(_week_of(today))
+        first = last - weeks + 1
+        frame = pd.DataFrame(_summaries(self._weeks.window(first, last)))
+        mondays = [date.fromordinal(int(w) * 7 - _EPOCH_WEEK_SHIFT + _EPOCH_ORDINAL)
+                   for w in range(first, last + 1)]
+        frame.insert(0, 'week_start', pd.to_datetime(mondays))
+        frame.insert(0, 'week', [f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}" for d in mondays])
+        return frame
+
+    @synchronized
+    def totals(self, days=30, end=None):
+        """Aggregate numbers over the ``days`` days up to ``end``, for the KPI row"""
+        last = self._today() if end is None else end.toordinal() - _EPOCH_ORDINAL
+        summed = self._days.window(last - days + 1, last).sum(axis=1, keepdims=True)
+        return {name: values[0].item() for name, values in _summaries(summed).items()}
+
+    # ------------------------------------------------------------------
+    # Simulated data
+    # ------------------------------------------------------------------
+    def _seed_history(self, days):
+        """Simulated missions over the last ``days`` days"""
+        rng = self._rng
+        now = datetime.now().timestamp()
+        n = int(rng.poisson(8 * days))
+        completed_at = np.sort(now - rng.uniform(0, days * 86400, size=n))
+        self.record_missions(
+            completed_at,
+            rng.random(n) < 0.94,
+            np.maximum(6, rng.normal(12, 3, size=n)),
+            np.maximum(2, rng.normal(22, 6, size=n)),
+            rng.poisson(2, size=n),
+        )
@@ -0,0 +1,304 @@
+"""MongoDB persistence for missions, deliveries, maintenance records and activities
+
+Each collection has the indexes its dashboard queries need:
+
+* missions -- (completed_at), for date ranges and daily rollups, and
+  (drone_id, completed_at) for one drone's history;
+* deliveries -- unique delivery_id for upserts, and (status, requested_at)
+  for the queue and in-flight tables;
+* maintenance -- (drone_id, component, next_service) for upserts and
+  one drone's records in service order, and (next_service, priority)
+  for the upcoming-service list;
+* activities -- (timestamp) for the feed, and (type, timestamp) for one
+  kind of activity.
+
+Ingest goes through bulk writes. Mission and activity inserts are
+unordered, so one bad document does not hold back the rest of the batch.
+Delivery and maintenance upserts are ordered, so a record updated twice
+in one batch ends in its latest state. High-rate events (activities
+raised from telemetry) go through a BulkWriter, which queues documents
+and inserts them in batches from a background thread.
+
+Reads project only the fields each page shows and return DataFrames
+without Mongo's ``_id``.
+
+The client is a pymongo ``MongoClient`` or anything with the same
+interface (mongomock.MongoClient for tests).
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = 'lifeline'
+ASCENDING, DESCENDING = 1, -1
+
+MISSION_FIELDS = ['mission_id', 'drone_id', 'completed_at', 'success', 'delivery_minutes', 'distance_km',
+                  'supplies']
+DELIVERY_FIELDS = ['delivery_id', 'drone_id', 'medical_item', 'quantity', 'destination', 'priority', 'status',
+                   'requested_at', 'start_time']
+MAINTENANCE_FIELDS = ['drone_id', 'component', 'health_score', 'status', 'last_service', 'next_service',
+                      'flight_hours', 'failure_probability', 'technician', 'priority']
+ACTIVITY_FIELDS = ['type', 'description', 'timestamp']
+
+# (collection, keys, options) per index
+INDEXES = [
+    ('missions', [('completed_at', ASCENDING)], {}),
+    ('missions', [('drone_id', ASCENDING), ('completed_at', DESCENDING)], {}),
+    ('deliveries', [('delivery_id', ASCENDING)], {'unique': True}),
+    ('deliveries', [('status', ASCENDING), ('requested_at', DESCENDING)], {}),
+    ('maintenance', [('drone_id', ASCENDING), ('component', ASCENDING), ('next_service', ASCENDING)], {}),
+    ('maintenance', [('next_service', ASCENDING), ('priority', ASCENDING)], {}),
+    ('activities', [('timestamp', DESCENDING)], {}),
+    ('activities', [('type', ASCENDING), ('timestamp', DESCENDING)], {}),
+]
+
+# Documents per bulk write; pymongo splits larger batches anyway
+BATCH_SIZE = 1000
+# Seconds a queued document may wait before the writer flushes
+FLUSH_SECONDS = 0.5
+
+
+def _documents(records):
+    """Mongo documents from a DataFrame or an iterable of dicts
+
+    NaN and NaT become None, NumPy scalars become Python ones and
+    pandas Timestamps stay datetimes, which BSON stores natively.
+    """
+    if isinstance(records, pd.DataFrame):
+        frame = records.astype(object).where(records.notna(), None)
+        return frame.to_dict('records')
+    documents = []
+    for record in records:
+        document = {}
+        for key, value in record.items():
+            if isinstance(value, np.generic):
+                value = value.item()
+            if value is pd.NaT or (isinstance(value, float) and value != value):
+                value = None
+            document[key] = value
+        documents.append(document)
+    return documents
+
+
+def _frame(cursor, fields):
+    return pd.DataFrame(list(cursor), columns=fields)
+
+
+def _projection(fields):
+    return dict.fromkeys(fields, 1) | {'_id': 0}
+
+
+def _time_range(field, start, end):
+    """Filter for ``start <= field < end``; either bound may be None"""
+    bounds = {}
+    if start is not None:
+        bounds['$gte'] = start
+    if end is not None:
+        bounds['$lt'] = end
+    return {field: bounds} if bounds else {}
+
+
+class BulkWriter:
+    """Queue of documents inserted into a collection in unordered batches
+
+    add() only appends to the queue; a daemon thread inserts whenever
+    BATCH_SIZE documents are waiting or the oldest has waited
+    FLUSH_SECONDS. Failed batches are logged and dropped, so a
+    slow or unreachable server never blocks the producers.
+    """
+
+    def __init__(self, collection, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._ready = threading.Condition()
+        self._thread = None
+        self.written = 0
+        self.failed = 0
+
+    def add(self, document):
+        self.add_many([document])
+
+    def add_many(self, documents):
+        with self._ready:
+            self._pending.extend(documents)
+            if len(self._pending) >= self.batch_size:
+                self._ready.notify()
+
+    def start(self):
+        """Insert queued documents on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'bulk-{self.collection.name}', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._ready:
+                if len(self._pending) < self.batch_size:
+                    self._ready.wait(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Insert everything queued so far; returns the number of documents written"""
+        with self._ready:
+            pending, self._pending = self._pending, []
+        written = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = _documents(pending[start:start + self.batch_size])
+            try:
+                written += len(self.collection.insert_many(batch, ordered=False).inserted_ids)
+            except Exception as error:
+                inserted = (getattr(error, 'details', None) or {}).get('nInserted', 0)
+                written += inserted
+                self.failed += len(batch) - inserted
+                logger.warning("Bulk insert into %s failed: %s", self.collection.name, error)
+        self.written += written
+        return written
+
+
+class MongoStore:
+    """Mission, delivery, maintenance and activity collections of one database"""
+
+    def __init__(self, client, database=DEFAULT_DATABASE):
+        self.client = client
+        self.db = client[database]
+        self.missions = self.db['missions']
+        self.deliveries = self.db['deliveries']
+        self.maintenance = self.db['maintenance']
+        self.activities = self.db['activities']
+        self._activity_writer = None
+
+    def ensure_indexes(self):
+        """Create the query indexes; existing ones are left as they are"""
+        for collection, keys, options in INDEXES:
+            self.db[collection].create_index(keys, **options)
+
+    @property
+    def activity_writer(self):
+        """Background batch writer for the activities collection, started on first use"""
+        if self._activity_writer is None:
+            self._activity_writer = BulkWriter(self.activities).start()
+        return self._activity_writer
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def insert_missions(self, records):
+        """Insert finished missions (a frame or dicts with MISSION_FIELDS); returns the number inserted"""
+        documents = _documents(records)
+        if not documents:
+            return 0
+        return len(self.missions.insert_many(documents, ordered=False).inserted_ids)
+
+    def insert_activities(self, records):
+        """Insert activity feed entries right away; returns the number inserted"""
+        documents = _documents(records)
+        if not documents:
+            return 0
+        return len(self.activities.insert_many(documents, ordered=False).inserted_ids)
+
+    def save_deliveries(self, records):
+        """Upsert delivery records by delivery_id, in order; returns the bulk write result"""
+        from pymongo import ReplaceOne
+
+        requests = [ReplaceOne({'delivery_id': document['delivery_id']}, document, upsert=True)
+                    for document in _documents(records)]
+        return self.deliveries.bulk_write(requests, ordered=True) if requests else None
+
+    def save_maintenance(self, records):
+        """Upsert maintenance records by (drone_id, component), in order; returns the bulk write result
+
+        A new next_service date replaces the record's previous one.
+        """
+        from pymongo import UpdateOne
+
+        requests = [UpdateOne({'drone_id': document['drone_id'], 'component': document['component']},
+                              {'$set': document}, upsert=True)
+                    for document in _documents(records)]
+        return self.maintenance.bulk_write(requests, ordered=True) if requests else None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def missions_between(self, start=None, end=None, drone_id=None, fields=MISSION_FIELDS):
+        """Missions completed in [start, end), optionally of one drone, oldest first"""
+        query = _time_range('completed_at', start, end)
+        if drone_id is not None:
+            query['drone_id'] = drone_id
+        cursor = self.missions.find(query, _projection(fields)).sort('completed_at', ASCENDING)
+        return _frame(cursor, fields)
+
+    def daily_missions(self, start=None, end=None):
+        """Missions, failures and mean delivery time per day in [start, end)"""
+        pipeline = [
+            {'$match': _time_range('completed_at', start, end)},
+            {'$group': {
+                '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$completed_at'}},
+                'missions': {'$sum': 1},
+                'failures': {'$sum': {'$cond': ['$success', 0, 1]}},
+                'avg_delivery_minutes': {'$avg': '$delivery_minutes'},
+                'distance_km': {'$sum': '$distance_km'},
+            }},
+            {'$sort': {'_id': ASCENDING}},
+        ]
+        frame = pd.DataFrame(list(self.missions.aggregate(pipeline)),
+                             columns=['_id', 'missions', 'failures', 'avg_delivery_minutes', 'distance_km'])
+        return frame.rename(columns={'_id': 'date'}).assign(date=lambda f: pd.to_datetime(f['date']))
+
+    def deliveries_by_status(self, statuses, limit=None, fields=DELIVERY_FIELDS):
+        """Deliveries in any of ``statuses``, most recently requested first"""
+        cursor = self.deliveries.find({'status': {'$in': list(statuses)}}, _projection(fields))
+        cursor = cursor.sort([('status', ASCENDING), ('requested_at', DESCENDING)])
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return _frame(cursor, fields)
+
+    def maintenance_records(self, drone_id=None, component=None, fields=MAINTENANCE_FIELDS):
+        """Maintenance records, optionally of one drone and/or component"""
+        query = {}
+        if drone_id is not None:
+            query['drone_id'] = drone_id
+        if component is not None:
+            query['component'] = component
+        cursor = self.maintenance.find(query, _projection(fields))
+        if drone_id is not None:
+            cursor = cursor.sort([('component', ASCENDING), ('next_service', ASCENDING)])
+        return _frame(cursor, fields)
+
+    def service_between(self, start=None, end=None, limit=None, fields=MAINTENANCE_FIELDS):
+        """Records due for service in [start, end), soonest first"""
+        cursor = self.maintenance.find(_time_range('next_service', start, end), _projection(fields))
+        cursor = cursor.sort('next_service', ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return _frame(cursor, fields)
+
+    def recent_activities(self, limit=10, activity_type=None, fields=ACTIVITY_FIELDS):
+        """The latest activities, oldest first like the in-memory feed"""
+        query = {} if activity_type is None else {'type': activity_type}
+        cursor = self.activities.find(query, _projection(fields)).sort('timestamp', DESCENDING).limit(limit)
+        return _frame(cursor, fields).iloc[::-1].reset_index(drop=True)
+
+
+def connect(url, database=DEFAULT_DATABASE, timeout_ms=2000):
+    """MongoStore on the server at ``url`` with its indexes in place"""
+    from pymongo import MongoClient
+
+    store = MongoStore(MongoClient(url, serverSelectionTimeoutMS=timeout_ms), database)
+    store.ensure_indexes()
+    return store
+
+
+def activity_sink(store):
+    """AlertManager activity hook that queues entries for the activities collection"""
+    writer = store.activity_writer
+
+    def apply(activity):
+        writer.add(dict(activity))
+    return apply
@@ -0,0 +1,30 @@
+"""Section timing hooks used by the benchmark suite
+
+Nothing is recorded in normal operation: until a recorder is installed
+with set_recorder(), profile_section() is a no-op.
+"""
+import contextlib
+import time
+
+_recorder = None
+
+
+def set_recorder(recorder):
+    """Install a callable(name, seconds) that receives section timings, or None"""
+    global _recorder
+    _recorder = recorder
+
+
+@contextlib.contextmanager
+def profile_section(name):
+    """Time the enclosed block as one dashboard section"""
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder(name, time.perf_counter() - started)
@@ -0,0 +1,88 @@
+"""Change-driven section refresh for the dashboard
+
+Each dashboard section runs as its own Streamlit fragment with its own
+timer. A section is split into a loader, which fetches data and builds
+charts, and a renderer, which only emits elements. On every tick the
+section compares the data versions it depends on with the ones it last
+loaded and replays the cached payload when nothing has changed.
+"""
+import threading
+from collections import defaultdict
+
+import streamlit as st
+
+from utils.profiling import profile_section
+
+_CACHE_KEY = '_live_sections'
+
+
+@st.cache_resource
+def _shared_payloads():
+    """Payloads of sections whose data is the same for every session, with a lock per section"""
+    return {}, defaultdict(threading.Lock)
+
+
+def data_version(*sources):
+    """Combined version of the given managers, or None if any is unversioned"""
+    versions = tuple(getattr(source, 'version', None) for source in sources)
+    if any(version is None for version in versions):
+        return None
+    return versions
+
+
+def section_data(name, load, depends_on=None, shared=False):
+    """Return the section's payload, reloading only when its data version moved
+
+    Shared payloads are kept once per process, so sessions watching the same
+    data reuse one copy instead of each holding their own.
+    """
+    version = depends_on() if depends_on else None
+
+    if shared and version is not None:
+        cache, locks = _shared_payloads()
+        with locks[name]:
+            cached = cache.get(name)
+            if cached is None or cached[0] != version:
+                cached = cache[name] = (version, load())
+        return cached[1]
+
+    cache = st.session_state.setdefault(_CACHE_KEY, {})
+    cached = cache.get(name)
+
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+
+    payload = load()
+    cache[name] = (version, payload)
+    return payload
+
+
+def live_section(name, render, load, depends_on=None, run_every=None, shared=False):
+    """Run a dashboard section as a fragment that refreshes on its own schedule
+
+    render -- callable taking the payload and emitting the section's elements
+    load -- callable returning the payload (data, figures)
+    depends_on -- callable returning the version the payload is derived from;
+                  None versions always reload
+    run_every -- refresh interval in seconds, or None to render once per run
+    shared -- payload depends only on process-wide data and can be reused
+              by every session
+    """
+    def section():
+        with profile_section(name):
+            render(section_data(name, load, depends_on, shared))
+
+    # The fragment id is derived from the qualified name and the position
+    # in the page, so every section gets its own timer
+    section.__qualname__ = f"live_section.{name}"
+    st.fragment(section, run_every=run_every)()
+
+
+def clear_section_cache(name=None):
+    """Force one section (or all sections) to reload on the next tick"""
+    shared, _ = _shared_payloads()
+    for cache in (st.session_state.get(_CACHE_KEY, {}), shared):
+        if name is None:
+            cache.clear()
+        else:
+            cache.pop(name, None)
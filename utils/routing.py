@@ -0,0 +1,222 @@
+"""Route planning around no-fly zones
+
+Routes are planned with A* on a square grid of ``cell_km`` cells laid out
+in km around the geofence reference point (see utils.geo.to_local_km).
+Each plan only looks at a window around the origin and destination cells,
+padded by ``padding_km``. A cell is blocked when its centre lies inside a
+zone or within the engine's near-miss margin of one. The mask comes from
+one GeofenceEngine.check_points call over the window's cell centres. The
+8-connected grid path is then string-pulled: corners are dropped while the
+straight line between the kept vertices stays in free cells.
+
+Plans are cached by (origin cell, destination cell, zone version). Zones
+changing is the only thing that invalidates a cached route, so repeat
+deliveries to the same station are dictionary lookups.
+"""
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.geo import from_local_km, haversine_km, to_local_km
+from utils.sync import new_lock, synchronized
+
+CELL_KM = 0.1
+PADDING_KM = 2.0
+CACHE_SIZE = 4096
+
+# Delivery destinations served by the fleet
+MEDICAL_STATIONS = {
+    'Medical Station A': (28.6420, 77.2350),
+    'Medical Station B': (28.6050, 77.1700),
+    'Medical Station C': (28.5850, 77.2300),
+    'Medical Station D': (28.6550, 77.1950),
+    'Medical Station E': (28.5750, 77.1850),
+}
+
+_SQRT2 = math.sqrt(2)
+_MOVES = [(dx, dy, _SQRT2 if dx and dy else 1.0)
+          for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+def path_length_km(lats, lons):
+    """Great-circle length of a polyline"""
+    lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+    if len(lats) < 2:
+        return 0.0
+    return float(haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:]).sum())
+
+
+def resample_path(lats, lons, n):
+    """``n`` points evenly spaced by distance along a polyline"""
+    lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+    if len(lats) < 2:
+        return np.repeat(lats, n), np.repeat(lons, n)
+    along = np.r_[0, np.cumsum(haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:]))]
+    targets = np.linspace(0, along[-1], n)
+    return np.interp(targets, along, lats), np.interp(targets, along, lons)
+
+
+class RoutePlanner:
+    """A* routes around a GeofenceEngine's zones, cached per zone version"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('plan', 'stats')
+
+    def __init__(self, geofence, cell_km=CELL_KM, padding_km=PADDING_KM, cache_size=CACHE_SIZE):
+        self._lock = new_lock()
+        self.geofence = geofence
+        self.cell_km = cell_km
+        self.padding_km = padding_km
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (origin cell, destination cell) -> local km vertices
+        self._zone_version = None
+        self.hits = self.misses = 0
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_km)), int(math.floor(y / self.cell_km))
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+    @synchronized
+    def plan(self, origin, destination):
+        """Route from origin to destination, both (lat, lon)
+
+        Returns (lats, lons) arrays starting at origin and ending at
+        destination, or None when the zones leave no way through.
+        """
+        ref_lat, ref_lon = self.geofence.ref
+        (ox, dx), (oy, dy) = to_local_km([origin[0], destination[0]], [origin[1], destination[1]], ref_lat, ref_lon)
+        start, goal = self._cell(ox, oy), self._cell(dx, dy)
+
+        version = self.geofence.version
+        if version != self._zone_version:
+            self._cache.clear()
+            self._zone_version = version
+
+        key = (start, goal)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            corners = self._cache[key]
+        else:
+            self.misses += 1
+            corners = self._search(start, goal)
+            self._cache[key] = corners
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if corners is None:
+            return None
+        # Cached corners are cell centres; the ends are the exact points
+        x = np.r_[ox, corners[1:-1, 0], dx]
+        y = np.r_[oy, corners[1:-1, 1], dy]
+        return from_local_km(x, y, ref_lat, ref_lon)
+
+    def _search(self, start, goal):
+        """Corner cell centres (local km) of the pulled A* path, or None"""
+        pad = int(math.ceil(self.padding_km / self.cell_km))
+        x0, y0 = min(start[0], goal[0]) - pad, min(start[1], goal[1]) - pad
+        width = max(start[0], goal[0]) + pad - x0 + 1
+        height = max(start[1], goal[1]) + pad - y0 + 1
+        blocked = self._blocked_mask(x0, y0, width, height)
+        s = (start[0] - x0, start[1] - y0)
+        g = (goal[0] - x0, goal[1] - y0)
+        # A drone may start or finish in a zone's margin; it still has to get out
+        blocked[s[1], s[0]] = blocked[g[1], g[0]] = False
+
+        cells = self._astar(blocked, s, g)
+        if cells is None:
+            return None
+        cells = self._pull(blocked, cells)
+        centres = (np.asarray(cells, dtype=np.float64) + [x0, y0] + 0.5) * self.cell_km
+        return centres
+
+    def _blocked_mask(self, x0, y0, width, height):
+        """height x width mask of cells whose centre is in or near a zone"""
+        blocked = np.zeros((height, width), dtype=bool)
+        if not len(self.geofence):
+            return blocked
+        ix, iy = np.meshgrid(np.arange(width), np.arange(height))
+        x = (ix.ravel() + x0 + 0.5) * self.cell_km
+        y = (iy.ravel() + y0 + 0.5) * self.cell_km
+        lat, lon = from_local_km(x, y, *self.geofence.ref)
+        points, _, _ = self.geofence.check_points(lat, lon)
+        blocked.ravel()[points] = True
+        return blocked
+
+    @staticmethod
+    def _astar(blocked, start, goal):
+        """8-connected A* with the octile heuristic; cells are (x, y)"""
+        height, width = blocked.shape
+        gx, gy = goal
+
+        def heuristic(x, y):
+            ax, ay = abs(x - gx), abs(y - gy)
+            return max(ax, ay) + (_SQRT2 - 1) * min(ax, ay)
+
+        cost = {start: 0.0}
+        came_from = {start: None}
+        frontier = [(heuristic(*start), 0.0, start)]
+        while frontier:
+            _, g, cell = heapq.heappop(frontier)
+            if cell == goal:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = came_from[cell]
+                return path[::-1]
+            if g > cost[cell]:
+                continue
+            x, y = cell
+            for dx, dy, step in _MOVES:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height) or blocked[ny, nx]:
+                    continue
+                # No corner cutting past a blocked cell
+                if dx and dy and (blocked[y, nx] or blocked[ny, x]):
+                    continue
+                ng = g + step
+                if ng < cost.get((nx, ny), math.inf):
+                    cost[(nx, ny)] = ng
+                    came_from[(nx, ny)] = cell
+                    heapq.heappush(frontier, (ng + heuristic(nx, ny), ng, (nx, ny)))
+        return None
+
+    @staticmethod
+    def _clear(blocked, a, b):
+        """Whether the straight line between two cell centres stays in free cells"""
+        steps = int(max(abs(b[0] - a[0]), abs(b[1] - a[1]))) * 2 + 1
+        t = np.linspace(0, 1, steps + 1)
+        x = np.floor(a[0] + 0.5 + (b[0] - a[0]) * t).astype(np.intp)
+        y = np.floor(a[1] + 0.5 + (b[1] - a[1]) * t).astype(np.intp)
+        return not blocked[y, x].any()
+
+    @classmethod
+    def _pull(cls, blocked, cells):
+        """Drop path corners while the shortcut between kept ones is clear"""
+        kept = [cells[0]]
+        anchor = 0
+        for i in range(2, len(cells)):
+            if not cls._clear(blocked, cells[anchor], cells[i]):
+                anchor = i - 1
+                kept.append(cells[anchor])
+        kept.append(cells[-1])
+        return kept if len(cells) > 1 else kept[:1] * 2
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @synchronized
+    def stats(self):
+        """Cache size and hit counts"""
+        lookups = self.hits + self.misses
+        return {
+            'cached_routes': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'zone_version': self._zone_version,
+        }
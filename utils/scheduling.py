@@ -0,0 +1,180 @@
+"""Maintenance due-date index and background scheduler
+
+ServiceIndex keeps maintenance records sorted by next service time in
+two NumPy arrays (times and record numbers, ties ordered by record). "Due
+in the next N days" and "overdue" are binary searches that return the
+records in due order, and moving one record is a binary search plus one
+in-place shift.
+
+MaintenanceScheduler runs a periodic APScheduler job. On every tick it
+asks the index which records crossed a state boundary since the last
+tick (upcoming -> due when next service enters the due window,
+due -> overdue when it passes) and pushes those transitions to its
+listeners and the activity feed. Pages read counts and due lists from
+the index instead of re-filtering the records.
+"""
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from utils.sync import new_lock, synchronized
+
+UPCOMING, DUE, OVERDUE = 'Upcoming', 'Due', 'Overdue'
+SERVICE_STATES = [UPCOMING, DUE, OVERDUE]
+DUE_WINDOW_DAYS = 7
+TICK_SECONDS = 60
+# Records named per transition in the activity feed
+MAX_NAMED_RECORDS = 3
+
+
+class ServiceIndex:
+    """Record numbers sorted by service time, with O(log n) range lookups
+
+    Not thread-safe by itself; the owning manager serializes access.
+    """
+
+    def __init__(self, times):
+        times = np.asarray(times, dtype=np.float64)
+        self._records = np.argsort(times, kind='stable')
+        self._times = times[self._records]
+
+    def __len__(self):
+        return len(self._times)
+
+    def _position(self, t, record):
+        """Index of (t, record) in the sort order, or where it would go"""
+        lo = np.searchsorted(self._times, t, side='left')
+        hi = np.searchsorted(self._times, t, side='right')
+        return lo + int(np.searchsorted(self._records[lo:hi], record))
+
+    def move(self, record, old, new):
+        """Re-file a record whose service time changed from ``old`` to ``new``"""
+        p = self._position(old, record)
+        if p >= len(self._times) or self._records[p] != record:
+            raise KeyError(f"Record {record} is not filed at {old}")
+        q = self._position(new, record)
+        if q > p:
+            q -= 1  # the record itself leaves the range it shifts over
+            self._times[p:q] = self._times[p + 1:q + 1]
+            self._records[p:q] = self._records[p + 1:q + 1]
+        elif q < p:
+            self._times[q + 1:p + 1] = self._times[q:p]
+            self._records[q + 1:p + 1] = self._records[q:p]
+        self._times[q] = new
+        self._records[q] = record
+
+    def between(self, start=None, end=None, limit=None):
+        """Records with start <= time < end, soonest first; open ends are unbounded"""
+        lo = 0 if start is None else int(np.searchsorted(self._times, start, side='left'))
+        hi = len(self._times) if end is None else int(np.searchsorted(self._times, end, side='left'))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._records[lo:max(lo, hi)]
+
+    def count(self, start=None, end=None):
+        """Number of records with start <= time < end"""
+        lo = 0 if start is None else int(np.searchsorted(self._times, start, side='left'))
+        hi = len(self._times) if end is None else int(np.searchsorted(self._times, end, side='left'))
+        return max(0, hi - lo)
+
+
+class MaintenanceScheduler:
+    """Background job that pushes maintenance state transitions as events"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('state_counts', 'recent_events')
+
+    def __init__(self, maintenance_manager, alert_manager=None, due_window_days=DUE_WINDOW_DAYS,
+                 tick_seconds=TICK_SECONDS, max_events=200):
+        self._lock = new_lock()
+        self.manager = maintenance_manager
+        self.alert_manager = alert_manager
+        self.due_window = due_window_days * 86400
+        self.tick_seconds = tick_seconds
+        self._listeners = []
+        self._events = deque(maxlen=max_events)
+        self._last_tick = None
+        self._scheduler = None
+        self.version = 0
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every transition event"""
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Background job
+    # ------------------------------------------------------------------
+    def start(self):
+        """Run tick() every ``tick_seconds`` on an APScheduler background thread"""
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        if self._scheduler is not None:
+            return
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(self.tick, 'interval', seconds=self.tick_seconds, next_run_time=datetime.now(),
+                                id='maintenance-transitions', coalesce=True, max_instances=1)
+        self._scheduler.start()
+
+    def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    @synchronized
+    def tick(self, now=None):
+        """Emit the transitions since the previous tick; the first tick only sets the clock"""
+        now = time.time() if now is None else now
+        last, self._last_tick = self._last_tick, now
+        if last is None or now <= last:
+            return []
+
+        events = []
+        crossings = (
+            (UPCOMING, DUE, last + self.due_window, now + self.due_window),
+            (DUE, OVERDUE, last, now),
+        )
+        for before, after, start, end in crossings:
+            records = self.manager.service_between(start, end)
+            if len(records):
+                events.append(self._emit(before, after, records, now))
+        return events
+
+    def _emit(self, before, after, records, now):
+        event = {
+            'from': before,
+            'to': after,
+            'count': len(records),
+            'records': records,
+            'timestamp': datetime.fromtimestamp(now),
+        }
+        self._events.append(event)
+        self.version += 1
+        for callback in self._listeners:
+            callback(event)
+
+        if self.alert_manager is not None:
+            named = ', '.join(f"{r.drone_id} {r.component}" for r in records.head(MAX_NAMED_RECORDS).itertuples())
+            more = f" and {len(records) - MAX_NAMED_RECORDS} more" if len(records) > MAX_NAMED_RECORDS else ''
+            self.alert_manager.log_activity('maintenance', f"Maintenance {after.lower()}: {named}{more}")
+            if after == OVERDUE:
+                self.alert_manager.raise_alert(
+                    'Warning', 'Maintenance Overdue', f"{len(records)} component(s) passed their service date",
+                    location=records['drone_id'].iloc[0], key='maintenance:overdue')
+        return event
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def state_counts(self, now=None):
+        """Number of records in each service state"""
+        now = time.time() if now is None else now
+        overdue = self.manager.service_count(end=now)
+        due = self.manager.service_count(now, now + self.due_window)
+        return {UPCOMING: len(self.manager) - overdue - due, DUE: due, OVERDUE: overdue}
+
+    @synchronized
+    def recent_events(self):
+        """Transition events, oldest first"""
+        return list(self._events)
@@ -0,0 +1,116 @@
+"""Trigram search index for the medical inventory
+
+Each document (an inventory row) is split into words. Every word is
+padded with two leading spaces and one trailing space, the way
+PostgreSQL's pg_trgm does, and cut into trigrams. A posting list per
+trigram holds the sorted document numbers that contain it.
+
+A query is cut the same way. One bincount over the postings of its
+trigrams gives every document's number of shared trigrams, so the work
+is proportional to the matching postings rather than to the catalogue.
+A document matches when it contains at least MIN_SIMILARITY of the
+query's trigrams; the padding makes prefixes score well ("epi"), and
+misspellings keep most of their trigrams ("epinephrin" shares 10 of
+its 11 with "epinephrine"). Matches are ranked by that share and then
+by trigram (Jaccard) similarity, so closer and shorter names come first.
+
+Facet filters (category, temperature band, storage location) are
+equality masks over per-document integer codes, applied to the matches
+only. With a limit, only the top matches are sorted.
+"""
+import re
+
+import numpy as np
+
+# Share of the query's trigrams a document must contain to match
+MIN_SIMILARITY = 0.5
+_WORD = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Set of padded word trigrams of a string, case-folded"""
+    grams = set()
+    for word in _WORD.findall(text.casefold()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Fuzzy full-text lookups with facet filters over numbered documents
+
+    Documents are numbered 0..n-1 in the order they are added. Not
+    thread-safe by itself; the owning manager serializes access.
+    """
+
+    def __init__(self, texts=(), facets=None):
+        self._postings = {}  # trigram -> sorted int32 document numbers
+        self._sizes = np.zeros(0, dtype=np.int32)  # trigrams per document
+        self._vocabularies = {}  # facet -> {value: code}
+        self._facets = {}  # facet -> int32 code per document
+        for name, values in (facets or {}).items():
+            vocabulary = self._vocabularies[name] = {}
+            self._facets[name] = np.fromiter((vocabulary.setdefault(value, len(vocabulary)) for value in values),
+                                             dtype=np.int32, count=len(values))
+        self._build(list(texts))
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def _build(self, texts):
+        grouped = {}
+        sizes = np.zeros(len(texts), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            grams = trigrams(text)
+            sizes[doc] = len(grams)
+            for gram in grams:
+                grouped.setdefault(gram, []).append(doc)
+        self._postings = {gram: np.array(docs, dtype=np.int32) for gram, docs in grouped.items()}
+        self._sizes = sizes
+
+    def add(self, text, **facets):
+        """Index one more document; returns its number"""
+        doc = len(self._sizes)
+        grams = trigrams(text)
+        for gram in grams:
+            postings = self._postings.get(gram)
+            self._postings[gram] = np.array([doc], dtype=np.int32) if postings is None else np.append(postings, doc)
+        self._sizes = np.append(self._sizes, np.int32(len(grams)))
+        for name, codes in self._facets.items():
+            vocabulary = self._vocabularies[name]
+            code = vocabulary.setdefault(facets.get(name), len(vocabulary))
+            self._facets[name] = np.append(codes, np.int32(code))
+        return doc
+
+    def search(self, query, limit=None, **filters):
+        """Numbers of the documents matching ``query`` and every facet filter, best match first
+
+        A blank query matches every document. Filters whose value is None
+        are ignored.
+        """
+        grams = trigrams(query or '')
+        if grams:
+            postings = [self._postings[gram] for gram in grams if gram in self._postings]
+            if not postings:
+                return np.zeros(0, dtype=np.int32)
+            shared = np.bincount(np.concatenate(postings), minlength=len(self._sizes))
+            docs = np.flatnonzero(shared >= MIN_SIMILARITY * len(grams))
+            shared = shared[docs]
+        else:
+            docs = np.arange(len(self._sizes))
+
+        for name, value in filters.items():
+            if value is not None:
+                keep = self._facets[name][docs] == self._vocabularies[name].get(value, -1)
+                docs = docs[keep]
+                if grams:
+                    shared = shared[keep]
+        if not grams:
+            return docs if limit is None else docs[:limit]
+
+        # Shared trigrams first, similarity (always below 1) breaks the ties
+        score = shared + 0.999 * shared / (len(grams) + self._sizes[docs] - shared)
+        if limit is not None and limit < len(docs):
+            top = np.argpartition(-score, limit - 1)[:limit]
+            docs, score = docs[top], score[top]
+        return docs[np.lexsort((docs, -score))]
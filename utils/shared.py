@@ -0,0 +1,292 @@
+"""Process-wide managers shared by every dashboard session
+
+Each manager is built once per Streamlit server process. Sessions get a
+ReadOnlyView of it, which costs a couple of references no matter how
+large the fleet is. Writes (operator actions, ingest) go through the
+shared instance returned by the getters, whose methods are thread-safe.
+The fleet, inventory and maintenance tables are read through the
+snapshot cache, so several dashboard processes share one computation.
+A snapshot is at most SNAPSHOT_MAX_AGE seconds old; pages invalidate the
+snapshots their operator actions change.
+"""
+import logging
+import os
+
+import streamlit as st
+
+from utils.alerts import AlertManager
+from utils.cold_chain import ColdChainMonitor, cold_chain_sink, payload_sink
+from utils.dispatch import Dispatcher
+from utils.drone_data import STATUSES, DroneDataManager, fleet_drone_ids
+from utils.eta import EtaEngine, eta_sink, route_sink
+from utils.failure_model import load_model
+from utils.geofence import DEMO_ZONES, GeofenceEngine, geofence_sink, path_alerts
+from utils.maintenance import MaintenanceManager
+from utils.medical_supplies import MedicalSupplyManager
+from utils.mission_archive import MissionArchive
+from utils.missions import MissionRollups
+from utils.persistence import activity_sink, connect
+from utils.routing import RoutePlanner
+from utils.scheduling import MaintenanceScheduler
+from utils.snapshot_cache import InProcessRedis, SnapshotCache
+from utils.sync import ReadOnlyView
+from utils.timeseries import TimeSeriesStore, sortie_sink
+from utils.telemetry import (DEFAULT_TCP_PORT, DEFAULT_UDP_PORT, TelemetryIngestService,
+                             TelemetrySimulator, TelemetryStore, fleet_sink)
+
+# Size of the simulated fleet until live telemetry takes over
+FLEET_SIZE = int(os.environ.get('LIFELINE_FLEET_SIZE', 15))
+
+# Telemetry ingest; the simulator stands in for the aircraft in demos
+TELEMETRY_ENABLED = os.environ.get('LIFELINE_TELEMETRY', '1') == '1'
+TELEMETRY_SIMULATOR = os.environ.get('LIFELINE_TELEMETRY_SIMULATOR', '1') == '1'
+TELEMETRY_UDP_PORT = int(os.environ.get('LIFELINE_TELEMETRY_UDP_PORT', DEFAULT_UDP_PORT))
+TELEMETRY_TCP_PORT = int(os.environ.get('LIFELINE_TELEMETRY_TCP_PORT', DEFAULT_TCP_PORT))
+
+# Snapshots shared between dashboard processes; without a Redis URL they stay in this process
+SNAPSHOT_REDIS_URL = os.environ.get('LIFELINE_REDIS_URL')
+SNAPSHOT_MAX_AGE = float(os.environ.get('LIFELINE_SNAPSHOT_MAX_AGE', 5))
+
+# MongoDB persistence of missions, deliveries, maintenance and activities; off without a URL
+MONGO_URL = os.environ.get('LIFELINE_MONGO_URL')
+MONGO_DATABASE = os.environ.get('LIFELINE_MONGO_DATABASE', 'lifeline')
+
+logger = logging.getLogger(__name__)
+
+
+@st.cache_resource
+def get_drone_manager():
+    """Shared fleet state store"""
+    return DroneDataManager(fleet_size=FLEET_SIZE)
+
+
+@st.cache_resource
+def get_medical_manager():
+    """Shared medical supply inventory"""
+    return MedicalSupplyManager()
+
+
+@st.cache_resource
+def get_mongo_store():
+    """Shared MongoDB persistence layer, or None when LIFELINE_MONGO_URL is unset or unreachable"""
+    if not MONGO_URL:
+        return None
+    from pymongo.errors import PyMongoError
+
+    try:
+        return connect(MONGO_URL, MONGO_DATABASE)
+    except PyMongoError:
+        logger.warning("MongoDB at %s is unreachable; nothing is persisted", MONGO_URL)
+        return None
+
+
+@st.cache_resource
+def get_alert_manager():
+    """Shared alert and activity feed; new activities are persisted when MongoDB is configured"""
+    alert_manager = AlertManager()
+    store = get_mongo_store()
+    if store is not None:
+        alert_manager.activity_sink = activity_sink(store)
+    return alert_manager
+
+
+@st.cache_resource
+def get_mission_rollups():
+    """Shared daily and weekly mission aggregates"""
+    return MissionRollups()
+
+
+@st.cache_resource
+def get_mission_archive():
+    """Shared Parquet mission history; seed it with ``python -m utils.mission_archive seed``"""
+    return MissionArchive()
+
+
+@st.cache_resource
+def get_failure_model():
+    """Component failure model, loaded once per process (trained if there is no artifact)"""
+    return load_model()
+
+
+@st.cache_resource
+def get_maintenance_manager():
+    """Shared component maintenance records, scored by the failure model"""
+    return MaintenanceManager(fleet_drone_ids(FLEET_SIZE), get_failure_model())
+
+
+@st.cache_resource
+def get_maintenance_scheduler():
+    """Background job pushing upcoming -> due -> overdue maintenance transitions"""
+    scheduler = MaintenanceScheduler(get_maintenance_manager(), get_alert_manager())
+    scheduler.start()
+    return scheduler
+
+
+@st.cache_resource
+def get_dispatcher():
+    """Shared delivery queue, assigned onto the shared fleet and loaded from the shared inventory
+
+    The dispatcher owns delivery assignments: drones in transit are routed
+    in the shared ETA engine and their payloads tracked by the cold-chain
+    monitor from its status changes, never by the pages.
+    """
+    medical_manager = get_medical_manager()
+    items = medical_manager.item_names()
+    return Dispatcher(get_drone_manager(), seed_items=items, inventory=medical_manager, sinks=[
+        route_sink(get_eta_engine(), get_route_planner()),
+        payload_sink(get_cold_chain_monitor(), medical_manager.get_temperature_band),
+        sortie_sink(get_flight_series()),
+    ])
+
+
+@st.cache_resource
+def get_cold_chain_monitor():
+    """Shared payload temperature monitor for deliveries in flight"""
+    return ColdChainMonitor(get_alert_manager())
+
+
+@st.cache_resource
+def get_eta_engine():
+    """Shared live ETAs of drones flying a route"""
+    return EtaEngine()
+
+
+@st.cache_resource
+def get_geofence_engine():
+    """Shared no-fly zones, starting with the demo restricted areas"""
+    engine = GeofenceEngine()
+    engine.load(DEMO_ZONES)
+    return engine
+
+
+@st.cache_resource
+def get_path_alerts():
+    """Shared alerting of flight path hits, so every session reports each hit once"""
+    return path_alerts(get_alert_manager())
+
+
+@st.cache_resource
+def get_route_planner():
+    """Shared route planner; its cache follows the shared no-fly zones"""
+    return RoutePlanner(get_geofence_engine())
+
+
+@st.cache_resource
+def get_fleet_map_layer():
+    """Shared fleet map drone layer and base map"""
+    # folium is heavy; only processes that render the fleet map pay for it
+    from utils.fleet_map import FleetMapLayer
+
+    return FleetMapLayer()
+
+
+@st.cache_resource
+def get_flight_series():
+    """Shared multi-resolution flight paths and telemetry charts"""
+    return TimeSeriesStore()
+
+
+@st.cache_resource
+def get_telemetry_service():
+    """Shared telemetry ingest service, started on first use
+
+    Frames land in the service's TelemetryStore, each drone's latest
+    position and battery are mirrored into the shared DroneDataManager,
+    every frame is rolled into the downsampled flight series, latest
+    positions are checked against the no-fly zones, routed drones get
+    fresh ETAs and payload temperatures feed the cold-chain monitor.
+    """
+    drone_manager = get_drone_manager()
+    service = TelemetryIngestService(
+        TelemetryStore(),
+        udp_port=TELEMETRY_UDP_PORT,
+        tcp_port=TELEMETRY_TCP_PORT,
+        sinks=[
+            fleet_sink(drone_manager),
+            get_flight_series().ingest,
+            geofence_sink(get_geofence_engine(), get_alert_manager()),
+            eta_sink(get_eta_engine()),
+            cold_chain_sink(get_cold_chain_monitor()),
+        ],
+    )
+    if not TELEMETRY_ENABLED:
+        return service
+
+    service.start_in_thread()
+    if service.running and TELEMETRY_SIMULATOR:
+        airborne = drone_manager.column('status') == STATUSES.index('Active')
+        drone_ids = drone_manager.drone_ids()[airborne].tolist()
+        # Bays of drones flying a tracked delivery hold its band
+        TelemetrySimulator(drone_ids, port=service.udp_port,
+                           payload_setpoints=get_cold_chain_monitor().setpoints).start_in_thread()
+    return service
+
+
+@st.cache_resource
+def get_snapshot_cache():
+    """Shared snapshot cache, in Redis when LIFELINE_REDIS_URL is set and reachable"""
+    client = None
+    if SNAPSHOT_REDIS_URL:
+        import redis
+
+        client = redis.Redis.from_url(SNAPSHOT_REDIS_URL)
+        try:
+            client.ping()
+        except redis.RedisError:
+            logger.warning("Redis at %s is unreachable; snapshots stay in this process", SNAPSHOT_REDIS_URL)
+            client = None
+    cache = SnapshotCache(client if client is not None else InProcessRedis())
+    cache.start()
+    return cache
+
+
+def get_fleet_snapshot():
+    """Fleet table and status counts, computed by one dashboard process at a time"""
+    def compute():
+        drone_manager = get_drone_manager()
+        return {
+            'fleet': drone_manager.get_detailed_fleet_status(),
+            'status_counts': drone_manager.get_status_counts(),
+        }
+    return get_snapshot_cache().get_or_compute('fleet', compute, SNAPSHOT_MAX_AGE)
+
+
+def get_inventory_snapshot():
+    """Inventory table and stock status counts, computed by one dashboard process at a time"""
+    def compute():
+        medical_manager = get_medical_manager()
+        return {
+            'inventory': medical_manager.get_inventory(),
+            'status_counts': medical_manager.get_status_counts(),
+        }
+    return get_snapshot_cache().get_or_compute('inventory', compute, SNAPSHOT_MAX_AGE)
+
+
+def get_maintenance_snapshot():
+    """Status summary and per-component means, computed by one dashboard process at a time"""
+    def compute():
+        maintenance_manager = get_maintenance_manager()
+        return {
+            'summary': maintenance_manager.status_summary(),
+            'component_means': maintenance_manager.component_means(),
+        }
+    return get_snapshot_cache().get_or_compute('maintenance', compute, SNAPSHOT_MAX_AGE)
+
+
+def get_telemetry_store():
+    """Shared per-drone telemetry ring buffers"""
+    return get_telemetry_service().store
+
+
+def init_session_views():
+    """Attach read-only views of the shared managers to this session"""
+    views = {
+        'drone_manager': get_drone_manager,
+        'medical_manager': get_medical_manager,
+        'alert_manager': get_alert_manager,
+        'mission_rollups': get_mission_rollups,
+        'telemetry_store': get_telemetry_store,
+    }
+    for key, getter in views.items():
+        if key not in st.session_state:
+            st.session_state[key] = ReadOnlyView(getter())
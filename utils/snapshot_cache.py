@@ -0,0 +1,394 @@
+"""Snapshots of expensive aggregates shared between dashboard processes
+
+Several Streamlit worker processes can serve the dashboard. Without a
+shared cache each one rebuilds the same fleet table, inventory and
+maintenance records on every refresh. SnapshotCache keeps one copy per
+snapshot name in Redis:
+
+* ``get_or_compute`` returns the process's local copy while it is fresh.
+  Otherwise it loads the copy in Redis if that one is fresh. Only when
+  neither is fresh does it compute the snapshot, and only the worker
+  holding a short lease does so; the others wait for its publication.
+* ``publish`` bumps the snapshot's version counter, stores the encoded
+  snapshot and announces the version on a pub/sub channel. Every worker
+  listens on that channel and drops local copies older than the
+  announced version.
+* ``invalidate`` bumps the version without storing anything, so the next
+  read anywhere recomputes (used after operator writes).
+
+Snapshots are dicts of DataFrames and JSON-able values. They are encoded
+as a JSON header followed by the raw column buffers. String columns are
+stored as integer codes plus their distinct labels, so a 400k-row
+component table with a few thousand drone ids stays compact.
+
+The client is a redis-py ``Redis`` or anything with the same methods.
+InProcessRedis is a small thread-safe stand-in for single-process runs
+and tests.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.sync import new_lock
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LLSNAP1\n'
+DEFAULT_NAMESPACE = 'lifeline'
+# Seconds a worker may compute a snapshot before another one takes over
+LEASE_SECONDS = 10.0
+# Seconds a worker waits for another one's computation before computing itself
+WAIT_SECONDS = 2.0
+# Stored snapshots expire this many times their max age after publication
+EXPIRY_FACTOR = 10
+
+
+# ----------------------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------------------
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode_column(series, chunks, offset):
+    """Column spec for the header; appends the column's buffers to ``chunks``"""
+    spec = {'name': series.name}
+    values = series.array
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        spec['categories'] = series.cat.categories.tolist()
+        data = series.cat.codes.to_numpy()
+    elif series.dtype == object:
+        codes, labels = pd.factorize(series, use_na_sentinel=True)
+        spec['labels'] = labels.tolist()
+        data = codes.astype(np.int32)
+    else:
+        data = np.ascontiguousarray(np.asarray(values))
+    spec.update(dtype=data.dtype.str, offset=offset, count=len(data))
+    chunks.append(data.tobytes())
+    return spec, offset + data.nbytes
+
+
+def _decode_column(spec, body):
+    data = np.frombuffer(body, dtype=np.dtype(spec['dtype']), count=spec['count'], offset=spec['offset'])
+    if 'categories' in spec:
+        return pd.Categorical.from_codes(data, spec['categories'])
+    if 'labels' in spec:
+        labels = np.array(spec['labels'] + [None], dtype=object)  # code -1 picks the trailing None
+        return labels[data]
+    return data.copy()
+
+
+def encode_snapshot(payload, version=0, created_at=None):
+    """Bytes of a snapshot: a dict of DataFrames and JSON-able values"""
+    header = {'version': version, 'created_at': time.time() if created_at is None else created_at,
+              'frames': {}, 'values': {}}
+    chunks, offset = [], 0
+    for key, value in payload.items():
+        if isinstance(value, pd.DataFrame):
+            columns = []
+            for name in value.columns:
+                spec, offset = _encode_column(value[name], chunks, offset)
+                columns.append(spec)
+            header['frames'][key] = columns
+        else:
+            header['values'][key] = value
+    encoded = json.dumps(header, default=_json_default, separators=(',', ':')).encode()
+    return b''.join([MAGIC, len(encoded).to_bytes(4, 'little'), encoded] + chunks)
+
+
+def decode_snapshot(data):
+    """(payload, version, created_at) from encode_snapshot() bytes"""
+    if not data.startswith(MAGIC):
+        raise ValueError("Not an encoded snapshot")
+    start = len(MAGIC) + 4
+    size = int.from_bytes(data[len(MAGIC):start], 'little')
+    header = json.loads(data[start:start + size])
+    body = memoryview(data)[start + size:]
+
+    payload = dict(header['values'])
+    for key, columns in header['frames'].items():
+        payload[key] = pd.DataFrame({spec['name']: _decode_column(spec, body) for spec in columns},
+                                    columns=[spec['name'] for spec in columns])
+    return payload, header['version'], header['created_at']
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+class SnapshotCache:
+    """Versioned snapshots in Redis with per-process copies and pub/sub invalidation"""
+
+    def __init__(self, client, namespace=DEFAULT_NAMESPACE, lease_seconds=LEASE_SECONDS,
+                 wait_seconds=WAIT_SECONDS):
+        self._lock = new_lock()
+        self._published = threading.Condition(self._lock)
+        self.client = client
+        self.namespace = namespace
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.channel = f'{namespace}:snapshots'
+        self._local = {}  # name -> (version, created_at, payload)
+        self._announced = {}  # name -> newest version heard on the channel
+        self._listener = None
+        self._stopping = threading.Event()
+        self.counters = {'local_hits': 0, 'remote_hits': 0, 'computed': 0, 'waited': 0, 'fallbacks': 0}
+
+    def _key(self, kind, name):
+        return f'{self.namespace}:{kind}:{name}'
+
+    # ------------------------------------------------------------------
+    # Invalidation channel
+    # ------------------------------------------------------------------
+    def start(self):
+        """Listen for version announcements on a daemon thread"""
+        if self._listener is not None:
+            return
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(self.channel)
+
+        def listen():
+            while not self._stopping.is_set():
+                try:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                except Exception:
+                    logger.exception("Snapshot invalidation channel failed")
+                    self._stopping.wait(1.0)
+                    continue
+                if message is not None:
+                    self._announce(message['data'])
+            pubsub.close()
+
+        self._listener = threading.Thread(target=listen, name='snapshot-invalidation', daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _announce(self, data):
+        name, _, version = (data.decode() if isinstance(data, bytes) else data).rpartition(':')
+        with self._published:
+            if int(version) > self._announced.get(name, 0):
+                self._announced[name] = int(version)
+                local = self._local.get(name)
+                if local is not None and local[0] < int(version):
+                    del self._local[name]
+            self._published.notify_all()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def publish(self, name, payload, ttl=None):
+        """Store a new version of a snapshot and announce it; returns the version"""
+        version = int(self.client.incr(self._key('version', name)))
+        created_at = time.time()
+        data = encode_snapshot(payload, version, created_at)
+        pipe = self.client.pipeline()
+        pipe.set(self._key('snapshot', name), data, ex=None if ttl is None else max(1, int(ttl)))
+        pipe.publish(self.channel, f'{name}:{version}')
+        pipe.execute()
+        with self._lock:
+            self._local[name] = (version, created_at, payload)
+        return version
+
+    def invalidate(self, name):
+        """Drop a snapshot everywhere; the next read recomputes it"""
+        version = int(self.client.incr(self._key('version', name)))
+        pipe = self.client.pipeline()
+        pipe.delete(self._key('snapshot', name))
+        pipe.publish(self.channel, f'{name}:{version}')
+        pipe.execute()
+        self._announce(f'{name}:{version}')
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _fresh_local(self, name, max_age):
+        with self._lock:
+            local = self._local.get(name)
+            if local is None or local[0] < self._announced.get(name, 0) or time.time() - local[1] > max_age:
+                return None
+            return local
+
+    def _fetch(self, name, max_age):
+        """Load the stored snapshot into the local copy if it is fresh"""
+        data = self.client.get(self._key('snapshot', name))
+        if data is None:
+            return None
+        payload, version, created_at = decode_snapshot(data)
+        if time.time() - created_at > max_age:
+            return None
+        with self._lock:
+            if version >= self._announced.get(name, 0):
+                self._local[name] = (version, created_at, payload)
+        return payload
+
+    def get(self, name, max_age=float('inf')):
+        """The newest snapshot no older than ``max_age`` seconds, or None"""
+        local = self._fresh_local(name, max_age)
+        if local is not None:
+            self.counters['local_hits'] += 1
+            return local[2]
+        payload = self._fetch(name, max_age)
+        if payload is not None:
+            self.counters['remote_hits'] += 1
+        return payload
+
+    def get_or_compute(self, name, compute, max_age):
+        """A snapshot no older than ``max_age`` seconds, computed by at most one worker at a time
+
+        ``compute`` returns the payload. The payload is shared by every
+        caller in the process and must be treated as read-only.
+        """
+        payload = self.get(name, max_age)
+        if payload is not None:
+            return payload
+
+        lease, token = self._key('lease', name), uuid.uuid4().hex
+        if self.client.set(lease, token, nx=True, px=int(self.lease_seconds * 1000)):
+            try:
+                payload = compute()
+                self.publish(name, payload, ttl=max_age * EXPIRY_FACTOR)
+                self.counters['computed'] += 1
+                return payload
+            finally:
+                held = self.client.get(lease)
+                if held is not None and (held.decode() if isinstance(held, bytes) else held) == token:
+                    self.client.delete(lease)
+
+        # Another worker is computing it: wait for its announcement
+        deadline = time.time() + self.wait_seconds
+        with self._published:
+            seen = self._announced.get(name, 0)
+            while self._announced.get(name, 0) == seen and time.time() < deadline:
+                self._published.wait(deadline - time.time())
+        payload = self._fetch(name, max_age)
+        if payload is not None:
+            self.counters['waited'] += 1
+            return payload
+        self.counters['fallbacks'] += 1
+        return compute()
+
+    def stats(self):
+        return dict(self.counters, listening=self._listener is not None and self._listener.is_alive())
+
+
+# ----------------------------------------------------------------------
+# In-process stand-in for Redis
+# ----------------------------------------------------------------------
+class InProcessRedis:
+    """The subset of redis-py's client SnapshotCache uses, kept in this process
+
+    Values and messages are bytes, as with a real server. Expiry is
+    checked on read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}  # key -> (value, expires at or None)
+        self._subscribers = {}  # channel -> list of queues
+
+    @staticmethod
+    def _bytes(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key)
+            return None if item is None else item[0]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+            self._data[key] = (self._bytes(value), None if ttl is None else time.time() + ttl)
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            item = self._live(key)
+            value = (0 if item is None else int(item[0])) + amount
+            self._data[key] = (self._bytes(value), None if item is None else item[1])
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(self._bytes(channel), ()))
+        for inbox in subscribers:
+            inbox.put({'type': 'message', 'channel': self._bytes(channel), 'data': self._bytes(message)})
+        return len(subscribers)
+
+    def pubsub(self):
+        return _InProcessPubSub(self)
+
+    def pipeline(self, transaction=True):
+        return _InProcessPipeline(self)
+
+
+class _InProcessPubSub:
+    def __init__(self, server):
+        self._server = server
+        self._inbox = queue.Queue()
+        self._channels = []
+
+    def subscribe(self, *channels):
+        with self._server._lock:
+            for channel in channels:
+                channel = InProcessRedis._bytes(channel)
+                self._server._subscribers.setdefault(channel, []).append(self._inbox)
+                self._channels.append(channel)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return self._inbox.get(timeout=timeout) if timeout else self._inbox.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._server._lock:
+            for channel in self._channels:
+                self._server._subscribers[channel].remove(self._inbox)
+        self._channels = []
+
+
+class _InProcessPipeline:
+    def __init__(self, server):
+        self._server = server
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._server, name)
+
+        def queued(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queued
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
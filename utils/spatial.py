@@ -0,0 +1,164 @@
+"""Uniform grid index over live drone positions
+
+Positions are projected to km around a reference point and bucketed into
+square cells. Each cell keeps the set of slots inside it, so a position
+update only touches the index when a drone crosses a cell boundary.
+
+* Radius queries visit the cells overlapping the circle's bounding box.
+* k-nearest queries visit occupied cells in order of their distance from
+  the query point, in growing batches, and stop once k accepted drones
+  lie closer than any cell not yet visited.
+
+Exact distances are great-circle distances over the candidates only.
+"""
+import numpy as np
+
+from utils.geo import haversine_km, to_local_km
+
+NO_CELL = np.iinfo(np.int64).min
+_HALF = 1 << 30
+# Allowance for the difference between projected and great-circle distances
+PROJECTION_MARGIN = 0.01
+
+
+def _pack(ix, iy):
+    return (np.asarray(ix, dtype=np.int64) + _HALF) << 32 | (np.asarray(iy, dtype=np.int64) + _HALF)
+
+
+class GridIndex:
+    """Slot -> cell index with best-first k-nearest and radius queries
+
+    Not thread-safe by itself; the owning manager serializes access.
+    """
+
+    def __init__(self, ref_lat, ref_lon, cell_km=1.0, capacity=16):
+        self.ref_lat, self.ref_lon = ref_lat, ref_lon
+        self.cell_km = cell_km
+        self._cells = {}
+        self._cell_of = np.full(capacity, NO_CELL, dtype=np.int64)
+        self._lat = np.zeros(capacity)
+        self._lon = np.zeros(capacity)
+        self._occupied = None  # (keys, ix, iy) of non-empty cells, rebuilt after cell changes
+
+    def __len__(self):
+        return int((self._cell_of != NO_CELL).sum())
+
+    def _cell_coords(self, lat, lon):
+        x, y = to_local_km(lat, lon, self.ref_lat, self.ref_lon)
+        return np.floor(x / self.cell_km).astype(np.int64), np.floor(y / self.cell_km).astype(np.int64)
+
+    def _reserve(self, size):
+        capacity = len(self._cell_of)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        self._cell_of = np.r_[self._cell_of, np.full(capacity - len(self._cell_of), NO_CELL, dtype=np.int64)]
+        self._lat = np.r_[self._lat, np.zeros(capacity - len(self._lat))]
+        self._lon = np.r_[self._lon, np.zeros(capacity - len(self._lon))]
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def move(self, slot, lat, lon):
+        """Place or move one slot"""
+        self.move_many(np.array([slot]), np.array([lat]), np.array([lon]))
+
+    def move_many(self, slots, lat, lon):
+        """Place or move a batch of slots; only cell changes touch the cell sets"""
+        slots = np.asarray(slots, dtype=np.intp)
+        if not len(slots):
+            return
+        self._reserve(int(slots.max()) + 1)
+        self._lat[slots] = lat
+        self._lon[slots] = lon
+
+        keys = _pack(*self._cell_coords(lat, lon))
+        old = self._cell_of[slots]
+        moved = np.flatnonzero(keys != old)
+        cells = self._cells
+        for slot, before, after in zip(slots[moved].tolist(), old[moved].tolist(), keys[moved].tolist()):
+            if before != NO_CELL:
+                members = cells[before]
+                members.discard(slot)
+                if not members:
+                    del cells[before]
+            cells.setdefault(after, set()).add(slot)
+        self._cell_of[slots[moved]] = keys[moved]
+        if len(moved):
+            self._occupied = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _slots_in(self, keys):
+        cells = self._cells
+        members = [cells[key] for key in keys.tolist() if key in cells]
+        if not members:
+            return np.empty(0, dtype=np.intp)
+        return np.fromiter((slot for cell in members for slot in cell), dtype=np.intp)
+
+    def within(self, lat, lon, radius_km, accept=None):
+        """(slots, distances) of slots within ``radius_km``, nearest first
+
+        accept -- optional callable mapping a slot array to a boolean mask
+        """
+        cx, cy = self._cell_coords(lat, lon)
+        reach = int(np.ceil(radius_km / self.cell_km))
+        ix, iy = np.meshgrid(np.arange(cx - reach, cx + reach + 1), np.arange(cy - reach, cy + reach + 1))
+        slots = self._slots_in(_pack(ix.ravel(), iy.ravel()))
+        if accept is not None and len(slots):
+            slots = slots[accept(slots)]
+
+        distances = haversine_km(lat, lon, self._lat[slots], self._lon[slots])
+        inside = distances <= radius_km
+        slots, distances = slots[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return slots[order], distances[order]
+
+    def _occupied_cells(self):
+        if self._occupied is None:
+            keys = np.fromiter(self._cells.keys(), dtype=np.int64, count=len(self._cells))
+            self._occupied = keys, (keys >> 32) - _HALF, (keys & 0xFFFFFFFF) - _HALF
+        return self._occupied
+
+    def nearest(self, lat, lon, k, accept=None):
+        """(slots, distances) of the k nearest accepted slots, nearest first"""
+        if k <= 0 or not self._cells:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Lower bound of the distance from the query point to every occupied cell
+        x, y = to_local_km(lat, lon, self.ref_lat, self.ref_lon)
+        keys, ix, iy = self._occupied_cells()
+        size = self.cell_km
+        dx = np.maximum(np.maximum(ix * size - x, x - (ix + 1) * size), 0)
+        dy = np.maximum(np.maximum(iy * size - y, y - (iy + 1) * size), 0)
+        bounds = np.hypot(dx, dy)
+        order = np.argsort(bounds, kind='stable')
+
+        found_slots, found_distances = [], []
+        accepted = 0
+        visited, batch = 0, 4
+        while visited < len(order):
+            cells = order[visited:visited + batch]
+            visited += len(cells)
+            batch *= 2
+
+            slots = self._slots_in(keys[cells])
+            if accept is not None:
+                slots = slots[accept(slots)]
+            if not len(slots):
+                continue
+            found_slots.append(slots)
+            found_distances.append(haversine_km(lat, lon, self._lat[slots], self._lon[slots]))
+            accepted += len(slots)
+
+            if accepted >= k and visited < len(order):
+                kth = np.partition(np.concatenate(found_distances), k - 1)[k - 1]
+                if kth <= bounds[order[visited]] * (1 - PROJECTION_MARGIN):
+                    break
+
+        if not found_slots:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        slots, distances = np.concatenate(found_slots), np.concatenate(found_distances)
+        order = np.argsort(distances, kind='stable')[:k]
+        return slots[order], distances[order]
@@ -0,0 +1,41 @@
+"""Locking helpers for managers shared across Streamlit sessions"""
+import functools
+import threading
+
+
+def synchronized(method):
+    """Run a manager method while holding the instance's ``_lock``"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ReadOnlyView:
+    """Per-session view of a shared manager exposing only its read methods
+
+    The view holds nothing but a reference to the manager, so handing one to
+    every session costs the same whatever the size of the shared state.
+    """
+    __slots__ = ('_manager', '_allowed')
+
+    def __init__(self, manager):
+        object.__setattr__(self, '_manager', manager)
+        object.__setattr__(self, '_allowed', frozenset(manager.READ_METHODS) | {'version'})
+
+    def __getattr__(self, name):
+        if name not in self._allowed:
+            raise AttributeError(f"'{type(self._manager).__name__}' view is read-only; '{name}' is not available")
+        return getattr(self._manager, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self._manager).__name__}' view is read-only")
+
+    def __len__(self):
+        return len(self._manager)
+
+
+def new_lock():
+    """Re-entrant lock used by the shared managers"""
+    return threading.RLock()
@@ -0,0 +1,554 @@
+"""Telemetry ingest for the Life-Line Air fleet
+
+Aircraft (or the local simulator) send fixed-size binary frames over UDP
+or TCP. The asyncio ingest service batches incoming frames and writes them
+into per-drone ring buffers held by TelemetryStore, which the dashboard
+pages read positions and recent tracks from.
+
+Run a standalone service with a simulated fleet:
+
+    python -m utils.telemetry serve --simulate 500 --rate 2
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.drone_data import BASE_LAT, BASE_LON
+
+logger = logging.getLogger(__name__)
+
+# Wire format of one telemetry frame (little-endian, 52 bytes)
+FRAME_DTYPE = np.dtype([
+    ('drone_id', 'S12'),
+    ('timestamp', '<f8'),   # POSIX seconds
+    ('lat', '<f8'),
+    ('lon', '<f8'),
+    ('altitude', '<f4'),    # metres
+    ('speed', '<f4'),       # km/h
+    ('battery', '<f4'),     # percent
+    ('payload_temp', '<f4'),  # °C inside the cargo bay; NaN without a payload sensor
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+
+# Frames per UDP datagram that keep it under a 1500-byte MTU
+FRAMES_PER_DATAGRAM = 1400 // FRAME_SIZE
+
+TRACK_FIELDS = ('timestamp', 'lat', 'lon', 'altitude', 'speed', 'battery')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_UDP_PORT = 9870
+DEFAULT_TCP_PORT = 9871
+
+
+def encode_frames(drone_ids, timestamp, lat, lon, altitude, speed, battery, payload_temp=np.nan):
+    """Pack aligned telemetry arrays into wire-format bytes"""
+    frames = np.empty(len(drone_ids), dtype=FRAME_DTYPE)
+    frames['drone_id'] = drone_ids
+    frames['timestamp'] = timestamp
+    frames['lat'] = lat
+    frames['lon'] = lon
+    frames['altitude'] = altitude
+    frames['speed'] = speed
+    frames['battery'] = battery
+    frames['payload_temp'] = payload_temp
+    return frames.tobytes()
+
+
+def decode_frames(data):
+    """View wire-format bytes as a frame array (trailing partial frames are ignored)"""
+    whole = len(data) - len(data) % FRAME_SIZE
+    return np.frombuffer(data, dtype=FRAME_DTYPE, count=whole // FRAME_SIZE)
+
+
+def latest_per_drone(frames):
+    """Keep only the last frame of each drone in a batch"""
+    reversed_frames = frames[::-1]
+    _, first = np.unique(reversed_frames['drone_id'], return_index=True)
+    return reversed_frames[first]
+
+
+class TelemetryStore:
+    """Fixed-size ring buffer of recent frames for every drone
+
+    All rings live in one (drones x capacity) array per field, so a batch of
+    frames from many drones is written with a single scatter per field.
+    """
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('drone_ids', 'latest', 'history', 'stats')
+
+    def __init__(self, capacity=600, initial_drones=64):
+        self._lock = threading.Lock()
+        self.capacity = capacity
+        self._slots = {}
+        self._ids = []
+        self._head = np.zeros(initial_drones, dtype=np.int64)  # frames ever written per drone
+        self._tracks = {name: np.zeros((initial_drones, capacity), dtype=FRAME_DTYPE[name])
+                        for name in TRACK_FIELDS}
+        self.version = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _register(self, drone_id):
+        slot = len(self._ids)
+        if slot == len(self._head):
+            size = slot * 2
+            self._head = np.concatenate([self._head, np.zeros(slot, dtype=np.int64)])
+            for name, track in self._tracks.items():
+                grown = np.zeros((size, self.capacity), dtype=track.dtype)
+                grown[:slot] = track
+                self._tracks[name] = grown
+        self._slots[drone_id] = slot
+        self._ids.append(drone_id.decode())
+        return slot
+
+    def _slots_for(self, raw_ids):
+        unique, inverse = np.unique(raw_ids, return_inverse=True)
+        slots = np.empty(len(unique), dtype=np.intp)
+        for i, drone_id in enumerate(unique):
+            slot = self._slots.get(drone_id)
+            slots[i] = self._register(drone_id) if slot is None else slot
+        return slots[inverse]
+
+    def ingest(self, frames):
+        """Append a batch of frames; frames of one drone are kept in arrival order"""
+        if not len(frames):
+            return 0
+
+        with self._lock:
+            slots = self._slots_for(frames['drone_id'])
+            order = np.argsort(slots, kind='stable')
+            slots = slots[order]
+
+            # Position of each frame within its drone's run of the sorted batch
+            starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+            counts = np.diff(np.r_[starts, len(slots)])
+            rank = np.arange(len(slots)) - np.repeat(starts, counts)
+            positions = (self._head[slots] + rank) % self.capacity
+
+            for name in TRACK_FIELDS:
+                self._tracks[name][slots, positions] = frames[name][order]
+            self._head[slots[starts]] += counts
+            self.version += 1
+        return len(frames)
+
+    def drone_ids(self):
+        """Ids of every drone that has reported"""
+        with self._lock:
+            return list(self._ids)
+
+    def latest(self):
+        """Most recent frame of every drone, as aligned arrays"""
+        with self._lock:
+            n = len(self._ids)
+            rows = np.arange(n)
+            last = (self._head[:n] - 1) % self.capacity
+            latest = {name: self._tracks[name][rows, last] for name in TRACK_FIELDS}
+            latest['drone_id'] = np.array(self._ids, dtype=object)
+        return latest
+
+    def history(self, drone_id, limit=None):
+        """Buffered frames of one drone in chronological order"""
+        with self._lock:
+            slot = self._slots.get(drone_id.encode())
+            if slot is None:
+                return {name: np.empty(0, dtype=FRAME_DTYPE[name]) for name in TRACK_FIELDS}
+
+            head = int(self._head[slot])
+            count = min(head, self.capacity, limit or self.capacity)
+            positions = np.arange(head - count, head) % self.capacity
+            return {name: self._tracks[name][slot, positions] for name in TRACK_FIELDS}
+
+    def stats(self):
+        """Frames held and overwritten across all rings"""
+        with self._lock:
+            heads = self._head[:len(self._ids)]
+            return {
+                'drones': len(self._ids),
+                'frames_buffered': int(np.minimum(heads, self.capacity).sum()),
+                'frames_overwritten': int(np.maximum(heads - self.capacity, 0).sum()),
+            }
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service):
+        self.service = service
+
+    def datagram_received(self, data, addr):
+        self.service._accept(data)
+
+
+class _TcpProtocol(asyncio.Protocol):
+    def __init__(self, service):
+        self.service = service
+        self.transport = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.service._connections.add(self)
+        self.service.counters['tcp_connections'] += 1
+        if self.service._paused:
+            transport.pause_reading()
+
+    def data_received(self, data):
+        self._buffer += data
+        whole = len(self._buffer) - len(self._buffer) % FRAME_SIZE
+        if whole:
+            self.service._accept(bytes(self._buffer[:whole]), reliable=True)
+            del self._buffer[:whole]
+
+    def connection_lost(self, exc):
+        self.service._connections.discard(self)
+
+
+class TelemetryIngestService:
+    """Asyncio UDP/TCP server that batches frames into a TelemetryStore
+
+    Received frames wait in a bounded pending batch that is flushed every
+    ``flush_interval`` seconds, or sooner once ``flush_frames`` accumulate.
+    When the batch reaches its high-water mark TCP senders are paused until
+    it drains; UDP has no way to push back, so frames beyond
+    ``max_pending_frames`` are dropped and counted.
+
+    Flushed batches are written to the store on the loop thread and then
+    handed to the sinks on one worker thread, in arrival order, so slow
+    sinks never hold up reading the sockets. TCP senders are also paused
+    while more than ``max_pending_frames`` frames wait for the sinks.
+
+    sinks -- callables receiving every flushed frame batch, e.g. fleet_sink()
+    """
+
+    def __init__(self, store, host=DEFAULT_HOST, udp_port=DEFAULT_UDP_PORT, tcp_port=DEFAULT_TCP_PORT,
+                 max_pending_frames=65536, flush_frames=4096, flush_interval=0.02, sinks=()):
+        self.store = store
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.max_pending_frames = max_pending_frames
+        self.flush_frames = flush_frames
+        self.flush_interval = flush_interval
+        self.sinks = list(sinks)
+
+        self.counters = {
+            'frames_received': 0,
+            'frames_stored': 0,
+            'frames_dropped': 0,
+            'bytes_malformed': 0,
+            'batches': 0,
+            'tcp_connections': 0,
+            'tcp_pauses': 0,
+            'sink_errors': 0,
+        }
+        self._pending = []
+        self._pending_frames = 0
+        self._sink_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='telemetry-sinks')
+        self._sink_batches = set()
+        self._sink_backlog = 0  # frames handed to the sinks and not yet through them
+        self._paused = False
+        self._flush_handle = None
+        self._connections = set()
+        self._loop = None
+        self._udp_transport = None
+        self._tcp_server = None
+        self._ingest_lag = 0.0
+        self.running = False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self):
+        """Bind the UDP and TCP listeners on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        if self.udp_port is not None:
+            self._udp_transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _UdpProtocol(self), local_addr=(self.host, self.udp_port))
+            self.udp_port = self._udp_transport.get_extra_info('sockname')[1]
+        if self.tcp_port is not None:
+            self._tcp_server = await self._loop.create_server(
+                lambda: _TcpProtocol(self), self.host, self.tcp_port)
+            self.tcp_port = self._tcp_server.sockets[0].getsockname()[1]
+        self.running = True
+        logger.info("Telemetry ingest listening on %s (udp %s, tcp %s)", self.host, self.udp_port, self.tcp_port)
+
+    async def stop(self):
+        """Close the listeners and flush whatever is pending"""
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+        self._flush()
+        if self._sink_batches:
+            await asyncio.gather(*self._sink_batches)
+        self.running = False
+
+    def start_in_thread(self):
+        """Run the service on its own event loop in a daemon thread"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except OSError:
+                logger.exception("Telemetry ingest could not bind %s", self.host)
+                started.set()
+                return
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name='telemetry-ingest', daemon=True)
+        thread.start()
+        started.wait(timeout=5)
+        return thread
+
+    # ------------------------------------------------------------------
+    # Ingest path
+    # ------------------------------------------------------------------
+    def _accept(self, data, reliable=False):
+        remainder = len(data) % FRAME_SIZE
+        if remainder:
+            self.counters['bytes_malformed'] += remainder
+            data = data[:len(data) - remainder]
+        count = len(data) // FRAME_SIZE
+        if not count:
+            return
+
+        self.counters['frames_received'] += count
+        if not reliable and self._pending_frames + count > self.max_pending_frames:
+            self.counters['frames_dropped'] += count
+            return
+
+        self._pending.append(data)
+        self._pending_frames += count
+
+        if self._pending_frames >= self.max_pending_frames // 2 and not self._paused:
+            self._pause_senders()
+
+        if self._pending_frames >= self.flush_frames:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_handle = self._loop.call_soon(self._flush)
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_interval, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._pending:
+            return
+
+        data = b''.join(self._pending)
+        self._pending = []
+        self._pending_frames = 0
+
+        frames = decode_frames(data)
+        self.store.ingest(frames)
+        self.counters['frames_stored'] += len(frames)
+        self.counters['batches'] += 1
+        self._ingest_lag = max(0.0, time.time() - float(frames['timestamp'].max()))
+
+        if self.sinks:
+            self._sink_backlog += len(frames)
+            batch = self._loop.run_in_executor(self._sink_executor, self._run_sinks, frames)
+            self._sink_batches.add(batch)
+            batch.add_done_callback(lambda done, count=len(frames): self._sinks_done(done, count))
+            if self._sink_backlog >= self.max_pending_frames and not self._paused:
+                self._pause_senders()
+
+        self._maybe_resume()
+
+    def _run_sinks(self, frames):
+        """Worker thread: pass one batch through every sink; returns the number that failed"""
+        failed = 0
+        for sink in self.sinks:
+            try:
+                sink(frames)
+            except Exception:
+                failed += 1
+                logger.exception("Telemetry sink %r failed", sink)
+        return failed
+
+    def _sinks_done(self, batch, count):
+        self._sink_batches.discard(batch)
+        self._sink_backlog -= count
+        if not batch.cancelled():
+            self.counters['sink_errors'] += batch.result()
+        self._maybe_resume()
+
+    def _maybe_resume(self):
+        if (self._paused and self._pending_frames < self.max_pending_frames // 2
+                and self._sink_backlog < self.max_pending_frames // 2):
+            self._resume_senders()
+
+    def _pause_senders(self):
+        self._paused = True
+        self.counters['tcp_pauses'] += 1
+        for connection in self._connections:
+            connection.transport.pause_reading()
+
+    def _resume_senders(self):
+        self._paused = False
+        for connection in self._connections:
+            connection.transport.resume_reading()
+
+    def stats(self):
+        """Ingest counters plus the current backlog and lag"""
+        return {
+            **self.counters,
+            'pending_frames': self._pending_frames,
+            'sink_backlog_frames': self._sink_backlog,
+            'max_pending_frames': self.max_pending_frames,
+            'senders_paused': self._paused,
+            'ingest_lag_s': self._ingest_lag,
+            **self.store.stats(),
+        }
+
+
+def fleet_sink(drone_manager):
+    """Sink that mirrors each drone's latest position and battery into a DroneDataManager"""
+    def apply(frames):
+        latest = latest_per_drone(frames)
+        ids = [raw.decode() for raw in latest['drone_id']]
+        known = np.fromiter((drone_id in drone_manager for drone_id in ids), dtype=bool, count=len(ids))
+
+        for i in np.flatnonzero(~known):
+            drone_manager.add_drone(ids[i], status='Active', mission='Medical Delivery', location='En Route')
+        drone_manager.update_many(
+            ids,
+            lat=latest['lat'],
+            lon=latest['lon'],
+            battery=latest['battery'],
+            timestamp=latest['timestamp'],
+        )
+    return apply
+
+
+class TelemetrySimulator:
+    """Stand-in for the aircraft: flies drones on loops around the base and sends UDP frames
+
+    payload_setpoints -- callable returning, for the drone ids, the cargo
+    bay temperature each one holds (NaN without a payload), e.g.
+    ColdChainMonitor.setpoints; bays then report that temperature plus a
+    slow drift. Without it every frame's payload_temp is NaN.
+    """
+
+    def __init__(self, drone_ids, host=DEFAULT_HOST, port=DEFAULT_UDP_PORT, rate_hz=1.0,
+                 center=(BASE_LAT, BASE_LON), payload_setpoints=None, seed=None):
+        rng = self._rng = np.random.default_rng(seed)
+        n = len(drone_ids)
+        self.host = host
+        self.port = port
+        self.rate_hz = rate_hz
+        self.center = center
+        self.payload_setpoints = payload_setpoints
+        self.frames_sent = 0
+
+        self._ids = np.array(drone_ids, dtype='S12')
+        self._radius = rng.uniform(0.005, 0.05, size=n)           # degrees
+        self._angle = rng.uniform(0, 2 * np.pi, size=n)
+        self._angular_speed = rng.uniform(0.002, 0.01, size=n) * rng.choice([-1, 1], size=n)  # rad/s
+        self._altitude = rng.uniform(50, 150, size=n).astype(np.float32)
+        self._battery = rng.uniform(40, 100, size=n).astype(np.float32)
+        self._drone_ids = list(drone_ids)
+        self._bay_drift = np.zeros(n)  # °C off the setpoint
+
+    def step(self, dt, now=None):
+        """Advance every drone by dt seconds and return the encoded frames"""
+        self._angle += self._angular_speed * dt
+        self._battery = np.maximum(self._battery - 0.01 * dt, 5).astype(np.float32)
+        lat0, lon0 = self.center
+        lat = lat0 + self._radius * np.cos(self._angle)
+        lon = lon0 + self._radius * np.sin(self._angle) / np.cos(np.radians(lat0))
+        speed = np.abs(self._angular_speed) * self._radius * 111.32 * 3600  # km/h
+
+        payload_temp = np.nan
+        if self.payload_setpoints is not None:
+            # Mean-reverting drift, well inside every band's half-width
+            self._bay_drift = 0.9 * self._bay_drift + self._rng.normal(0, 0.3, size=len(self._ids))
+            payload_temp = self.payload_setpoints(self._drone_ids) + self._bay_drift
+
+        return encode_frames(self._ids, now or time.time(), lat, lon,
+                             self._altitude, speed, self._battery, payload_temp)
+
+    async def run(self, duration=None):
+        """Send one frame per drone every 1/rate_hz seconds"""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(self.host, self.port))
+        period = 1.0 / self.rate_hz
+        chunk = FRAMES_PER_DATAGRAM * FRAME_SIZE
+        started = last = time.monotonic()
+        try:
+            while duration is None or last - started < duration:
+                now = time.monotonic()
+                data = self.step(now - last)
+                last = now
+                for offset in range(0, len(data), chunk):
+                    transport.sendto(data[offset:offset + chunk])
+                self.frames_sent += len(self._ids)
+                await asyncio.sleep(max(0.0, period - (time.monotonic() - now)))
+        finally:
+            transport.close()
+
+    def start_in_thread(self):
+        """Run the simulator on its own event loop in a daemon thread"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()),
+                                  name='telemetry-simulator', daemon=True)
+        thread.start()
+        return thread
+
+
+async def _serve(args):
+    store = TelemetryStore(capacity=args.capacity)
+    service = TelemetryIngestService(store, host=args.host, udp_port=args.udp_port, tcp_port=args.tcp_port)
+    await service.start()
+
+    tasks = []
+    if args.simulate:
+        drone_ids = [f"LLA-{i:05d}" for i in range(1, args.simulate + 1)]
+        simulator = TelemetrySimulator(drone_ids, host=args.host, port=service.udp_port, rate_hz=args.rate)
+        tasks.append(asyncio.create_task(simulator.run()))
+
+    try:
+        while True:
+            await asyncio.sleep(args.report_every)
+            stats = service.stats()
+            logger.info("received=%d stored=%d dropped=%d pending=%d lag=%.3fs drones=%d",
+                        stats['frames_received'], stats['frames_stored'], stats['frames_dropped'],
+                        stats['pending_frames'], stats['ingest_lag_s'], stats['drones'])
+    finally:
+        for task in tasks:
+            task.cancel()
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Life-Line Air telemetry ingest service")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="run the ingest service")
+    serve.add_argument('--host', default=DEFAULT_HOST)
+    serve.add_argument('--udp-port', type=int, default=DEFAULT_UDP_PORT)
+    serve.add_argument('--tcp-port', type=int, default=DEFAULT_TCP_PORT)
+    serve.add_argument('--capacity', type=int, default=600, help="frames kept per drone")
+    serve.add_argument('--simulate', type=int, default=0, metavar='N', help="also fly N simulated drones")
+    serve.add_argument('--rate', type=float, default=1.0, help="simulated frames per drone per second")
+    serve.add_argument('--report-every', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Multi-resolution telemetry time series for flight paths and charts
+
+Every drone's sortie is kept as a raw ring of recent frames plus a pyramid
+of rollup levels. Each level condenses FACTOR consecutive points of the
+level below into one bucket:
+
+* the path keeps the bucket point that forms the largest triangle with the
+  previously kept point and the bucket's last point (the LTTB criterion),
+  so corners and turns survive;
+* scalar channels (altitude, speed, battery) keep the bucket's min and max.
+
+Buckets are finalized as frames arrive, so a query only has to pick the
+finest level that fits a small multiple of the requested point budget and
+run one vectorized LTTB / min-max pass over it.
+
+A new sortie starts when the dispatcher sends the drone out
+(sortie_sink), so a path never joins two separate flights.
+"""
+import threading
+
+import numpy as np
+
+from utils.dispatch import IN_TRANSIT
+
+FACTOR = 8
+LEVELS = 4
+# A level is used once it holds no more than OVERSAMPLE x budget points;
+# matching FACTOR means the chosen level never has fewer points than asked for
+OVERSAMPLE = FACTOR
+
+SCALAR_FIELDS = ('altitude', 'speed', 'battery')
+
+
+def lttb(x, y, threshold):
+    """Indices of a Largest-Triangle-Three-Buckets downsample of (x, y)
+
+    Classic LTTB anchors each bucket on the point picked in the previous
+    bucket, which forces a Python loop over buckets. Here both anchors are
+    bucket means, so every bucket is solved in one vectorized pass; the
+    first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Interior points 1..n-2 split into threshold-2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    keep = counts > 0
+    starts, counts = starts[keep], counts[keep]
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    idx = np.arange(starts[0], starts[-1] + counts[-1])
+
+    mean_x = np.add.reduceat(x[idx], starts - starts[0]) / counts
+    mean_y = np.add.reduceat(y[idx], starts - starts[0]) / counts
+    # Anchors: previous bucket mean (first point for bucket 0) and next bucket mean (last point at the end)
+    ax = np.r_[x[0], mean_x[:-1]][bucket]
+    ay = np.r_[y[0], mean_y[:-1]][bucket]
+    cx = np.r_[mean_x[1:], x[-1]][bucket]
+    cy = np.r_[mean_y[1:], y[-1]][bucket]
+
+    area = np.abs((ax - cx) * (y[idx] - ay) - (ax - x[idx]) * (cy - ay))
+    best = np.maximum.reduceat(area, starts - starts[0])
+    winners = np.flatnonzero(area == best[bucket])
+    _, first = np.unique(bucket[winners], return_index=True)
+
+    return np.r_[0, idx[winners[first]], n - 1]
+
+
+def minmax_buckets(t, lo, hi, budget):
+    """Reduce (t, lo, hi) envelopes to at most ``budget`` buckets"""
+    n = len(t)
+    if n <= budget:
+        return t, lo, hi
+    starts = np.linspace(0, n, budget + 1).astype(np.intp)[:-1]
+    starts = np.unique(starts)
+    return t[starts], np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)
+
+
+class _Buffer:
+    """Append-only float64 columns with amortized doubling"""
+
+    def __init__(self, names, capacity=64):
+        self.names = names
+        self.size = 0
+        self.data = np.empty((len(names), capacity))
+
+    def append(self, row):
+        if self.size == self.data.shape[1]:
+            grown = np.empty((len(self.names), self.size * 2))
+            grown[:, :self.size] = self.data[:, :self.size]
+            self.data = grown
+        self.data[:, self.size] = row
+        self.size += 1
+
+
+class _Series:
+    """Raw ring plus rollup pyramid of one drone's sortie"""
+
+    RAW = ('t', 'lat', 'lon') + SCALAR_FIELDS
+    LEVEL = ('t', 'lat', 'lon') + tuple(f"{f}_{m}" for f in SCALAR_FIELDS for m in ('min', 'max'))
+
+    def __init__(self, raw_capacity):
+        self.raw_capacity = raw_capacity
+        self.raw = np.empty((len(self.RAW), raw_capacity))
+        self.count = 0  # raw points ever appended
+        self.first = None
+        self.levels = [_Buffer(self.LEVEL) for _ in range(LEVELS)]
+
+    def append(self, block):
+        """Append raw rows (fields x m) and finalize any completed buckets"""
+        m = block.shape[1]
+        if m >= self.raw_capacity:
+            raise ValueError("Telemetry block larger than the raw ring")
+        if self.first is None:
+            self.first = block[:, :1].copy()
+        positions = np.arange(self.count, self.count + m) % self.raw_capacity
+        self.raw[:, positions] = block
+        self.count += m
+
+        while self.count - self.levels[0].size * FACTOR >= FACTOR:
+            start = self.levels[0].size * FACTOR
+            rows = self.raw[:, np.arange(start, start + FACTOR) % self.raw_capacity]
+            self._roll(0, rows[0], rows[1], rows[2], rows[3:], rows[3:])
+
+            for level in range(1, LEVELS):
+                below = self.levels[level - 1]
+                start = self.levels[level].size * FACTOR
+                if below.size - start < FACTOR:
+                    break
+                cols = below.data[:, start:start + FACTOR]
+                self._roll(level, cols[0], cols[1], cols[2], cols[3::2], cols[4::2])
+
+    def _roll(self, level, t, lat, lon, lows, highs):
+        out = self.levels[level]
+        if out.size:
+            anchor_lat, anchor_lon = out.data[1, out.size - 1], out.data[2, out.size - 1]
+        else:
+            anchor_lat, anchor_lon = lat[0], lon[0]
+        # Largest triangle against the previously kept point and the bucket's last point
+        area = np.abs((anchor_lon - lon[-1]) * (lat - anchor_lat) - (anchor_lon - lon) * (lat[-1] - anchor_lat))
+        i = int(np.argmax(area))
+        row = [t[i], lat[i], lon[i]]
+        for lo, hi in zip(lows, highs):
+            row += [lo.min(), hi.max()]
+        out.append(row)
+
+    def raw_tail(self, start):
+        """Raw points from absolute index ``start`` (clamped to what the ring still holds)"""
+        start = max(start, self.count - self.raw_capacity)
+        return self.raw[:, np.arange(start, self.count) % self.raw_capacity]
+
+    def points(self, budget):
+        """Columns of the coarsest-needed level plus the not-yet-rolled tail below it"""
+        level = 0
+        while level < LEVELS and (self.count / FACTOR ** level > budget * OVERSAMPLE
+                                  or (level == 0 and self.count > self.raw_capacity)):
+            level += 1
+
+        if level == 0:
+            raw = self.raw_tail(0)
+            return raw[0], raw[1], raw[2], raw[3:], raw[3:]
+
+        # The sortie's first point, then the level itself
+        first = np.vstack([self.first[:3], np.repeat(self.first[3:], 2, axis=0)])
+        parts = [first, self.levels[level - 1].data[:, :self.levels[level - 1].size]]
+        # Stitch on the tails that have not been rolled up to this level yet
+        for lower in range(level - 2, -1, -1):
+            start = self.levels[lower + 1].size * FACTOR
+            parts.append(self.levels[lower].data[:, start:self.levels[lower].size])
+        # Raw points not yet rolled up, always including the latest one
+        raw = self.raw_tail(min(self.levels[0].size * FACTOR, self.count - 1))
+        parts.append(np.vstack([raw[:3], np.repeat(raw[3:], 2, axis=0)]))
+
+        cols = np.hstack(parts)
+        return cols[0], cols[1], cols[2], cols[3::2], cols[4::2]
+
+
+class TimeSeriesStore:
+    """Per-drone multi-resolution flight series fed from telemetry frames"""
+
+    # Methods exposed through per-session read-only views
+    READ_METHODS = ('path', 'series', 'point_count')
+
+    def __init__(self, raw_capacity=2048):
+        self._lock = threading.Lock()
+        self._raw_capacity = raw_capacity
+        self._series = {}
+        self._sortie_start = {}  # drone id -> POSIX seconds; earlier frames belong to a past sortie
+        self.version = 0
+
+    def start_sortie(self, drone_id, started_at=None):
+        """Forget a drone's previous sortie; frames stamped before ``started_at`` are dropped"""
+        with self._lock:
+            self._series.pop(drone_id, None)
+            if started_at is None:
+                self._sortie_start.pop(drone_id, None)
+            else:
+                self._sortie_start[drone_id] = started_at
+            self.version += 1
+
+    def append(self, drone_id, t, lat, lon, altitude, speed, battery):
+        """Append aligned arrays of one drone's frames in time order"""
+        block = np.vstack([t, lat, lon, altitude, speed, battery]).astype(np.float64)
+        with self._lock:
+            started = self._sortie_start.get(drone_id)
+            if started is not None:
+                block = block[:, block[0] >= started]
+                if not block.shape[1]:
+                    return
+            series = self._series.get(drone_id)
+            if series is None:
+                series = self._series[drone_id] = _Series(self._raw_capacity)
+            for start in range(0, block.shape[1], self._raw_capacity // 2):
+                series.append(block[:, start:start + self._raw_capacity // 2])
+            self.version += 1
+
+    def ingest(self, frames):
+        """Append a batch of telemetry frames (see utils.telemetry.FRAME_DTYPE)"""
+        if not len(frames):
+            return
+        ids, inverse = np.unique(frames['drone_id'], return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(inverse))]
+        frames = frames[order]
+        for i, raw_id in enumerate(ids):
+            chunk = frames[bounds[i]:bounds[i + 1]]
+            self.append(raw_id.decode(), chunk['timestamp'], chunk['lat'], chunk['lon'],
+                        chunk['altitude'], chunk['speed'], chunk['battery'])
+
+    def point_count(self, drone_id):
+        """Raw points recorded for the drone's current sortie"""
+        with self._lock:
+            series = self._series.get(drone_id)
+            return series.count if series else 0
+
+    def path(self, drone_id, budget=500):
+        """Downsampled (lat, lon, t) of a drone's sortie with at most ``budget`` points"""
+        with self._lock:
+            series = self._series.get(drone_id)
+            if series is None:
+                empty = np.empty(0)
+                return empty, empty, empty
+            t, lat, lon, _, _ = series.points(budget)
+
+        keep = lttb(lon * np.cos(np.radians(lat.mean())), lat, budget)
+        return lat[keep], lon[keep], t[keep]
+
+    def series(self, drone_id, field, budget=500):
+        """Downsampled (t, min, max) envelope of one scalar channel"""
+        with self._lock:
+            series = self._series.get(drone_id)
+            if series is None:
+                empty = np.empty(0)
+                return empty, empty, empty
+            t, _, _, lows, highs = series.points(budget)
+
+        i = SCALAR_FIELDS.index(field)
+        return minmax_buckets(t, lows[i], highs[i], budget)
+
+
+def sortie_sink(store):
+    """Dispatcher sink that starts a drone's new sortie when it departs on a delivery"""
+    def apply(delivery):
+        if delivery['status'] == IN_TRANSIT:
+            store.start_sortie(delivery['drone_id'], started_at=delivery['start_time'].timestamp())
+    return apply